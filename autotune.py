@@ -0,0 +1,284 @@
+"""Tune data-loading workers, thread counts and batch size for this machine; writes the runtime profile.
+
+    python autotune.py                 # full search, writes config.RUNTIME_PROFILE_PATH
+    python autotune.py --quick         # fewer candidates and shorter trials
+
+Each trial runs in a fresh spawned process, so torch's inter-op pool can
+be set for each trial and one trial's thread pools don't affect the
+next. The search has four steps:
+1. Compute: training-step throughput and single-clip inference latency
+   over intra-op thread counts, then over inter-op 1 vs 2 at the best
+   counts.
+2. Batch size: the largest power of two up to --max-batch-size whose
+   training step (forward, backward and optimizer) stays within
+   --memory-fraction of available memory. Device memory is used on CUDA.
+3. Pipeline: end-to-end training throughput on the real DataLoader
+   (config.DATA_DIR) over worker counts. Each DataLoader worker is limited
+   to DATALOADER_WORKER_THREADS threads, and the main process gets the
+   remaining cores. The prefetch factor is then tuned at the best worker
+   count.
+4. The chosen values go to the profile, which train.py, evaluate.py
+   (section "train") and detect.py (section "inference") apply at startup.
+"""
+import argparse
+import contextlib
+import multiprocessing as mp
+import os
+import queue
+import resource
+import time
+
+from configs import config
+from utils.runtime_profile import available_memory_bytes, save_runtime_profile, usable_cpu_count
+
+TRIAL_TIMEOUT_S = 300
+NUM_CLASSES = 10 # Trial models only; the class count barely affects cost
+
+
+def _build_model(input_size):
+    from models import SignLanguageModel
+    return SignLanguageModel(num_classes=NUM_CLASSES, input_size=input_size, hidden_size=config.HIDDEN_SIZE,
+                             dropout_rate=config.DROPOUT_RATE, bidirectional=config.BIDIRECTIONAL,
+                             num_lstm_layers=config.NUM_LSTM_LAYERS, pretrained_backbone=False)
+
+def _train_steps(model, optimizer, batches, device):
+    """Runs a training step per (sequences, labels, lengths) batch; returns samples processed."""
+    import torch.nn.functional as F
+    samples = 0
+    for sequences, labels, lengths in batches:
+        sequences, labels = sequences.to(device), labels.to(device) % NUM_CLASSES
+        optimizer.zero_grad()
+        F.cross_entropy(model(sequences, lengths), labels).backward()
+        optimizer.step()
+        samples += labels.size(0)
+    return samples
+
+def trial_compute(threads, interop, batch_size, steps):
+    import torch
+    model = _build_model(config.INPUT_SIZE)
+    optimizer = torch.optim.Adam(model.parameters(), lr=config.LEARNING_RATE)
+    x = torch.randint(0, 256, (batch_size, config.SEQUENCE_LENGTH, 1, config.INPUT_SIZE, config.INPUT_SIZE), dtype=torch.uint8)
+    labels = torch.randint(0, NUM_CLASSES, (batch_size,))
+    batches = [(x, labels, None)] * steps
+    _train_steps(model, optimizer, batches[:1], 'cpu') # Warm-up
+    start = time.perf_counter()
+    samples = _train_steps(model, optimizer, batches, 'cpu')
+    train_rate = samples / (time.perf_counter() - start)
+
+    model.eval()
+    clip = x[:1]
+    latencies = []
+    with torch.inference_mode():
+        model(clip)
+        for _ in range(steps * 2):
+            start = time.perf_counter()
+            model(clip)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return {'train_samples_per_sec': train_rate, 'infer_ms': sorted(latencies)[len(latencies) // 2]}
+
+def trial_memory(threads, interop, batch_size, steps):
+    import torch
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model = _build_model(config.INPUT_SIZE).to(device)
+    optimizer = torch.optim.Adam(model.parameters(), lr=config.LEARNING_RATE)
+    x = torch.randint(0, 256, (batch_size, config.SEQUENCE_LENGTH, 1, config.INPUT_SIZE, config.INPUT_SIZE), dtype=torch.uint8)
+    _train_steps(model, optimizer, [(x, torch.zeros(batch_size, dtype=torch.long), None)] * 2, device)
+    result = {'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+    if device.type == 'cuda':
+        result['peak_device_bytes'] = torch.cuda.max_memory_allocated()
+        result['device_total_bytes'] = torch.cuda.get_device_properties(0).total_memory
+    return result
+
+def trial_pipeline(threads, interop, batch_size, steps, num_workers, prefetch_factor, worker_threads, data_dir):
+    import torch
+    from utils.data_utils import get_data_loaders, unpack_batch
+    config.PREFETCH_FACTOR = prefetch_factor
+    config.DATALOADER_WORKER_THREADS = worker_threads
+    config.PERSISTENT_WORKERS = False
+    train_loader, _, _ = get_data_loaders(
+        data_dir=data_dir, batch_size=batch_size, sequence_length=config.SEQUENCE_LENGTH,
+        input_size=config.INPUT_SIZE, num_workers=num_workers, validation_split=config.VALIDATION_SPLIT)
+    if train_loader is None:
+        raise RuntimeError(f"No training data in {data_dir}")
+    model = _build_model(config.INPUT_SIZE)
+    optimizer = torch.optim.Adam(model.parameters(), lr=config.LEARNING_RATE)
+    samples, start = 0, None
+    while samples == 0 or steps > 0: # Re-iterate small datasets until enough steps ran
+        for batch in train_loader:
+            sequences, labels, lengths = unpack_batch(batch)
+            if start is None: # Worker startup and the first batch are excluded
+                _train_steps(model, optimizer, [(sequences, labels, lengths)], 'cpu')
+                start = time.perf_counter()
+                continue
+            samples += _train_steps(model, optimizer, [(sequences, labels, lengths)], 'cpu')
+            steps -= 1
+            if steps == 0:
+                break
+        if start is None:
+            raise RuntimeError("The training loader yielded no batches")
+    return {'train_samples_per_sec': samples / (time.perf_counter() - start)}
+
+TRIALS = {'compute': trial_compute, 'memory': trial_memory, 'pipeline': trial_pipeline}
+
+def _trial_entry(result_queue, kind, params):
+    from utils.runtime_profile import configure_threads
+    configure_threads(params['threads'], params['interop'], 1)
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): # Dataset/model init chatter
+            result_queue.put(('ok', TRIALS[kind](**params)))
+    except Exception as e:
+        result_queue.put(('error', f"{type(e).__name__}: {e}"))
+
+def run_trial(kind, **params):
+    """Runs one trial in a fresh process; returns its result dict, or None if it failed (e.g. out of memory)."""
+    ctx = mp.get_context('spawn')
+    result_queue = ctx.Queue()
+    proc = ctx.Process(target=_trial_entry, args=(result_queue, kind, params))
+    proc.start()
+    try:
+        status, result = result_queue.get(timeout=TRIAL_TIMEOUT_S)
+    except queue.Empty:
+        status, result = 'error', f"no result (exit code {proc.exitcode}, killed or timed out)"
+    proc.join(timeout=10)
+    if proc.is_alive():
+        proc.kill()
+    shown = {k: v for k, v in params.items() if k not in ('data_dir', 'steps')}
+    if status != 'ok':
+        print(f"  {kind} {shown}: failed ({result})")
+        return None
+    print(f"  {kind} {shown}: " + ", ".join(f"{k}={v:.4g}" for k, v in result.items()))
+    return result
+
+
+def thread_candidates(cores):
+    candidates = {1, cores}
+    n = 2
+    while n < cores:
+        candidates.add(n)
+        n *= 2
+    return sorted(candidates)
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune workers, threads and batch size; write the runtime profile.")
+    parser.add_argument('--output', default=config.RUNTIME_PROFILE_PATH)
+    parser.add_argument('--data-dir', default=config.DATA_DIR, help="Dataset used for the DataLoader trials.")
+    parser.add_argument('--max-batch-size', type=int, default=64,
+                        help="Upper bound of the batch size search (larger batches also change optimization).")
+    parser.add_argument('--memory-fraction', type=float, default=0.7,
+                        help="Share of available memory a training process (plus its workers) may use.")
+    parser.add_argument('--quick', action='store_true', help="Fewer candidates and steps.")
+    args = parser.parse_args()
+
+    cores = usable_cpu_count()
+    available = available_memory_bytes()
+    steps = 3 if args.quick else 8
+    trials = []
+    def record(kind, result, **params):
+        trials.append({'kind': kind, 'params': params, 'result': result})
+        return result
+
+    print(f"Host: {cores} usable cores, "
+          f"{f'{available / 2**30:.1f} GiB available memory' if available else 'available memory unknown'}")
+
+    # 1. Compute threads
+    print("\n[1/3] Compute threads")
+    candidates = thread_candidates(cores)
+    if args.quick:
+        candidates = sorted({1, max(1, cores // 2), cores})
+    compute = {}
+    for threads in candidates:
+        params = dict(threads=threads, interop=1, batch_size=config.BATCH_SIZE, steps=steps)
+        result = record('compute', run_trial('compute', **params), **params)
+        if result:
+            compute[threads] = result
+    if not compute:
+        raise SystemExit("Error: Every compute trial failed.")
+    train_threads = max(compute, key=lambda t: compute[t]['train_samples_per_sec'])
+    infer_threads = min(compute, key=lambda t: compute[t]['infer_ms'])
+    train_interop = infer_interop = 1
+    params = dict(threads=train_threads, interop=2, batch_size=config.BATCH_SIZE, steps=steps)
+    result = record('compute', run_trial('compute', **params), **params)
+    if result and result['train_samples_per_sec'] > compute[train_threads]['train_samples_per_sec'] * 1.03:
+        train_interop = 2
+    if train_threads != infer_threads:
+        params = dict(threads=infer_threads, interop=2, batch_size=config.BATCH_SIZE, steps=steps)
+        result = record('compute', run_trial('compute', **params), **params)
+    if result and result['infer_ms'] < compute[infer_threads]['infer_ms'] * 0.97:
+        infer_interop = 2
+
+    # 2. Batch size
+    print("\n[2/3] Batch size")
+    budget = available * args.memory_fraction if available else None
+    batch_size, candidate = None, 1
+    while candidate <= args.max_batch_size:
+        params = dict(threads=train_threads, interop=train_interop, batch_size=candidate, steps=steps)
+        result = record('memory', run_trial('memory', **params), **params)
+        if result is None:
+            break # Most likely out of memory
+        if 'peak_device_bytes' in result:
+            fits = result['peak_device_bytes'] <= result['device_total_bytes'] * args.memory_fraction
+        else:
+            fits = budget is None or result['peak_rss_bytes'] <= budget
+        if not fits:
+            break
+        batch_size = candidate
+        candidate *= 2
+    if batch_size is None:
+        print("  Warning: Even batch size 1 exceeds the memory budget; keeping the configured batch size.")
+        batch_size = config.BATCH_SIZE
+
+    # 3. DataLoader workers and prefetch
+    print("\n[3/3] DataLoader pipeline")
+    worker_threads = config.DATALOADER_WORKER_THREADS or 1
+    worker_candidates = [w for w in [0] + thread_candidates(max(1, cores - 1)) if w < cores]
+    if args.quick:
+        worker_candidates = sorted({0, min(2, cores - 1), max(0, cores // 2)})
+    pipeline = {}
+    for num_workers in worker_candidates:
+        main_threads = max(1, min(train_threads, cores - num_workers * worker_threads))
+        params = dict(threads=main_threads, interop=train_interop, batch_size=batch_size, steps=steps,
+                      num_workers=num_workers, prefetch_factor=config.PREFETCH_FACTOR,
+                      worker_threads=worker_threads, data_dir=args.data_dir)
+        result = record('pipeline', run_trial('pipeline', **params), **params)
+        if result:
+            pipeline[num_workers] = (result['train_samples_per_sec'], main_threads)
+    prefetch_factor = config.PREFETCH_FACTOR
+    if pipeline:
+        num_workers = max(pipeline, key=lambda w: pipeline[w][0])
+        train_threads = pipeline[num_workers][1]
+        if num_workers > 0:
+            for candidate_prefetch in (4, 8):
+                params = dict(threads=train_threads, interop=train_interop, batch_size=batch_size, steps=steps,
+                              num_workers=num_workers, prefetch_factor=candidate_prefetch,
+                              worker_threads=worker_threads, data_dir=args.data_dir)
+                result = record('pipeline', run_trial('pipeline', **params), **params)
+                if result and result['train_samples_per_sec'] > pipeline[num_workers][0] * 1.03:
+                    prefetch_factor = candidate_prefetch
+                    pipeline[num_workers] = (result['train_samples_per_sec'], train_threads)
+    else:
+        print(f"  Warning: No DataLoader trial succeeded (is {args.data_dir} a dataset?); "
+              f"keeping NUM_WORKERS={config.NUM_WORKERS} and leaving the remaining cores to the main process.")
+        num_workers = config.NUM_WORKERS
+        train_threads = max(1, min(train_threads, cores - num_workers * worker_threads))
+
+    train = {
+        'NUM_WORKERS': num_workers,
+        'PREFETCH_FACTOR': prefetch_factor,
+        'DATALOADER_WORKER_THREADS': worker_threads,
+        'TORCH_THREADS': train_threads,
+        'TORCH_INTEROP_THREADS': train_interop,
+        'CV2_THREADS': 1, # The main process only collates; workers do the OpenCV work
+        'BATCH_SIZE': batch_size,
+    }
+    inference = {
+        'TORCH_THREADS': infer_threads,
+        'TORCH_INTEROP_THREADS': infer_interop,
+        'CV2_THREADS': max(1, cores - infer_threads), # Masking and resizing run beside the forward pass
+    }
+    save_runtime_profile(args.output, train, inference, trials)
+    print(f"\nRuntime profile written to {args.output}")
+    print("  train:     " + ", ".join(f"{k}={v}" for k, v in train.items()))
+    print("  inference: " + ", ".join(f"{k}={v}" for k, v in inference.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Benchmark and load-test scripts. Run from the repository root, e.g. `python -m benchmarks.load_test`."""
@@ -0,0 +1,103 @@
+"""Size and decode time of compact masked.npz clips vs per-frame JPEG and PNG files.
+
+Runs on a processed dataset directory (videos that already have masked.npz
+are compared against their frames/ and masked/ folders), or on synthetic
+masked clips when no directory is given.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from configs import config
+from utils.compact_storage import COMPACT_CLIP_FILE, CompactClip, save_compact_clip
+from benchmarks.frame_preprocessor import make_masked_frames
+
+
+def dir_size(path, extensions):
+    if not os.path.isdir(path):
+        return 0
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path) if f.lower().endswith(extensions))
+
+def time_files(frame_dir, extensions, indices, flags, repeats):
+    files = sorted(f for f in os.listdir(frame_dir) if f.lower().endswith(extensions))
+    start = time.perf_counter()
+    for _ in range(repeats):
+        np.stack([cv2.imread(os.path.join(frame_dir, files[i]), flags) for i in indices])
+    return (time.perf_counter() - start) / repeats
+
+def time_compact(clip_path, indices, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        CompactClip(clip_path).decode(indices)
+    return (time.perf_counter() - start) / repeats
+
+def write_synthetic_videos(root, num_videos, num_frames):
+    """Writes frames/ (JPEG), masked/ (PNG) and masked.npz for synthetic masked clips."""
+    video_dirs = []
+    for v in range(num_videos):
+        video_dir = os.path.join(root, f"video_{v:03d}")
+        os.makedirs(os.path.join(video_dir, "frames"))
+        os.makedirs(os.path.join(video_dir, "masked"))
+        frames = make_masked_frames(num_frames, 480, 640, seed=v)
+        for i, frame in enumerate(frames):
+            cv2.imwrite(os.path.join(video_dir, "frames", f"frame_{i:04d}.jpg"), frame)
+            cv2.imwrite(os.path.join(video_dir, "masked", f"frame_{i:04d}.png"), frame)
+        save_compact_clip(os.path.join(video_dir, COMPACT_CLIP_FILE), frames)
+        video_dirs.append(video_dir)
+    return video_dirs
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare compact clip storage against per-frame image files.")
+    parser.add_argument('data_dir', nargs='?', help="Processed dataset (class/video folders); synthetic if omitted.")
+    parser.add_argument('--videos', type=int, default=20, help="Videos to measure.")
+    parser.add_argument('--frames', type=int, default=30, help="Frames per synthetic video.")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    temp_dir = None
+    if args.data_dir:
+        video_dirs = sorted(
+            os.path.join(root, d) for root, dirs, _ in os.walk(args.data_dir) for d in dirs
+            if os.path.exists(os.path.join(root, d, COMPACT_CLIP_FILE)))[:args.videos]
+        if not video_dirs:
+            print(f"No {COMPACT_CLIP_FILE} found under {args.data_dir}; run python -m utils.compact_storage first.")
+            return
+    else:
+        temp_dir = tempfile.mkdtemp()
+        video_dirs = write_synthetic_videos(temp_dir, args.videos, args.frames)
+
+    try:
+        sizes = {'jpeg': 0, 'png': 0, 'compact': 0}
+        times = {'jpeg': [], 'png': [], 'compact': []}
+        for video_dir in video_dirs:
+            clip_path = os.path.join(video_dir, COMPACT_CLIP_FILE)
+            indices = np.linspace(0, len(CompactClip(clip_path)) - 1, config.SEQUENCE_LENGTH).astype(int)
+            sizes['compact'] += os.path.getsize(clip_path)
+            times['compact'].append(time_compact(clip_path, indices, args.repeats))
+            for name, sub, extensions, flags in [('jpeg', "frames", ('.jpg', '.jpeg'), cv2.IMREAD_COLOR),
+                                                 ('png', "masked", ('.png',), cv2.IMREAD_GRAYSCALE)]:
+                frame_dir = os.path.join(video_dir, sub)
+                size = dir_size(frame_dir, extensions)
+                if size:
+                    sizes[name] += size
+                    times[name].append(time_files(frame_dir, extensions, indices, flags, args.repeats))
+
+        print(f"{len(video_dirs)} videos, {config.SEQUENCE_LENGTH} frames decoded per access:")
+        for name in ('jpeg', 'png', 'compact'):
+            if not times[name]:
+                continue
+            ratio = f" ({sizes[name] / sizes['compact']:.1f}x compact)" if name != 'compact' else ""
+            print(f"  {name:8s} {sizes[name] / 2**20:8.2f} MiB{ratio} | "
+                  f"{np.mean(times[name]) * 1000:7.2f} ms per sequence")
+        print("  (jpeg excludes the MediaPipe masking it still needs; png and compact are already masked)")
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""DataLoader throughput and IPC volume: float32 ToTensor+Normalize vs the uint8 shared-buffer path.
+
+Uses a synthetic dataset that runs the real validation/training transforms on
+generated masked-looking frames, so MediaPipe and disk I/O don't dominate and
+the difference in worker -> main process transfer is visible.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset
+from torchvision import transforms
+
+from configs import config
+from models import SignLanguageModel
+from utils.data_utils import SharedBatchCollator
+
+
+class SyntheticMaskedDataset(Dataset):
+    """Returns (seq, 1, H, W) sequences built from random hand-like blobs on black."""
+    def __init__(self, num_samples, sequence_length, transform, frame_shape=(480, 640)):
+        self.num_samples = num_samples
+        self.sequence_length = sequence_length
+        self.transform = transform
+        rng = np.random.default_rng(0)
+        self.frames = []
+        for _ in range(32):
+            frame = np.zeros(frame_shape, dtype=np.uint8)
+            center = (int(rng.integers(100, frame_shape[1] - 100)), int(rng.integers(100, frame_shape[0] - 100)))
+            cv2.circle(frame, center, 60, int(rng.integers(120, 255)), -1)
+            self.frames.append(frame)
+
+    def __len__(self):
+        return self.num_samples
+
+    def __getitem__(self, idx):
+        frames = [self.transform(self.frames[(idx + t) % len(self.frames)]) for t in range(self.sequence_length)]
+        return torch.stack(frames), idx % 10
+
+
+def build_transform(input_size, uint8_output):
+    to_tensor = [transforms.PILToTensor()] if uint8_output else [transforms.ToTensor(), transforms.Normalize(mean=[0.5], std=[0.5])]
+    return transforms.Compose([
+        transforms.ToPILImage(),
+        transforms.Resize((input_size, input_size), interpolation=transforms.InterpolationMode.BILINEAR, antialias=True),
+        *to_tensor
+    ])
+
+def time_loader(loader, epochs):
+    batches = 0
+    bytes_moved = 0
+    start = time.perf_counter()
+    for _ in range(epochs):
+        for sequences, labels in loader:
+            batches += 1
+            bytes_moved += sequences.numel() * sequences.element_size()
+    elapsed = time.perf_counter() - start
+    return batches / elapsed, bytes_moved / batches
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the uint8 DataLoader path against float32.")
+    parser.add_argument('--samples', type=int, default=256)
+    parser.add_argument('--batch-size', type=int, default=config.BATCH_SIZE)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, 4])
+    parser.add_argument('--epochs', type=int, default=2)
+    args = parser.parse_args()
+
+    for num_workers in args.workers:
+        results = {}
+        for uint8_output in (False, True):
+            dataset = SyntheticMaskedDataset(args.samples, config.SEQUENCE_LENGTH,
+                                             build_transform(config.INPUT_SIZE, uint8_output))
+            loader = DataLoader(dataset, batch_size=args.batch_size, shuffle=True, num_workers=num_workers,
+                                collate_fn=SharedBatchCollator() if uint8_output else None,
+                                persistent_workers=num_workers > 0)
+            time_loader(loader, 1) # Warm up workers
+            results[uint8_output] = time_loader(loader, args.epochs)
+        (float_rate, float_bytes), (uint8_rate, uint8_bytes) = results[False], results[True]
+        print(f"workers={num_workers}: float32 {float_rate:6.1f} batches/s ({float_bytes / 2**20:.1f} MiB/batch) | "
+              f"uint8 {uint8_rate:6.1f} batches/s ({uint8_bytes / 2**20:.1f} MiB/batch) | "
+              f"speedup {uint8_rate / float_rate:.2f}x, {float_bytes / uint8_bytes:.0f}x fewer bytes")
+
+    # Cost of the on-device normalization that replaces ToTensor + Normalize in the workers
+    batch = torch.randint(0, 256, (args.batch_size, config.SEQUENCE_LENGTH, 1, config.INPUT_SIZE, config.INPUT_SIZE),
+                          dtype=torch.uint8)
+    start = time.perf_counter()
+    for _ in range(50):
+        SignLanguageModel.normalize_input(batch)
+    print(f"normalize_input on one batch: {(time.perf_counter() - start) / 50 * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Scaling efficiency of CPU data-parallel training (train.py under torchrun, gloo).
+
+For each process count N this launches N processes with torchrun. Each one
+runs the real training step (data loader shard, forward, backward,
+all-reduce, optimizer step) for a fixed number of steps with a
+per-process batch of BATCH_SIZE (weak scaling). Efficiency is
+throughput(N) / (N * throughput(1)). Torch threads are split between the
+processes as in train.py, so N=1 uses every core for intra-op work while
+larger N trade that for process-level parallelism. Data loading (masking)
+competes for the same cores unless --synthetic is given.
+
+Usage:
+    python -m benchmarks.ddp_scaling --procs 1 2 4 8 --steps 20
+    python -m benchmarks.ddp_scaling --procs 1 2 4 8 --synthetic
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import torch
+import torch.distributed as dist
+import torch.nn as nn
+import torch.optim as optim
+
+from configs import config
+from models import SignLanguageModel
+from train import all_reduce_sum, setup_distributed
+from utils.data_utils import get_data_loaders, unpack_batch
+
+SYNTHETIC_CLASSES = 10
+
+
+def synthetic_batches(batch_size):
+    sequences = torch.randint(0, 256, (batch_size, config.SEQUENCE_LENGTH, 1, config.INPUT_SIZE, config.INPUT_SIZE),
+                              dtype=torch.uint8)
+    labels = torch.randint(0, SYNTHETIC_CLASSES, (batch_size,))
+    while True:
+        yield sequences, labels
+
+def loader_batches(train_loader):
+    epoch = 0
+    while True:
+        if hasattr(train_loader.sampler, 'set_epoch'):
+            train_loader.sampler.set_epoch(epoch)
+        yield from train_loader
+        epoch += 1
+
+def run_worker(args):
+    rank, world_size = setup_distributed()
+    if args.synthetic:
+        batches, num_classes = synthetic_batches(config.BATCH_SIZE), SYNTHETIC_CLASSES
+    else:
+        train_loader, _, class_names = get_data_loaders(
+            data_dir=config.DATA_DIR, batch_size=config.BATCH_SIZE, sequence_length=config.SEQUENCE_LENGTH,
+            input_size=config.INPUT_SIZE, num_workers=config.NUM_WORKERS, validation_split=config.VALIDATION_SPLIT,
+            frame_cache_bytes=0, rank=rank, world_size=world_size)
+        batches, num_classes = loader_batches(train_loader), len(class_names)
+
+    model = SignLanguageModel(num_classes=num_classes, input_size=config.INPUT_SIZE, hidden_size=config.HIDDEN_SIZE,
+                              dropout_rate=config.DROPOUT_RATE, bidirectional=config.BIDIRECTIONAL,
+                              num_lstm_layers=config.NUM_LSTM_LAYERS, pretrained_backbone=False)
+    if world_size > 1:
+        model = nn.parallel.DistributedDataParallel(model)
+    criterion = nn.CrossEntropyLoss()
+    optimizer = optim.Adam(model.parameters(), lr=config.LEARNING_RATE)
+    model.train()
+
+    def step():
+        sequences, labels, lengths = unpack_batch(next(batches))
+        optimizer.zero_grad()
+        loss = criterion(model(sequences, lengths), labels)
+        loss.backward()
+        optimizer.step()
+        return labels.size(0)
+
+    for _ in range(args.warmup):
+        step()
+    if world_size > 1:
+        dist.barrier()
+    start = time.perf_counter()
+    samples = sum(step() for _ in range(args.steps))
+    elapsed = torch.tensor([time.perf_counter() - start], dtype=torch.float64)
+    samples = all_reduce_sum(torch.tensor([samples], dtype=torch.float64)).item()
+    if world_size > 1:
+        dist.all_reduce(elapsed, op=dist.ReduceOp.MAX)
+    if rank == 0:
+        with open(args.result, 'w') as f:
+            json.dump({'procs': world_size, 'samples': samples, 'seconds': elapsed.item(),
+                       'threads': torch.get_num_threads()}, f)
+    if world_size > 1:
+        dist.destroy_process_group()
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure data-parallel training scaling on CPU.")
+    parser.add_argument('--procs', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--steps', type=int, default=20, help="Timed training steps per process.")
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--synthetic', action='store_true', help="Random batches instead of the dataset (model only).")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for procs in args.procs:
+            result_path = os.path.join(temp_dir, f"ddp_{procs}.json")
+            command = [sys.executable, "-m", "torch.distributed.run", "--standalone", f"--nproc_per_node={procs}",
+                       "-m", "benchmarks.ddp_scaling", "--worker", "--result", result_path,
+                       "--steps", str(args.steps), "--warmup", str(args.warmup)]
+            if args.synthetic:
+                command.append("--synthetic")
+            print(f"Running: {' '.join(command)}")
+            subprocess.run(command, check=True)
+            with open(result_path) as f:
+                results.append(json.load(f))
+
+    print(f"\n{os.cpu_count()} cores, per-process batch {config.BATCH_SIZE}, {args.steps} steps"
+          f"{' (synthetic data)' if args.synthetic else ''}:")
+    base = results[0]['samples'] / results[0]['seconds'] / results[0]['procs']
+    for result in results:
+        throughput = result['samples'] / result['seconds']
+        efficiency = throughput / (result['procs'] * base)
+        print(f"  {result['procs']} procs x {result['threads']:2d} threads: {throughput:8.1f} clips/s | "
+              f"efficiency {efficiency:.0%}")
+
+if __name__ == "__main__":
+    main()
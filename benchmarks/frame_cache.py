@@ -0,0 +1,58 @@
+"""Per-epoch training-loader time and hit rate of the shared frame cache.
+
+Iterates the training loader for a few epochs with the cache disabled and
+enabled, each with and without persistent_workers. The first cached epoch
+fills the cache; later epochs show the decode and mask work saved.
+
+Usage:
+    python -m benchmarks.frame_cache --epochs 3 --workers 2
+"""
+import argparse
+import time
+
+from configs import config
+from utils.data_utils import get_data_loaders
+
+
+def run(epochs, num_workers, cache_bytes, persistent, max_batches):
+    config.PERSISTENT_WORKERS = persistent
+    train_loader, _, _ = get_data_loaders(
+        data_dir=config.DATA_DIR, batch_size=config.BATCH_SIZE, sequence_length=config.SEQUENCE_LENGTH,
+        input_size=config.INPUT_SIZE, num_workers=num_workers, validation_split=config.VALIDATION_SPLIT,
+        frame_cache_bytes=cache_bytes)
+    if train_loader is None:
+        return None
+    frame_cache = train_loader.dataset.frame_cache
+    results = []
+    for _ in range(epochs):
+        start = time.perf_counter()
+        for i, _ in enumerate(train_loader):
+            if i + 1 == max_batches:
+                break
+        elapsed = time.perf_counter() - start
+        hit_rate = frame_cache.stats(reset=True)['hit_rate'] if frame_cache is not None else None
+        results.append((elapsed, hit_rate))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the shared frame cache across epochs.")
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=config.NUM_WORKERS)
+    parser.add_argument('--cache-mib', type=int, default=config.FRAME_CACHE_BYTES // 2**20 or 512)
+    parser.add_argument('--max-batches', type=int, default=0, help="Stop each epoch after this many batches (0 = all).")
+    args = parser.parse_args()
+
+    for persistent in (False, True):
+        for cache_bytes in (0, args.cache_mib * 2**20):
+            results = run(args.epochs, args.workers, cache_bytes, persistent, args.max_batches)
+            if results is None:
+                print("Error: Failed to create the training loader.")
+                return
+            label = f"persistent_workers={persistent}, cache={'off' if cache_bytes == 0 else f'{args.cache_mib} MiB'}"
+            print(f"\n{label}:")
+            for epoch, (elapsed, hit_rate) in enumerate(results, 1):
+                hits = f" | hit rate {hit_rate:.1%}" if hit_rate is not None else ""
+                print(f"  epoch {epoch}: {elapsed:7.2f}s{hits}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""FramePreprocessor vs the torchvision ToPILImage -> Resize -> ToTensor -> Normalize transform.
+
+Checks that both produce the same (1, H, W) tensors within tolerance on
+synthetic masked-looking frames, then times one frame through each path.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+import torch
+from torchvision import transforms
+
+from configs import config
+from utils.frame_preprocessor import FramePreprocessor
+
+
+def build_reference_transform(input_size):
+    """The per-frame transform detect.py and predict_video.py used before FramePreprocessor."""
+    return transforms.Compose([
+        transforms.ToPILImage(),
+        transforms.Resize((input_size, input_size), interpolation=transforms.InterpolationMode.BILINEAR, antialias=True),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.5], std=[0.5])
+    ])
+
+def make_masked_frames(count, height, width, seed=0):
+    """Grayscale frames with filled hand-like polygons on black, like the MediaPipe mask output."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        frame = np.zeros((height, width), dtype=np.uint8)
+        points = rng.integers((0, 0), (width, height), size=(8, 2)).astype(np.int32)
+        cv2.fillPoly(frame, [cv2.convexHull(points)], 255)
+        texture = rng.integers(60, 255, size=(height, width), dtype=np.uint8)
+        frames.append(cv2.bitwise_and(frame, texture))
+    return frames
+
+def time_per_frame(fn, frames, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for frame in frames:
+            fn(frame)
+    return (time.perf_counter() - start) / (repeats * len(frames))
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time FramePreprocessor against the torchvision transform.")
+    parser.add_argument('--frames', type=int, default=32)
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="Max allowed per-pixel difference in normalized units ([-1, 1] range).")
+    args = parser.parse_args()
+
+    reference = build_reference_transform(config.INPUT_SIZE)
+    preprocessor = FramePreprocessor(config.INPUT_SIZE, config.SEQUENCE_LENGTH)
+    out = torch.empty((1, config.INPUT_SIZE, config.INPUT_SIZE), dtype=torch.float32)
+
+    for height, width in [(480, 640), (720, 1280), (96, 96)]:
+        frames = make_masked_frames(args.frames, height, width)
+        diffs = [(preprocessor.transform(frame, out=out) - reference(frame)).abs() for frame in frames]
+        max_diff = max(d.max().item() for d in diffs)
+        mean_diff = float(np.mean([d.mean().item() for d in diffs]))
+        status = "OK" if max_diff <= args.tolerance else "FAIL"
+        reference_s = time_per_frame(reference, frames, args.repeats)
+        preprocessor_s = time_per_frame(preprocessor.push, frames, args.repeats)
+        print(f"{width}x{height}: max abs diff {max_diff:.4f} | mean {mean_diff:.5f} [{status}] | "
+              f"torchvision {reference_s * 1e6:8.1f} us/frame | FramePreprocessor {preprocessor_s * 1e6:8.1f} us/frame | "
+              f"speedup {reference_s / preprocessor_s:.1f}x")
+
+    # Assembling the model input: stacking the deque vs the ring copy
+    tensors = [reference(frame) for frame in frames[:config.SEQUENCE_LENGTH]]
+    start = time.perf_counter()
+    for _ in range(1000):
+        torch.stack(tensors).unsqueeze(0)
+    stack_us = (time.perf_counter() - start) * 1e3
+    start = time.perf_counter()
+    for _ in range(1000):
+        preprocessor.sequence()
+    ring_us = (time.perf_counter() - start) * 1e3
+    print(f"sequence assembly: torch.stack {stack_us:.1f} us | ring {ring_us:.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""CNN compute vs validation accuracy for full-frame and hand-cropped inputs at several sizes.
+
+For each variant (full frame at config.INPUT_SIZE, hand crop at each --sizes
+value) this trains a model with train.py unless its checkpoint already exists,
+evaluates it on the validation split, and counts the CNN multiply-accumulates
+per frame. Results go to a Markdown table.
+
+Usage:
+    python -m benchmarks.hand_crop_report --sizes 64 96 128 --epochs 40 --output hand_crop_report.md
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import torch
+import torch.nn as nn
+
+from configs import config
+from models import SignLanguageModel
+from utils.data_utils import get_data_loaders, unpack_batch
+from utils.metrics import calculate_metrics
+
+
+def count_cnn_macs(model, input_size):
+    """Multiply-accumulates of the CNN for one (1, input_size, input_size) frame."""
+    macs = 0
+
+    def conv_hook(module, inputs, output):
+        nonlocal macs
+        kernel_macs = module.in_channels // module.groups * module.kernel_size[0] * module.kernel_size[1]
+        macs += output.numel() * kernel_macs
+
+    handles = [m.register_forward_hook(conv_hook) for m in model.cnn_features.modules() if isinstance(m, nn.Conv2d)]
+    try:
+        with torch.no_grad():
+            model.cnn_features(torch.zeros(1, 1, input_size, input_size))
+    finally:
+        for handle in handles:
+            handle.remove()
+    return macs
+
+def time_cnn(model, input_size, batch_frames=config.SEQUENCE_LENGTH, repeats=20):
+    """CPU milliseconds per frame for the CNN, measured on a batch of one clip."""
+    frames = torch.zeros(batch_frames, 1, input_size, input_size)
+    with torch.no_grad():
+        model.extract_features(frames) # Warm up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model.extract_features(frames)
+    return (time.perf_counter() - start) / (repeats * batch_frames) * 1000
+
+def evaluate(model, val_loader, device):
+    model.eval()
+    all_labels, all_predictions = [], []
+    with torch.no_grad():
+        for batch in val_loader:
+            sequences, labels, lengths = unpack_batch(batch)
+            outputs = model(sequences.to(device), lengths)
+            all_predictions.extend(outputs.argmax(dim=1).cpu().numpy())
+            all_labels.extend(labels.numpy())
+    return calculate_metrics(all_labels, all_predictions)
+
+def train_variant(input_size, crop_to_hands, model_path, epochs):
+    command = [sys.executable, "train.py", "--input-size", str(input_size), "--model-path", model_path,
+               "--epochs", str(epochs), "--crop-to-hands" if crop_to_hands else "--no-crop-to-hands"]
+    print(f"Training: {' '.join(command)}")
+    subprocess.run(command, check=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Report CNN compute and accuracy with and without hand cropping.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[64, 96, 128], help="Input sizes for the crop variants.")
+    parser.add_argument('--epochs', type=int, default=config.NUM_EPOCHS)
+    parser.add_argument('--retrain', action='store_true', help="Train even if a variant's checkpoint exists.")
+    parser.add_argument('--output', default=os.path.join(config.MODEL_SAVE_DIR, "hand_crop_report.md"))
+    args = parser.parse_args()
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    variants = [(config.INPUT_SIZE, False)] + [(size, True) for size in args.sizes]
+    rows = []
+    for input_size, crop_to_hands in variants:
+        name = f"{'crop' if crop_to_hands else 'full'}{input_size}"
+        model_path = os.path.join(config.MODEL_SAVE_DIR, f"hand_crop_{name}.pth")
+        if args.retrain or not os.path.exists(model_path):
+            train_variant(input_size, crop_to_hands, model_path, args.epochs)
+
+        _, val_loader, class_names = get_data_loaders(
+            data_dir=config.DATA_DIR, batch_size=config.BATCH_SIZE, sequence_length=config.SEQUENCE_LENGTH,
+            input_size=input_size, num_workers=config.NUM_WORKERS, validation_split=config.VALIDATION_SPLIT,
+            crop_to_hands=crop_to_hands)
+        if val_loader is None:
+            print("Error: Failed to create the validation loader.")
+            return
+        model = SignLanguageModel(num_classes=len(class_names), input_size=input_size, hidden_size=config.HIDDEN_SIZE,
+                                  dropout_rate=config.DROPOUT_RATE, bidirectional=config.BIDIRECTIONAL,
+                                  num_lstm_layers=config.NUM_LSTM_LAYERS, pretrained_backbone=False)
+        model.load_state_dict(torch.load(model_path, map_location='cpu', weights_only=True))
+        macs = count_cnn_macs(model, input_size)
+        cpu_ms = time_cnn(model, input_size)
+        metrics = evaluate(model.to(device), val_loader, device)
+        rows.append((name, input_size, crop_to_hands, macs, cpu_ms, metrics))
+        print(f"{name}: {macs / 1e9:.3f} GMACs/frame | {cpu_ms:.2f} ms/frame (CPU) | "
+              f"val acc {metrics['accuracy']:.4f} | F1 {metrics['f1']:.4f}")
+
+    baseline_macs, baseline_acc = rows[0][3], rows[0][5]['accuracy']
+    lines = [
+        "# Hand-crop compute report", "",
+        f"Baseline: full frame at {rows[0][1]}px. Sequence length {config.SEQUENCE_LENGTH}, "
+        f"{args.epochs} max epochs, crop padding {config.HAND_CROP_PADDING}.", "",
+        "| Variant | Input | Crop | CNN GMACs/frame | vs baseline | CPU ms/frame | Val acc | Δ acc | Val F1 |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for name, input_size, crop_to_hands, macs, cpu_ms, metrics in rows:
+        lines.append(f"| {name} | {input_size} | {'yes' if crop_to_hands else 'no'} | {macs / 1e9:.3f} | "
+                     f"{macs / baseline_macs:.0%} | {cpu_ms:.2f} | {metrics['accuracy']:.4f} | "
+                     f"{metrics['accuracy'] - baseline_acc:+.4f} | {metrics['f1']:.4f} |")
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Startup (import) time of the entry-point scripts, optionally against an earlier git revision.
+
+Each module is imported in a fresh interpreter with `python -X importtime`.
+Reported per module:
+- the median wall time, minus the bare interpreter startup
+- the heavy third-party packages it loaded, with each package's
+  cumulative import time
+
+With --ref, the same measurement runs on a temporary git worktree of that
+revision, which gives before/after numbers for an import restructuring:
+
+    python -m benchmarks.import_time --ref HEAD~1
+    python -m benchmarks.import_time detect evaluate --repeats 10 --output import_time.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_MODULES = ('detect', 'predict_video', 'evaluate')
+HEAVY_PACKAGES = ('torch', 'torchvision', 'cv2', 'mediapipe', 'sklearn', 'scipy', 'pandas', 'matplotlib', 'seaborn')
+
+
+def parse_importtime(stderr):
+    """{top-level package: cumulative import ms} for HEAVY_PACKAGES from -X importtime output."""
+    loaded = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        if name in HEAVY_PACKAGES and cumulative.isdigit(): # Top-level entries only, not their submodules
+            loaded[name] = int(cumulative) / 1000
+    return loaded
+
+def run_python(code, cwd, importtime=False):
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
+    return time.perf_counter() - start, proc
+
+def measure(modules, cwd, repeats):
+    interpreter = sorted(run_python('pass', cwd)[0] for _ in range(repeats))[repeats // 2]
+    results = {}
+    for module in modules:
+        times, packages, error = [], {}, None
+        for _ in range(repeats):
+            elapsed, proc = run_python(f'import {module}', cwd, importtime=True)
+            if proc.returncode != 0:
+                error = proc.stderr.strip().splitlines()[-1]
+                break
+            times.append(elapsed)
+            packages = parse_importtime(proc.stderr)
+        if error:
+            results[module] = {'error': error}
+            continue
+        results[module] = {'import_s': max(0.0, sorted(times)[len(times) // 2] - interpreter), 'heavy_packages_ms': packages}
+    return results
+
+def print_results(label, results):
+    print(f"{label}:")
+    for module, result in results.items():
+        if 'error' in result:
+            print(f"  {module:15s} failed: {result['error']}")
+            continue
+        packages = ", ".join(f"{name} {ms:.0f}ms" for name, ms in sorted(result['heavy_packages_ms'].items(), key=lambda kv: -kv[1]))
+        print(f"  {module:15s} {result['import_s'] * 1000:7.0f} ms | {packages or 'no heavy packages'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure entry-point import time.")
+    parser.add_argument('modules', nargs='*', default=list(DEFAULT_MODULES))
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--ref', help="Also measure this git revision (e.g. HEAD~1) for a before/after comparison.")
+    parser.add_argument('--output', help="Write the results as JSON.")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    report = {}
+    if args.ref:
+        worktree = os.path.join(tempfile.mkdtemp(prefix="signlang_import_"), "tree")
+        subprocess.run(['git', 'worktree', 'add', '--detach', worktree, args.ref], cwd=root, check=True, capture_output=True)
+        try:
+            report['before'] = measure(args.modules, worktree, args.repeats)
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=root, capture_output=True)
+            shutil.rmtree(os.path.dirname(worktree), ignore_errors=True)
+        print_results(f"Before ({args.ref})", report['before'])
+    report['after'] = measure(args.modules, root, args.repeats)
+    print_results("Working tree" if args.ref else "Import time", report['after'])
+
+    if args.ref:
+        print("Change:")
+        for module in args.modules:
+            before, after = report['before'].get(module, {}), report['after'].get(module, {})
+            if 'import_s' in before and 'import_s' in after:
+                print(f"  {module:15s} {before['import_s'] * 1000:7.0f} -> {after['import_s'] * 1000:7.0f} ms "
+                      f"({after['import_s'] - before['import_s']:+.2f} s)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Load-test client for serve.py: reports p50/p99 latency and throughput against localhost."""
+import argparse
+import asyncio
+import io
+import time
+
+import cv2
+import numpy as np
+import aiohttp
+
+from configs import config
+
+
+def make_synthetic_clip(num_frames, height, width, seed=0):
+    """A (T, H, W, 3) uint8 BGR clip of a moving bright blob on noise."""
+    rng = np.random.default_rng(seed)
+    frames = rng.integers(0, 60, size=(num_frames, height, width, 3), dtype=np.uint8)
+    for t in range(num_frames):
+        center = (int(width * (0.3 + 0.4 * t / max(1, num_frames - 1))), height // 2)
+        cv2.circle(frames[t], center, min(height, width) // 8, (200, 180, 160), -1)
+    return frames
+
+def encode_npy(frames):
+    buffer = io.BytesIO()
+    np.save(buffer, frames, allow_pickle=False)
+    return buffer.getvalue()
+
+def summarize(latencies_ms, elapsed, label):
+    """Prints and returns p50/p99 latency and throughput."""
+    if not latencies_ms:
+        print(f"{label}: no successful requests.")
+        return {}
+    latencies = np.array(latencies_ms)
+    summary = {
+        'requests': len(latencies),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean()),
+        'throughput_per_s': len(latencies) / elapsed if elapsed > 0 else 0.0,
+    }
+    print(f"{label}: {summary['requests']} ok in {elapsed:.2f}s | "
+          f"p50 {summary['p50_ms']:.1f}ms | p99 {summary['p99_ms']:.1f}ms | "
+          f"mean {summary['mean_ms']:.1f}ms | {summary['throughput_per_s']:.2f}/s")
+    return summary
+
+
+async def run_post_load(url, payload, content_type, num_requests, concurrency):
+    """Fires num_requests POSTs with at most `concurrency` in flight."""
+    latencies = []
+    errors = 0
+    counter = iter(range(num_requests))
+
+    async def worker(session):
+        nonlocal errors
+        for _ in counter:
+            start = time.perf_counter()
+            try:
+                async with session.post(url, data=payload, headers={'Content-Type': content_type}) as resp:
+                    await resp.read()
+                    if resp.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000.0)
+
+    async with aiohttp.ClientSession() as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    if errors:
+        print(f"  {errors} requests failed.")
+    return summarize(latencies, elapsed, f"POST /predict (concurrency={concurrency})")
+
+async def run_stream_load(url, frames, num_streams, frames_per_stream):
+    """Opens num_streams WebSockets, each sending frames_per_stream JPEG frames."""
+    encoded = [cv2.imencode('.jpg', frame)[1].tobytes() for frame in frames]
+    frame_counts = []
+
+    async def stream(session):
+        async with session.ws_connect(url, max_msg_size=0) as ws:
+            async def receive_predictions():
+                received = 0
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        received += 1
+                return received
+
+            receiver = asyncio.create_task(receive_predictions())
+            for i in range(frames_per_stream):
+                await ws.send_bytes(encoded[i % len(encoded)])
+            await ws.close()
+            frame_counts.append(await receiver)
+
+    async with aiohttp.ClientSession() as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(stream(session) for _ in range(num_streams)))
+        elapsed = time.perf_counter() - start
+    total_frames = num_streams * frames_per_stream
+    print(f"WebSocket /stream ({num_streams} streams): {total_frames} frames in {elapsed:.2f}s | "
+          f"{total_frames / elapsed:.1f} frames/s | {sum(frame_counts)} predictions received")
+    return {'frames': total_frames, 'frames_per_s': total_frames / elapsed, 'predictions': sum(frame_counts)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a running serve.py instance.")
+    parser.add_argument('--host', default=config.SERVE_HOST)
+    parser.add_argument('--port', type=int, default=config.SERVE_PORT)
+    parser.add_argument('--requests', type=int, default=200, help="Total POST requests.")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--video', default=None, help="Send this encoded clip instead of a synthetic frame array.")
+    parser.add_argument('--frames', type=int, default=30, help="Frames in the synthetic clip.")
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--streams', type=int, default=0, help="Also run this many concurrent WebSocket streams.")
+    parser.add_argument('--stream-frames', type=int, default=100)
+    args = parser.parse_args()
+
+    base_url = f"http://{args.host}:{args.port}"
+    frames = make_synthetic_clip(args.frames, args.height, args.width)
+    if args.video:
+        with open(args.video, 'rb') as f:
+            payload, content_type = f.read(), 'application/octet-stream'
+    else:
+        payload, content_type = encode_npy(frames), 'application/x-npy'
+    print(f"Payload: {len(payload) / 1024:.0f} KiB ({'clip ' + args.video if args.video else f'{args.frames} synthetic frames'})")
+
+    for concurrency in args.concurrency:
+        asyncio.run(run_post_load(f"{base_url}/predict", payload, content_type, args.requests, concurrency))
+    if args.streams > 0:
+        ws_url = f"ws://{args.host}:{args.port}/stream"
+        asyncio.run(run_stream_load(ws_url, frames, args.streams, args.stream_frames))
+
+if __name__ == "__main__":
+    main()
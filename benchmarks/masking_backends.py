@@ -0,0 +1,117 @@
+"""Per-frame cost, mask agreement and accuracy impact of the masking backends.
+
+Cost and agreement: each video is sampled at TARGET_FPS and masked in order
+by every backend (stream mode, as detect.py and offline preprocessing do).
+Agreement is the IoU of each backend's mask with MediaPipe's per frame.
+
+Accuracy (--train): trains one model per backend with train.py
+--masking-backend, then evaluates each on the validation split masked with
+the same backend.
+
+Usage:
+    python -m benchmarks.masking_backends data/raw --videos 10
+    python -m benchmarks.masking_backends data/raw --train --epochs 40
+"""
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from configs import config
+from models import SignLanguageModel
+from predict_batch import find_videos
+from utils.data_utils import apply_mediapipe_mask_and_grayscale, create_hands_detector, get_data_loaders
+from utils.preprocessing import iter_video_frames
+from benchmarks.hand_crop_report import evaluate
+from benchmarks.tracking_masking import mask_iou
+
+BACKENDS = ['mediapipe', 'skin']
+
+
+def mask_stream(frames, backend):
+    """Masks frames in order with a fresh stream-mode detector; returns (masks, seconds)."""
+    config.MASKING_BACKEND = backend
+    detector = create_hands_detector(static_image_mode=False)
+    try:
+        start = time.perf_counter()
+        masks = [apply_mediapipe_mask_and_grayscale(cv2.cvtColor(f, cv2.COLOR_BGR2RGB), detector=detector)
+                 for f in frames]
+        return masks, time.perf_counter() - start
+    finally:
+        detector.close()
+
+def measure_cost(video_paths, backends):
+    seconds = {b: 0.0 for b in backends}
+    ious = {b: [] for b in backends}
+    total_frames = 0
+    for video_path in video_paths:
+        frames = list(iter_video_frames(video_path, target_fps=config.TARGET_FPS))
+        if not frames:
+            continue
+        total_frames += len(frames)
+        masks = {}
+        for backend in backends:
+            masks[backend], elapsed = mask_stream(frames, backend)
+            seconds[backend] += elapsed
+        if 'mediapipe' in masks:
+            for backend in backends:
+                ious[backend].extend(mask_iou(a, b) for a, b in zip(masks['mediapipe'], masks[backend]))
+
+    print(f"{len(video_paths)} videos, {total_frames} frames at {config.TARGET_FPS} fps:")
+    for backend in backends:
+        agreement = f" | IoU vs mediapipe: mean {np.mean(ious[backend]):.3f}" if ious[backend] else ""
+        print(f"  {backend:10s} {seconds[backend] / total_frames * 1000:7.2f} ms/frame{agreement}")
+
+def measure_accuracy(backends, epochs):
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    for backend in backends:
+        model_path = os.path.join(config.MODEL_SAVE_DIR, f"masking_{backend}.pth")
+        command = [sys.executable, "train.py", "--masking-backend", backend, "--model-path", model_path,
+                   "--epochs", str(epochs)]
+        print(f"Training: {' '.join(command)}")
+        subprocess.run(command, check=True)
+
+        config.MASKING_BACKEND = backend
+        _, val_loader, class_names = get_data_loaders(
+            data_dir=config.DATA_DIR, batch_size=config.BATCH_SIZE, sequence_length=config.SEQUENCE_LENGTH,
+            input_size=config.INPUT_SIZE, num_workers=config.NUM_WORKERS, validation_split=config.VALIDATION_SPLIT)
+        if val_loader is None:
+            print("Error: Failed to create the validation loader.")
+            return
+        model = SignLanguageModel(num_classes=len(class_names), input_size=config.INPUT_SIZE,
+                                  hidden_size=config.HIDDEN_SIZE, dropout_rate=config.DROPOUT_RATE,
+                                  bidirectional=config.BIDIRECTIONAL, num_lstm_layers=config.NUM_LSTM_LAYERS,
+                                  pretrained_backbone=False)
+        model.load_state_dict(torch.load(model_path, map_location='cpu', weights_only=True))
+        metrics = evaluate(model.to(device), val_loader, device)
+        print(f"  {backend:10s} val acc {metrics['accuracy']:.4f} | F1 {metrics['f1']:.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the MediaPipe and skin masking backends.")
+    parser.add_argument('inputs', nargs='*', help="Videos, directories or glob patterns for the cost measurement.")
+    parser.add_argument('--videos', type=int, default=10)
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=BACKENDS)
+    parser.add_argument('--train', action='store_true', help="Also train and evaluate a model per backend.")
+    parser.add_argument('--epochs', type=int, default=config.NUM_EPOCHS)
+    args = parser.parse_args()
+
+    if importlib.util.find_spec('mediapipe') is None and 'mediapipe' in args.backends:
+        print("mediapipe is not installed; measuring the skin backend only.")
+        args.backends = [b for b in args.backends if b != 'mediapipe']
+    if args.inputs:
+        video_paths = find_videos(args.inputs)[:args.videos]
+        if video_paths:
+            measure_cost(video_paths, args.backends)
+        else:
+            print("No videos found.")
+    if args.train:
+        measure_accuracy(args.backends, args.epochs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Cold-load time and memory of a model bundle against a legacy state dict.
+
+Saves one randomly initialized model both ways (best_model.pth style state
+dict + class names, and a bundle) into a temporary directory, then starts
+--processes fresh interpreters per format that each load the model and run
+one forward. Every process waits at a barrier once loaded, so memory is read
+while all copies are alive: with the bundle's mmap'd weights the processes
+share the file's page-cache pages, which shows up as lower total PSS and USS.
+
+Drop the page cache between runs (echo 3 > /proc/sys/vm/drop_caches) for
+true cold-start times; otherwise the second format benefits from a warm disk.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import torch
+
+from configs import config
+from models import SignLanguageModel
+from utils.model_bundle import load_inference_model, save_bundle
+from utils.worker_pool import get_process_memory
+
+FORMATS = ('legacy', 'bundle')
+
+
+def load_legacy(model_path, num_classes):
+    """What the entry points did before bundles: build, probe the CNN, then copy the weights in."""
+    model = SignLanguageModel(num_classes=num_classes, input_size=config.INPUT_SIZE, hidden_size=config.HIDDEN_SIZE,
+                              dropout_rate=config.DROPOUT_RATE, bidirectional=config.BIDIRECTIONAL,
+                              num_lstm_layers=config.NUM_LSTM_LAYERS, pretrained_backbone=False)
+    model.load_state_dict(torch.load(model_path, map_location='cpu'))
+    return model.eval()
+
+def load_worker(fmt, paths, num_classes, barrier, results):
+    torch.set_num_threads(1)
+    start = time.perf_counter()
+    if fmt == 'legacy':
+        model = load_legacy(paths['legacy'], num_classes)
+    else:
+        model, _ = load_inference_model(torch.device('cpu'), paths['bundle'])
+    load_s = time.perf_counter() - start
+    with torch.inference_mode():
+        model(torch.zeros(1, 2, 1, config.INPUT_SIZE, config.INPUT_SIZE, dtype=torch.uint8))
+    first_forward_s = time.perf_counter() - start
+    barrier.wait() # Every copy is alive while memory is read
+    results.put({'load_s': load_s, 'first_forward_s': first_forward_s, **get_process_memory()})
+    barrier.wait() # Keep the others alive until everyone has measured
+
+def run_format(fmt, paths, num_classes, processes):
+    ctx = mp.get_context('spawn') # Fresh interpreters, like separately started servers
+    barrier, results = ctx.Barrier(processes), ctx.Queue()
+    workers = [ctx.Process(target=load_worker, args=(fmt, paths, num_classes, barrier, results)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    samples = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return {
+        'load_s': sorted(s['load_s'] for s in samples)[processes // 2],
+        'first_forward_s': sorted(s['first_forward_s'] for s in samples)[processes // 2],
+        'total_pss': sum(s.get('pss', 0) for s in samples),
+        'total_uss': sum(s.get('uss', 0) for s in samples),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare model bundle and legacy state dict loading.")
+    parser.add_argument('--processes', type=int, default=4, help="Concurrent processes loading the model.")
+    parser.add_argument('--num-classes', type=int, default=10)
+    parser.add_argument('--output', default=None, help="Optional JSON file for the results.")
+    args = parser.parse_args()
+
+    class_names = [f"class_{i}" for i in range(args.num_classes)]
+    model = SignLanguageModel(num_classes=args.num_classes, input_size=config.INPUT_SIZE, hidden_size=config.HIDDEN_SIZE,
+                              dropout_rate=config.DROPOUT_RATE, bidirectional=config.BIDIRECTIONAL,
+                              num_lstm_layers=config.NUM_LSTM_LAYERS, pretrained_backbone=False)
+    weight_bytes = sum(t.numel() * t.element_size() for t in model.state_dict().values())
+    results = {'processes': args.processes, 'weight_bytes': weight_bytes}
+    with tempfile.TemporaryDirectory(prefix="signlang_bundle_") as tmp:
+        paths = {'legacy': os.path.join(tmp, "best_model.pth"), 'bundle': os.path.join(tmp, "model_bundle.pt")}
+        torch.save(model.state_dict(), paths['legacy'])
+        save_bundle(paths['bundle'], model, class_names)
+        print(f"Model weights: {weight_bytes / 2**20:.1f} MiB | {args.processes} processes per format")
+        for fmt in FORMATS:
+            results[fmt] = run_format(fmt, paths, args.num_classes, args.processes)
+            r = results[fmt]
+            print(f"  {fmt:7s} load {r['load_s'] * 1000:7.0f} ms | first forward {r['first_forward_s'] * 1000:7.0f} ms | "
+                  f"total PSS {r['total_pss'] / 2**20:7.0f} MiB | total USS {r['total_uss'] / 2**20:7.0f} MiB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
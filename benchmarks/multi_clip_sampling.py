@@ -0,0 +1,61 @@
+"""Training-loader cost per clip with one vs several windows drawn per video load.
+
+Iterates the training loader in the main process (num_workers=0, so the
+time is the decode + mask + transform work itself) for each clips-per-video
+value and reports milliseconds per clip. Decoding and masking are shared
+between a video's windows, so they shrink by roughly the window overlap;
+transforms still run per clip.
+
+Usage:
+    python -m benchmarks.multi_clip_sampling --clips 1 2 4 --batches 20
+"""
+import argparse
+import time
+
+from configs import config
+from utils.data_utils import get_data_loaders, unpack_batch
+
+
+def time_loader(clips_per_video, num_batches, batch_size, data_dir):
+    train_loader, _, _ = get_data_loaders(
+        data_dir=data_dir, batch_size=batch_size, sequence_length=config.SEQUENCE_LENGTH,
+        input_size=config.INPUT_SIZE, num_workers=0, validation_split=config.VALIDATION_SPLIT,
+        clips_per_video=clips_per_video, frame_cache_bytes=0) # Measure the decode work itself, not cache hits
+    if train_loader is None:
+        return None
+    clips = 0
+    start = time.perf_counter()
+    for i, batch in enumerate(train_loader):
+        if i == num_batches:
+            break
+        sequences, _, _ = unpack_batch(batch)
+        clips += sequences.size(0)
+    elapsed = time.perf_counter() - start
+    return elapsed, clips
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure training-loader cost per clip for several clips-per-video values.")
+    parser.add_argument('--data-dir', default=config.DATA_DIR)
+    parser.add_argument('--clips', type=int, nargs='+', default=[1, 2, 4], help="clips_per_video values to compare.")
+    parser.add_argument('--batches', type=int, default=20, help="Batches timed per value.")
+    parser.add_argument('--batch-size', type=int, default=config.BATCH_SIZE)
+    args = parser.parse_args()
+
+    results = {}
+    for clips_per_video in args.clips:
+        result = time_loader(clips_per_video, args.batches, args.batch_size, args.data_dir)
+        if result is None:
+            print("Error: Failed to create the training loader.")
+            return
+        results[clips_per_video] = result
+
+    baseline = None
+    print(f"\n{args.batches} training batches of ~{args.batch_size} clips, num_workers=0:")
+    for clips_per_video, (elapsed, clips) in results.items():
+        per_clip = elapsed / clips * 1000
+        baseline = baseline or per_clip
+        print(f"  clips_per_video={clips_per_video}: {clips:5d} clips | {per_clip:7.2f} ms per clip "
+              f"({baseline / per_clip:.2f}x vs first)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Recording-stop -> result latency of predict_video's legacy and in-memory paths.
+
+Replays a synthetic 30 fps recording at real-time pace (no camera needed):
+the legacy path writes it to an mp4 while "recording", the in-memory path feeds
+it to InMemoryClipBuffer. Only the time after the last frame is measured.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import torch
+
+import predict_video
+from configs import config
+from models import SignLanguageModel
+from utils.frame_preprocessor import FramePreprocessor
+from benchmarks.load_test import make_synthetic_clip
+
+
+def replay(frames, fps, on_frame):
+    """Calls on_frame(frame, timestamp) at the given frame rate."""
+    interval = 1.0 / fps
+    next_time = time.perf_counter()
+    for frame in frames:
+        now = time.perf_counter()
+        if now < next_time:
+            time.sleep(next_time - now)
+        on_frame(frame, time.time())
+        next_time += interval
+
+def run_legacy(model, frames, fps, preprocessor):
+    temp_dir = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(temp_dir, "temp_capture.mp4")
+        height, width = frames[0].shape[:2]
+        out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+        replay(frames, fps, lambda frame, timestamp: out.write(frame))
+        out.release()
+        stop_time = time.perf_counter()
+        sequence = predict_video.frames_from_video_file(video_path, os.path.join(temp_dir, "frames"), preprocessor,
+                                                        config.SEQUENCE_LENGTH)
+        predict_video.predict_sequence(model, sequence, torch.device('cpu'), -1)
+        return time.perf_counter() - stop_time
+    finally:
+        shutil.rmtree(temp_dir)
+
+def run_in_memory(model, frames, fps, preprocessor):
+    clip_buffer = predict_video.InMemoryClipBuffer(preprocessor, len(frames))
+    replay(frames, fps, clip_buffer.offer)
+    stop_time = time.perf_counter()
+    sequence = clip_buffer.finalize(config.SEQUENCE_LENGTH)
+    predict_video.predict_sequence(model, sequence, torch.device('cpu'), -1)
+    return time.perf_counter() - stop_time
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare recording-stop -> result latency of both predict_video paths.")
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    model = SignLanguageModel(num_classes=10, input_size=config.INPUT_SIZE, hidden_size=config.HIDDEN_SIZE,
+                              dropout_rate=config.DROPOUT_RATE, bidirectional=config.BIDIRECTIONAL,
+                              num_lstm_layers=config.NUM_LSTM_LAYERS, pretrained_backbone=False).eval()
+    frames = list(make_synthetic_clip(int(args.duration * args.fps), 480, 640))
+    preprocessor = FramePreprocessor(config.INPUT_SIZE, config.SEQUENCE_LENGTH)
+
+    # Warm up MediaPipe and the model so the first measurement isn't an outlier
+    run_in_memory(model, frames[:int(args.fps)], args.fps, preprocessor)
+
+    for name, runner in [("legacy (mp4 + JPEG)", run_legacy), ("in-memory", run_in_memory)]:
+        latencies = [runner(model, frames, args.fps, preprocessor) * 1000 for _ in range(args.repeats)]
+        print(f"{name:20s} stop -> result: median {np.median(latencies):7.1f} ms | "
+              f"min {min(latencies):7.1f} ms | max {max(latencies):7.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Headless replay of the live detection loop (detect.real_time_detection) for benchmarking and regression runs.
+
+Recorded sessions (video files) or synthetic sessions are fed through the
+unchanged live loop. The loop runs with a file or synthetic frame source and
+a headless sink (utils/frame_sources.py). Each session reports:
+- per-frame latency, from frame read to display
+- the effective FPS
+- the emitted prediction sequence: every change of the overlay text, with
+  its frame index
+
+Runs are deterministic. Every frame is processed in order (nothing is
+dropped, unlike a live camera), seeds and torch threads are fixed, and
+detectors are recreated per session. The prediction sequence should
+therefore only change when behaviour changes. --baseline compares a run
+with a saved --output and exits non-zero when any session's predictions
+differ.
+
+Usage:
+    python -m benchmarks.replay_detection sessions/ --output replay.json
+    python -m benchmarks.replay_detection sessions/ --baseline replay.json
+    python -m benchmarks.replay_detection --synthetic 300 --model random --pacing realtime
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+from configs import config
+from detect import real_time_detection
+from models import SignLanguageModel
+from predict_batch import find_videos
+from utils.frame_sources import HeadlessSink, SyntheticSource, VideoFileSource
+from utils.model_bundle import apply_bundle_settings, load_inference_model
+
+RANDOM_MODEL_CLASSES = 10
+
+
+def build_model(kind, device):
+    """(model, class_names): the trained model (bundle or legacy files), or seeded random weights."""
+    if kind == "trained":
+        model, metadata = load_inference_model(device)
+        if model is None:
+            raise SystemExit("Error: Model failed to load (use --model random).")
+        apply_bundle_settings(metadata)
+        return model, metadata['class_names']
+    torch.manual_seed(0)
+    class_names = [f"class_{i}" for i in range(RANDOM_MODEL_CLASSES)]
+    model = SignLanguageModel(num_classes=len(class_names), input_size=config.INPUT_SIZE,
+                              hidden_size=config.HIDDEN_SIZE, dropout_rate=config.DROPOUT_RATE,
+                              bidirectional=config.BIDIRECTIONAL, num_lstm_layers=config.NUM_LSTM_LAYERS,
+                              pretrained_backbone=False).to(device).eval()
+    return model, class_names
+
+def replay_session(name, source, model, class_names, overlay_path=None):
+    results = []
+    sink = HeadlessSink(overlay_path, fps=source.fps)
+    start = time.perf_counter()
+    real_time_detection(frame_source=source, sink=sink, model=model, class_names=class_names,
+                        on_frame_result=results.append)
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([r['latency_ms'] for r in results]) if results else np.zeros(1)
+    events = []
+    for r in results:
+        if not events or events[-1][1] != r['text']:
+            events.append((r['frame'], r['text']))
+    return {
+        'name': name,
+        'frames': len(results),
+        'fps': len(results) / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': {'p50': float(np.percentile(latencies, 50)), 'p95': float(np.percentile(latencies, 95)),
+                       'p99': float(np.percentile(latencies, 99)), 'max': float(latencies.max())},
+        'events': events,
+    }
+
+def compare(results, baseline):
+    """Prints latency/FPS deltas vs a baseline run; returns the names of sessions whose predictions changed."""
+    baseline_by_name = {s['name']: s for s in baseline['sessions']}
+    changed = []
+    for session in results:
+        base = baseline_by_name.get(session['name'])
+        if base is None:
+            print(f"  {session['name']}: not in baseline")
+            continue
+        same = [tuple(e) for e in base['events']] == [tuple(e) for e in session['events']]
+        print(f"  {session['name']}: predictions {'unchanged' if same else 'CHANGED'} | "
+              f"p50 {base['latency_ms']['p50']:.1f} -> {session['latency_ms']['p50']:.1f} ms | "
+              f"fps {base['fps']:.1f} -> {session['fps']:.1f}")
+        if not same:
+            changed.append(session['name'])
+            for i, (old, new) in enumerate(zip(base['events'], session['events'])):
+                if tuple(old) != tuple(new):
+                    print(f"    first difference at event {i}: {tuple(old)} -> {tuple(new)}")
+                    break
+            else:
+                print(f"    event count {len(base['events'])} -> {len(session['events'])}")
+    return changed
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded or synthetic sessions through the live detection loop.")
+    parser.add_argument('inputs', nargs='*', help="Video files, directories or glob patterns.")
+    parser.add_argument('--synthetic', type=int, default=0, help="Also replay a synthetic session of this many frames.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic session.")
+    parser.add_argument('--pacing', choices=['fast', 'realtime'], default='fast')
+    parser.add_argument('--max-frames', type=int, default=None, help="Frames replayed per video file.")
+    parser.add_argument('--model', choices=['trained', 'random'], default='trained')
+    parser.add_argument('--threads', type=int, default=4, help="torch threads (fixed for repeatable timing).")
+    parser.add_argument('--overlay-dir', help="Write each session's overlays to <dir>/<name>.mp4.")
+    parser.add_argument('--output', help="Write the results as JSON.")
+    parser.add_argument('--baseline', help="Compare against a previous --output; exit 1 if predictions changed.")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    device = torch.device('cpu') # Same numerics on every run
+    model, class_names = build_model(args.model, device)
+
+    sessions = [(os.path.basename(p), lambda p=p: VideoFileSource(p, pacing=args.pacing, max_frames=args.max_frames))
+                for p in find_videos(args.inputs)]
+    if args.synthetic:
+        sessions.append((f"synthetic_seed{args.seed}",
+                         lambda: SyntheticSource(args.synthetic, fps=30.0, pacing=args.pacing, seed=args.seed)))
+    if not sessions:
+        print("No sessions to replay (give videos or --synthetic N).")
+        return
+    if args.overlay_dir:
+        os.makedirs(args.overlay_dir, exist_ok=True)
+
+    results = []
+    for name, make_source in sessions:
+        overlay_path = os.path.join(args.overlay_dir, f"{os.path.splitext(name)[0]}.mp4") if args.overlay_dir else None
+        session = replay_session(name, make_source(), model, class_names, overlay_path)
+        results.append(session)
+        latency = session['latency_ms']
+        print(f"{name}: {session['frames']} frames | {session['fps']:.1f} fps | latency p50 {latency['p50']:.1f} "
+              f"p95 {latency['p95']:.1f} p99 {latency['p99']:.1f} max {latency['max']:.1f} ms | "
+              f"{len(session['events'])} prediction events")
+        for frame, text in session['events']:
+            print(f"    frame {frame:5d}: {text}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'pacing': args.pacing, 'model': args.model, 'threads': args.threads, 'sessions': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.baseline}:")
+        changed = compare(results, baseline)
+        if changed:
+            print(f"Prediction sequence changed in {len(changed)} session(s).")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Per-call cost of the runtime metrics (utils/runtime_metrics.py) and their percentile accuracy.
+
+The instrumented paths make a few metric calls per frame. This measures
+each call type so the cost can be compared with a frame budget (100 ms at
+10 fps). It also compares histogram percentiles with exact ones on
+lognormal latencies.
+"""
+import argparse
+import random
+import time
+
+from utils.runtime_metrics import MetricsRegistry
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure runtime metrics overhead.")
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram('stage_ms')
+    counter = registry.counter('frames_total')
+    gauge = registry.gauge('queue_depth')
+
+    def timed_block():
+        with registry.timer('stage_ms'):
+            pass
+
+    print(f"{args.calls} calls each:")
+    print(f"  histogram.observe  {per_call_us(lambda: histogram.observe(12.5), args.calls):6.2f} us")
+    print(f"  registry.timer     {per_call_us(timed_block, args.calls):6.2f} us")
+    print(f"  counter.inc        {per_call_us(counter.inc, args.calls):6.2f} us")
+    print(f"  gauge.set          {per_call_us(lambda: gauge.set(3), args.calls):6.2f} us")
+
+    accuracy = registry.histogram('accuracy_ms')
+    samples = sorted(random.lognormvariate(3, 0.6) for _ in range(args.calls))
+    for value in samples:
+        accuracy.observe(value)
+    print("Percentile estimate vs exact (lognormal, median ~20 ms):")
+    for q in (50, 90, 99):
+        exact = samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+        estimate = accuracy.percentile(q)
+        print(f"  p{q}: {estimate:7.2f} ms vs {exact:7.2f} ms ({(estimate - exact) / exact:+.1%})")
+    print(f"Snapshot time: {per_call_us(registry.snapshot, 1000):.1f} us, "
+          f"Prometheus text: {per_call_us(registry.to_prometheus, 1000):.1f} us")
+
+if __name__ == "__main__":
+    main()
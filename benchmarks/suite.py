@@ -0,0 +1,369 @@
+"""Benchmark suite over every hot path, run on synthetic data, with JSON results and baseline comparison.
+
+Stages (each runs in its own subprocess, so peak RSS is per stage):
+- extract_frames: frame extraction from a generated mp4
+- mask: apply_mediapipe_mask_and_grayscale per frame, using config.MASKING_BACKEND
+- transforms: the train and val transforms from get_data_loaders, per frame
+- dataset: SignLanguageDataset.__getitem__ with the files and compact backends
+- dataloader: one training-loader epoch for each worker count
+- model: SignLanguageModel forward and forward+backward over batch size x
+  sequence length x input size
+
+The synthetic data is generated in a temporary directory: an mp4, and a
+dataset of raw frames, masked PNGs and masked.npz clips. Nothing on disk is
+needed. Each metric records its value, unit and direction. The result file
+also stores a machine fingerprint (CPU, cores, library versions, git
+commit). `compare` lists metrics that got worse than a baseline by more
+than --threshold and exits 1 if any did, so it can gate CI. It warns when
+the two runs come from different machines.
+
+Usage:
+    python -m benchmarks.suite run --output bench.json
+    python -m benchmarks.suite run --quick --stages model dataloader --output bench.json
+    python -m benchmarks.suite compare baseline.json bench.json --threshold 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+STAGES = ('extract_frames', 'mask', 'transforms', 'dataset', 'dataloader', 'model')
+SYNTHETIC_CLASSES = 4
+SYNTHETIC_VIDEOS_PER_CLASS = 5 # Enough for the stratified split in get_data_loaders
+SYNTHETIC_FRAMES = 24
+FRAME_SHAPE = (480, 640)
+
+
+def metric(name, value, unit, higher_is_better=False, **params):
+    return {'name': name, 'value': value, 'unit': unit, 'higher_is_better': higher_is_better, 'params': params}
+
+def median_seconds(fn, repeats, warmup=1):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+def peak_rss_bytes():
+    """Peak RSS of this process and of its reaped children (DataLoader workers); ru_maxrss is KiB on Linux."""
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+# --- Synthetic data ---
+
+def synthetic_frames(count, seed):
+    from utils.frame_sources import SyntheticSource
+    source = SyntheticSource(count, size=FRAME_SHAPE, seed=seed)
+    frames = []
+    while True:
+        ok, frame = source.read()
+        if not ok:
+            return frames
+        frames.append(frame)
+
+def make_workdir(workdir):
+    """Writes synthetic.mp4 and a data/<class>/<video>/{frames,masked,masked.npz} dataset."""
+    import cv2
+    from benchmarks.frame_preprocessor import make_masked_frames
+    from utils.compact_storage import COMPACT_CLIP_FILE, save_compact_clip
+    from utils.data_utils import MASKED_FRAMES_DIR
+
+    height, width = FRAME_SHAPE
+    writer = cv2.VideoWriter(os.path.join(workdir, "synthetic.mp4"), cv2.VideoWriter_fourcc(*'mp4v'), 30.0, (width, height))
+    for frame in synthetic_frames(90, seed=0):
+        writer.write(frame)
+    writer.release()
+
+    for c in range(SYNTHETIC_CLASSES):
+        for v in range(SYNTHETIC_VIDEOS_PER_CLASS):
+            seed = c * SYNTHETIC_VIDEOS_PER_CLASS + v
+            video_dir = os.path.join(workdir, "data", f"sign_{c}", f"video_{v}")
+            frames_dir, masked_dir = os.path.join(video_dir, "frames"), os.path.join(video_dir, MASKED_FRAMES_DIR)
+            os.makedirs(frames_dir)
+            os.makedirs(masked_dir)
+            masked = make_masked_frames(SYNTHETIC_FRAMES, height, width, seed=seed)
+            for i, (frame, masked_frame) in enumerate(zip(synthetic_frames(SYNTHETIC_FRAMES, seed), masked)):
+                cv2.imwrite(os.path.join(frames_dir, f"frame_{i:04d}.jpg"), frame)
+                cv2.imwrite(os.path.join(masked_dir, f"frame_{i:04d}.png"), masked_frame)
+            save_compact_clip(os.path.join(video_dir, COMPACT_CLIP_FILE), masked)
+
+
+# --- Stages ---
+
+def stage_extract_frames(workdir, quick):
+    from utils.preprocessing import extract_frames
+    out_dir = os.path.join(workdir, "extracted")
+
+    def run():
+        shutil.rmtree(out_dir, ignore_errors=True)
+        extract_frames(os.path.join(workdir, "synthetic.mp4"), out_dir)
+
+    seconds = median_seconds(run, 1 if quick else 3)
+    return [metric('extract_frames.per_frame', seconds / len(os.listdir(out_dir)) * 1000, 'ms')]
+
+def stage_mask(workdir, quick):
+    import cv2
+    from configs import config
+    from utils.data_utils import apply_mediapipe_mask_and_grayscale, get_hands_detector
+
+    frames = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in synthetic_frames(8 if quick else 32, seed=0)]
+    detector = get_hands_detector()
+
+    def run():
+        for frame in frames:
+            apply_mediapipe_mask_and_grayscale(frame, detector)
+
+    seconds = median_seconds(run, 1 if quick else 3)
+    return [metric('mask.per_frame', seconds / len(frames) * 1000, 'ms', backend=config.MASKING_BACKEND)]
+
+def stage_transforms(workdir, quick):
+    from configs import config
+    from benchmarks.frame_preprocessor import make_masked_frames
+    from utils.data_utils import build_transforms
+
+    frames = make_masked_frames(8 if quick else 32, *FRAME_SHAPE)
+    results = []
+    for uint8_output in (False, True):
+        train_transform, val_transform = build_transforms(config.INPUT_SIZE, uint8_output)
+        for name, transform in (('train', train_transform), ('val', val_transform)):
+            seconds = median_seconds(lambda: [transform(f) for f in frames], 2 if quick else 5)
+            results.append(metric(f'transforms.{name}{".uint8" if uint8_output else ""}.per_frame',
+                                  seconds / len(frames) * 1000, 'ms', input_size=config.INPUT_SIZE))
+    return results
+
+def stage_dataset(workdir, quick):
+    from configs import config
+    from utils.data_utils import SignLanguageDataset, build_transforms
+
+    train_transform, _ = build_transforms(config.INPUT_SIZE, config.UINT8_DATA_PATH)
+    results = []
+    for backend in ('files', 'compact'):
+        dataset = SignLanguageDataset(os.path.join(workdir, "data"), transform=train_transform,
+                                      sequence_length=config.SEQUENCE_LENGTH, uint8_output=config.UINT8_DATA_PATH,
+                                      backend=backend)
+        indices = range(min(len(dataset), 8 if quick else len(dataset)))
+        seconds = median_seconds(lambda: [dataset[i] for i in indices], 1 if quick else 3)
+        results.append(metric(f'dataset.getitem.{backend}', seconds / len(indices) * 1000, 'ms',
+                              sequence_length=config.SEQUENCE_LENGTH, masking=config.MASKING_BACKEND))
+    return results
+
+def stage_dataloader(workdir, quick, worker_counts):
+    from configs import config
+    from utils.data_utils import get_data_loaders
+
+    results = []
+    for num_workers in worker_counts:
+        train_loader, _, _ = get_data_loaders(
+            data_dir=os.path.join(workdir, "data"), batch_size=4, sequence_length=config.SEQUENCE_LENGTH,
+            input_size=config.INPUT_SIZE, num_workers=num_workers, validation_split=config.VALIDATION_SPLIT,
+            frame_cache_bytes=0)
+        epochs = 1 if quick else 2
+        start = time.perf_counter()
+        samples = 0
+        for _ in range(epochs):
+            for batch in train_loader:
+                samples += len(batch[1])
+        elapsed = time.perf_counter() - start # Includes worker startup, as a real epoch does
+        results.append(metric(f'dataloader.epoch.workers{num_workers}', samples / elapsed, 'samples/s',
+                              higher_is_better=True, num_workers=num_workers))
+    return results
+
+def stage_model(workdir, quick, batch_sizes, sequence_lengths, input_sizes):
+    import torch
+    import torch.nn as nn
+    from configs import config
+    from models import SignLanguageModel
+
+    torch.manual_seed(0)
+    criterion = nn.CrossEntropyLoss()
+    results = []
+    for input_size in input_sizes:
+        model = SignLanguageModel(num_classes=SYNTHETIC_CLASSES, input_size=input_size, hidden_size=config.HIDDEN_SIZE,
+                                  dropout_rate=config.DROPOUT_RATE, bidirectional=config.BIDIRECTIONAL,
+                                  num_lstm_layers=config.NUM_LSTM_LAYERS, pretrained_backbone=False)
+        for batch_size in batch_sizes:
+            for sequence_length in sequence_lengths:
+                x = torch.randn(batch_size, sequence_length, 1, input_size, input_size)
+                labels = torch.randint(0, SYNTHETIC_CLASSES, (batch_size,))
+                params = dict(batch_size=batch_size, sequence_length=sequence_length, input_size=input_size)
+                key = f"b{batch_size}.t{sequence_length}.s{input_size}"
+
+                model.eval()
+                with torch.inference_mode():
+                    seconds = median_seconds(lambda: model(x), 2 if quick else 5)
+                results.append(metric(f'model.forward.{key}', seconds * 1000, 'ms', **params))
+
+                model.train()
+                def train_step():
+                    model.zero_grad(set_to_none=True)
+                    criterion(model(x), labels).backward()
+                seconds = median_seconds(train_step, 2 if quick else 5)
+                results.append(metric(f'model.forward_backward.{key}', seconds * 1000, 'ms', **params))
+    return results
+
+def run_stage(name, workdir, args):
+    if name == 'dataloader':
+        return stage_dataloader(workdir, args.quick, args.workers)
+    if name == 'model':
+        return stage_model(workdir, args.quick, args.batch_sizes, args.sequence_lengths, args.input_sizes)
+    return globals()[f'stage_{name}'](workdir, args.quick)
+
+
+# --- Fingerprint and comparison ---
+
+def machine_fingerprint():
+    import cv2
+    import numpy as np
+    import torch
+    cpu_model = platform.processor()
+    try:
+        with open('/proc/cpuinfo') as f:
+            cpu_model = next((line.split(':', 1)[1].strip() for line in f if line.startswith('model name')), cpu_model)
+    except OSError:
+        pass
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'cpu': cpu_model,
+        'cpu_count': os.cpu_count(),
+        'torch_threads': torch.get_num_threads(),
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'cuda_device': torch.cuda.get_device_name(0) if torch.cuda.is_available() else None,
+        'git_commit': commit,
+    }
+
+def compare(baseline, current, threshold):
+    """Prints every shared metric's change; returns the names that regressed by more than `threshold`."""
+    fingerprint_keys = ('cpu', 'cpu_count', 'torch', 'python')
+    differing = [k for k in fingerprint_keys if baseline['fingerprint'].get(k) != current['fingerprint'].get(k)]
+    if differing:
+        print(f"Warning: Runs come from different machines or environments ({', '.join(differing)} differ); "
+              f"timings may not be comparable.")
+    base_metrics = {m['name']: m for m in baseline['metrics']}
+    regressions = []
+    for m in current['metrics']:
+        base = base_metrics.get(m['name'])
+        if base is None or not base['value']:
+            continue
+        change = (m['value'] - base['value']) / base['value']
+        worse = -change if m['higher_is_better'] else change
+        flag = ""
+        if worse > threshold:
+            regressions.append(m['name'])
+            flag = "  REGRESSION"
+        elif worse < -threshold:
+            flag = "  improved"
+        print(f"  {m['name']:45s} {base['value']:10.3f} -> {m['value']:10.3f} {m['unit']:10s} {change:+7.1%}{flag}")
+    return regressions
+
+
+def add_stage_options(parser):
+    parser.add_argument('--quick', action='store_true', help="Fewer repeats and samples (smoke test).")
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, 4])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--sequence-lengths', type=int, nargs='+', default=[8, 16])
+    parser.add_argument('--input-sizes', type=int, nargs='+', default=[112, 128])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the preprocessing, data loading and model hot paths.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help="Run the benchmarks and write JSON results.")
+    run_parser.add_argument('--output', default='benchmark_results.json')
+    run_parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    add_stage_options(run_parser)
+    compare_parser = subparsers.add_parser('compare', help="Flag regressions of a run against a baseline.")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help="Allowed relative slowdown (0.10 = 10%%).")
+    compare_parser.add_argument('--rss-threshold', type=float, default=0.20, help="Allowed relative peak RSS growth.")
+    # Internal: one stage in a fresh process (started by `run`)
+    stage_parser = subparsers.add_parser('stage')
+    stage_parser.add_argument('name', choices=STAGES)
+    stage_parser.add_argument('--workdir', required=True)
+    stage_parser.add_argument('--result', required=True)
+    add_stage_options(stage_parser)
+    args = parser.parse_args()
+
+    if args.command == 'stage':
+        results = run_stage(args.name, args.workdir, args)
+        rss_self, rss_children = peak_rss_bytes()
+        with open(args.result, 'w') as f:
+            json.dump({'metrics': results, 'peak_rss_bytes': rss_self, 'peak_rss_children_bytes': rss_children}, f)
+        return
+
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        print(f"{args.current} vs {args.baseline} (threshold {args.threshold:.0%}, RSS {args.rss_threshold:.0%}):")
+        regressions = compare(baseline, current, args.threshold)
+        base_rss = {s: r.get('peak_rss_bytes') for s, r in baseline.get('stages', {}).items()}
+        for stage, r in current.get('stages', {}).items():
+            if 'error' in r:
+                print(f"  {stage} failed in this run  REGRESSION")
+                regressions.append(stage)
+            elif base_rss.get(stage) and (r['peak_rss_bytes'] - base_rss[stage]) / base_rss[stage] > args.rss_threshold:
+                print(f"  {stage} peak RSS {base_rss[stage] / 2**20:.0f} -> {r['peak_rss_bytes'] / 2**20:.0f} MiB  REGRESSION")
+                regressions.append(f"{stage}.peak_rss")
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions.")
+        return
+
+    workdir = tempfile.mkdtemp(prefix="signlang_bench_")
+    try:
+        print(f"Generating synthetic data in {workdir}...")
+        make_workdir(workdir)
+        report = {'fingerprint': machine_fingerprint(), 'time': time.time(), 'quick': args.quick, 'stages': {}, 'metrics': []}
+        stage_flags = ['--workers', *map(str, args.workers), '--batch-sizes', *map(str, args.batch_sizes),
+                       '--sequence-lengths', *map(str, args.sequence_lengths), '--input-sizes', *map(str, args.input_sizes)]
+        if args.quick:
+            stage_flags.append('--quick')
+        for stage in args.stages:
+            result_path = os.path.join(workdir, f"{stage}.json")
+            print(f"--- {stage} ---")
+            start = time.perf_counter()
+            proc = subprocess.run([sys.executable, '-m', 'benchmarks.suite', 'stage', stage, '--workdir', workdir,
+                                   '--result', result_path, *stage_flags], stdout=subprocess.DEVNULL)
+            if proc.returncode != 0 or not os.path.exists(result_path):
+                print(f"  Stage {stage} failed (exit code {proc.returncode}); skipped.")
+                report['stages'][stage] = {'error': proc.returncode}
+                continue
+            with open(result_path) as f:
+                result = json.load(f)
+            report['stages'][stage] = {'seconds': time.perf_counter() - start, 'peak_rss_bytes': result['peak_rss_bytes'],
+                                       'peak_rss_children_bytes': result['peak_rss_children_bytes']}
+            report['metrics'].extend(result['metrics'])
+            for m in result['metrics']:
+                print(f"  {m['name']:45s} {m['value']:10.3f} {m['unit']}")
+            print(f"  peak RSS {result['peak_rss_bytes'] / 2**20:.0f} MiB "
+                  f"(workers {result['peak_rss_children_bytes'] / 2**20:.0f} MiB)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
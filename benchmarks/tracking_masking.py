@@ -0,0 +1,78 @@
+"""Offline masking throughput and mask agreement: static-image vs per-video tracking MediaPipe.
+
+Each video is sampled at TARGET_FPS and masked twice: once with a
+static-image detector (palm detection on every frame) and once in order with
+a fresh tracking-mode detector (data_utils.mask_video_frames). Agreement is
+the IoU of the two masks (non-zero pixels of the masked frames) per frame.
+
+Usage:
+    python -m benchmarks.tracking_masking data/raw --videos 20
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from configs import config
+from predict_batch import find_videos
+from utils.data_utils import apply_mediapipe_mask_and_grayscale, create_hands_detector, mask_video_frames
+from utils.preprocessing import iter_video_frames
+
+
+def mask_static(frames):
+    detector = create_hands_detector(static_image_mode=True)
+    try:
+        return [apply_mediapipe_mask_and_grayscale(cv2.cvtColor(f, cv2.COLOR_BGR2RGB), detector=detector) for f in frames]
+    finally:
+        detector.close()
+
+def mask_iou(a, b):
+    """IoU of the hand regions of two masked frames; 1.0 when both are empty."""
+    a, b = a > 0, b > 0
+    union = np.count_nonzero(a | b)
+    return 1.0 if union == 0 else np.count_nonzero(a & b) / union
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare static-image and tracking-mode offline masking.")
+    parser.add_argument('inputs', nargs='+', help="Video files, directories or glob patterns.")
+    parser.add_argument('--videos', type=int, default=20, help="Max videos to measure.")
+    args = parser.parse_args()
+
+    video_paths = find_videos(args.inputs)[:args.videos]
+    if not video_paths:
+        print("No videos found.")
+        return
+
+    static_time = tracking_time = 0.0
+    total_frames = 0
+    ious, presence_agree = [], []
+    for video_path in video_paths:
+        frames = list(iter_video_frames(video_path, target_fps=config.TARGET_FPS))
+        if not frames:
+            continue
+        start = time.perf_counter()
+        static_masks = mask_static(frames)
+        static_time += time.perf_counter() - start
+        start = time.perf_counter()
+        tracking_masks = list(mask_video_frames(frames, tracking=True))
+        tracking_time += time.perf_counter() - start
+
+        total_frames += len(frames)
+        for s, t in zip(static_masks, tracking_masks):
+            ious.append(mask_iou(s, t))
+            presence_agree.append(bool(s.any()) == bool(t.any()))
+
+    if total_frames == 0:
+        print("No frames decoded.")
+        return
+    ious = np.array(ious)
+    print(f"{len(video_paths)} videos, {total_frames} frames at {config.TARGET_FPS} fps:")
+    print(f"  static-image: {total_frames / static_time:7.1f} frames/s")
+    print(f"  tracking:     {total_frames / tracking_time:7.1f} frames/s ({static_time / tracking_time:.2f}x)")
+    print(f"  mask IoU: mean {ious.mean():.3f} | median {np.median(ious):.3f} | "
+          f"frames with IoU < 0.5: {np.mean(ious < 0.5):.1%}")
+    print(f"  hands-present agreement: {np.mean(presence_agree):.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Throughput and memory scaling of InferenceWorkerPool with the number of workers.
+
+Runs on randomly initialized weights unless --model/--class-names point at a
+trained checkpoint. Reports clips/s, scaling efficiency against one worker, and
+per-worker USS (private memory) next to the total PSS of the pool.
+"""
+import argparse
+import json
+import time
+
+import torch
+
+from configs import config
+from models import SignLanguageModel
+from utils.inference import SignPredictor
+from utils.worker_pool import InferenceWorkerPool, get_process_memory
+from benchmarks.load_test import make_synthetic_clip
+
+
+def build_predictor(args):
+    if args.model:
+        return SignPredictor(model_path=args.model, class_names_file=args.class_names, device=torch.device('cpu'))
+    class_names = [f"class_{i}" for i in range(args.num_classes)]
+    model = SignLanguageModel(num_classes=len(class_names), input_size=config.INPUT_SIZE,
+                              hidden_size=config.HIDDEN_SIZE, dropout_rate=config.DROPOUT_RATE,
+                              bidirectional=config.BIDIRECTIONAL, num_lstm_layers=config.NUM_LSTM_LAYERS,
+                              pretrained_backbone=False)
+    return SignPredictor(model=model, class_names=class_names, device=torch.device('cpu'))
+
+def run_trial(predictor, num_workers, clip, num_clips, threads_per_worker):
+    with InferenceWorkerPool(predictor, num_workers, threads_per_worker) as pool:
+        # Warm up every worker (MediaPipe graph creation, first forward)
+        for future in [pool.submit_clip(clip) for _ in range(num_workers)]:
+            future.result()
+        start = time.perf_counter()
+        futures = [pool.submit_clip(clip) for _ in range(num_clips)]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+        worker_memory = [get_process_memory(pid) for pid in pool.pids]
+    return elapsed, worker_memory
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared-weight inference worker pool.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clips', type=int, default=64, help="Clips classified per trial.")
+    parser.add_argument('--frames', type=int, default=30, help="Frames per synthetic clip.")
+    parser.add_argument('--threads-per-worker', type=int, default=config.WORKER_TORCH_THREADS)
+    parser.add_argument('--num-classes', type=int, default=10)
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--class-names', default=config.CLASS_NAMES_FILE)
+    parser.add_argument('--output', default=None, help="Optional JSON file for the results.")
+    args = parser.parse_args()
+
+    predictor = build_predictor(args)
+    weight_bytes = sum(p.numel() * p.element_size() for p in predictor.model.parameters())
+    clip = list(make_synthetic_clip(args.frames, 480, 640))
+    parent_memory = get_process_memory()
+    print(f"Model weights: {weight_bytes / 2**20:.1f} MiB | parent RSS: {parent_memory.get('rss', 0) / 2**20:.0f} MiB")
+
+    results = []
+    base_throughput = None
+    for num_workers in args.workers:
+        elapsed, worker_memory = run_trial(predictor, num_workers, clip, args.clips, args.threads_per_worker)
+        throughput = args.clips / elapsed
+        base_throughput = base_throughput or throughput / num_workers
+        efficiency = throughput / (base_throughput * num_workers)
+        uss = [m.get('uss', 0) for m in worker_memory]
+        pss_total = sum(m.get('pss', 0) for m in worker_memory)
+        result = {
+            'workers': num_workers,
+            'clips_per_s': throughput,
+            'scaling_efficiency': efficiency,
+            'mean_worker_uss_mib': sum(uss) / len(uss) / 2**20 if uss else None,
+            'total_worker_pss_mib': pss_total / 2**20,
+        }
+        results.append(result)
+        print(f"workers={num_workers:2d} | {throughput:6.2f} clips/s | efficiency {efficiency * 100:5.1f}% | "
+              f"USS/worker {result['mean_worker_uss_mib'] or 0:.0f} MiB | total PSS {result['total_worker_pss_mib']:.0f} MiB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'weight_mib': weight_bytes / 2**20, 'results': results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,14 @@ PROCESSED_DATA_DIR = "data/processed"
 INPUT_SIZE = 128
 SEQUENCE_LENGTH = 16
 VALIDATION_SPLIT = 0.2 # <-- ADDED: Validation split ratio
+TARGET_FPS = 10 # Frame rate videos are sampled at (matches extract_frames default)
+CROP_TO_HANDS = False # Crop masked frames to a padded box around the hands before resizing (utils/hand_crop.py)
+HAND_CROP_PADDING = 0.15 # Padding on each side, as a fraction of the hand box's longer side
+HAND_CROP_MIN_SIZE = 64 # Smallest crop side in source pixels, so a distant hand isn't blown up
+HAND_CROP_SMOOTHING = 0.3 # EMA factor for the live crop box (1 = follow the current frame only)
+MASKING_BACKEND = "mediapipe" # "mediapipe" (MediaPipe Hands) or "skin" (YCrCb skin + MOG2, utils/skin_masking.py)
+OFFLINE_TRACKING_MASKING = True # Mask each video's frames in order with a per-video tracking-mode detector
+DATASET_BACKEND = "auto" # "auto": per-video masked.npz if present, else frame files; "compact"; "files"
 
 # Model parameters
 HIDDEN_SIZE = 256
@@ -23,6 +31,23 @@ EARLY_STOPPING_PATIENCE = 20
 REDUCE_LR_PATIENCE = 8 
 REDUCE_LR_FACTOR = 0.5 # Renamed from factor for clarity if needed, but keeping as is for now
 NUM_WORKERS = 2 # <-- ADDED: Number of workers for DataLoader (start with 0)
+PERSISTENT_WORKERS = False # Keep DataLoader workers alive between epochs
+FRAME_CACHE_BYTES = 0 # Shared-memory LRU cache of masked frames across workers and epochs, taken from /dev/shm (0 disables; e.g. 512 * 2**20 with NUM_WORKERS > 0)
+FRAME_CACHE_SLOT_BYTES = 160 * 1024 # Largest cached hand crop (frames are stored as their non-zero box)
+DDP_BACKEND = "gloo" # torch.distributed backend when train.py runs under torchrun (CPU data parallel)
+LOG_INTERVAL = 10 # Batches between progress lines; running loss/accuracy are only read from the device then
+DDP_TORCH_THREADS = 0 # torch threads per training process under torchrun (0 = host cores / processes on the host)
+UINT8_DATA_PATH = True # Keep frames uint8 through the DataLoader; the model normalizes them on-device
+VARIABLE_LENGTH_CLIPS = True # Short videos keep their true length (padded per batch, packed LSTM) instead of repeating the last frame
+CLIPS_PER_VIDEO = 1 # Random training windows drawn per video load; >1 shares decoding/masking between overlapping windows
+
+# Runtime profile (autotune.py); applied at startup by train.py, evaluate.py and detect.py
+RUNTIME_PROFILE_PATH = "runtime_profile.json" # Tuned values overriding the ones below; ignored if missing
+PREFETCH_FACTOR = 2 # Batches each DataLoader worker loads ahead
+DATALOADER_WORKER_THREADS = 1 # torch and OpenCV threads inside each DataLoader worker (0 = library defaults)
+TORCH_THREADS = 0 # torch intra-op threads in the main process (0 = torch default)
+TORCH_INTEROP_THREADS = 0 # torch inter-op threads in the main process (0 = torch default)
+CV2_THREADS = -1 # OpenCV threads in the main process (-1 = OpenCV default)
 
 # Detection parameters
 MOTION_THRESHOLD = 0.002 # Default motion threshold
@@ -30,10 +55,41 @@ CONFIDENCE_THRESHOLD = 0.7 # Increased default confidence threshold
 NEUTRAL_HANDICAP = 0.3     # Value to subtract from neutral class probability
 HISTORY_SIZE = 5
 
+# Runtime metrics (utils/runtime_metrics.py; detect.py, predict_video.py)
+METRICS_EXPORT_PATH = None # File metrics are exported to (None: collect only); e.g. "metrics.jsonl" or "metrics.prom"
+METRICS_EXPORT_FORMAT = "auto" # "jsonl", "prometheus" or "auto" (prometheus for a .prom path)
+METRICS_EXPORT_INTERVAL = 10 # Seconds between exports
+
+# Capture parameters (utils/capture_videos.py)
+CAPTURE_WORKERS = 2 # Background threads sampling/masking frames while recording
+
+# Long-video segmentation parameters (segment_video.py)
+SEGMENT_STRIDE = 2 # Frames (at TARGET_FPS) between consecutive sliding windows
+SEGMENT_MIN_WINDOWS = 2 # Windows that must agree before a segment is emitted
+
+# Serving parameters (serve.py)
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8080
+SERVE_MAX_BATCH_SIZE = 8 # Max clips combined into one model forward
+SERVE_MAX_BATCH_WAIT_MS = 10 # How long the batcher waits for more clips before running
+SERVE_PREPROCESS_THREADS = 2 # Threads decoding/masking frames (one MediaPipe instance each)
+SERVE_STREAM_STRIDE = 4 # Predict every Nth frame on a WebSocket stream once the buffer is full
+SERVE_WORKERS = 0 # >0 runs inference in forked worker processes sharing the model weights
+WORKER_TORCH_THREADS = 1 # torch intra-op threads per inference worker process
+
 # Paths
 MODEL_SAVE_DIR = "saved_models"
 # Ensure class names file path is relative to the save directory
 CLASS_NAMES_FILE = os.path.join(MODEL_SAVE_DIR, "class_names.txt")
 BEST_MODEL_PATH = os.path.join(MODEL_SAVE_DIR, "best_model.pth")
+MODEL_BUNDLE_PATH = os.path.join(MODEL_SAVE_DIR, "model_bundle.pt") # Weights + architecture + class names (utils/model_bundle.py); preferred when present
+CHECKPOINT_DIR = os.path.join(MODEL_SAVE_DIR, "checkpoints") # Full training state for train.py --resume
+CHECKPOINT_INTERVAL = 1 # Epochs between full checkpoints
+CHECKPOINT_KEEP_LAST = 3 # Older checkpoints are deleted
+EVAL_MANIFEST_PATH = os.path.join(MODEL_SAVE_DIR, "eval_manifest.json") # Ordered evaluation clips for evaluate.py (created from the validation split if missing)
+EVAL_LOGITS_PATH = os.path.join(MODEL_SAVE_DIR, "eval_logits.npz") # Per-sample logits written by evaluate.py
+PROFILE_DIR = "profiles" # torch.profiler traces from train.py --profile (open with TensorBoard)
+PROFILE_WAIT_STEPS = 5 # Training steps skipped before the profiled window (plus one warm-up step)
+PROFILE_ACTIVE_STEPS = 10 # Training steps recorded in the trace
 
 # Note: The last 'import os' was redundant and has been removed.
\ No newline at end of file
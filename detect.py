@@ -2,56 +2,38 @@
 import cv2
 import torch
 import numpy as np
-from torchvision import transforms
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import os
 import time
-import mediapipe as mp # Import MediaPipe
 
-from models import SignLanguageModel
 from configs import config # Import config directly
+from utils.data_utils import create_hands_detector, apply_mediapipe_mask_and_grayscale as apply_mask_and_grayscale
+from utils.frame_preprocessor import FramePreprocessor
+from utils.hand_crop import HandBoxTracker, crop_frame
+from utils.runtime_metrics import get_registry, start_exporter
+from utils.frame_sources import CameraSource, WindowSink
+from utils.runtime_profile import apply_runtime_profile
+from utils.model_bundle import apply_bundle_settings, load_inference_model
+
+HAND_RATE_SMOOTHING = 0.05 # EMA factor of the hand_detection_rate gauge (~20 frames)
 
 # --- Global variable & Lazy Init Function ---
 hands_detector_instance_rt = None
 
 def get_hands_detector_rt():
-    """Initializes and returns the MediaPipe Hands detector instance for real-time."""
+    """Initializes and returns the hand detector instance for real-time (tracking mode)."""
     global hands_detector_instance_rt
     if hands_detector_instance_rt is None:
-        print("  [MediaPipe RT] Initializing Hands detector...")
-        mp_hands = mp.solutions.hands
-        hands_detector_instance_rt = mp_hands.Hands(
-            static_image_mode=False, # False for real-time tracking
-            max_num_hands=2,
-            min_detection_confidence=0.6, # Confidence for detection
-            min_tracking_confidence=0.5  # Confidence for tracking
-        )
-        print("  [MediaPipe RT] Hands detector initialized.")
+        print(f"  [Masking RT] Initializing {config.MASKING_BACKEND} hand detector...")
+        hands_detector_instance_rt = create_hands_detector(static_image_mode=False) # Frames arrive in order
+        print("  [Masking RT] Hand detector initialized.")
     return hands_detector_instance_rt
 
 def apply_mediapipe_mask_and_grayscale(image_rgb):
-    """Applies MediaPipe Hands segmentation mask and converts to grayscale."""
+    """Applies the hand segmentation mask and converts to grayscale."""
     detector = get_hands_detector_rt() # Use the lazy init function for real-time
-    image_rgb.flags.writeable = False
-    results = detector.process(image_rgb)
-    image_rgb.flags.writeable = True
-    mask = np.zeros(image_rgb.shape[:2], dtype=np.uint8)
-    if results.multi_hand_landmarks:
-        for hand_landmarks in results.multi_hand_landmarks:
-            landmark_points = np.array([(lm.x * image_rgb.shape[1], lm.y * image_rgb.shape[0])
-                                        for lm in hand_landmarks.landmark], dtype=np.int32)
-            landmark_points[:, 0] = np.clip(landmark_points[:, 0], 0, image_rgb.shape[1] - 1)
-            landmark_points[:, 1] = np.clip(landmark_points[:, 1], 0, image_rgb.shape[0] - 1)
-            if len(landmark_points) >= 3:
-                try:
-                    hull = cv2.convexHull(landmark_points)
-                    cv2.fillConvexPoly(mask, hull, 255)
-                except Exception as e:
-                     print(f"Warning: Hull failed: {e}")
-                     for point in landmark_points: cv2.circle(mask, tuple(point), 5, (255), -1)
-    gray_source = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2GRAY)
-    masked_gray_image = cv2.bitwise_and(gray_source, gray_source, mask=mask)
-    return masked_gray_image, mask # Return mask for visualization
+    return apply_mask_and_grayscale(image_rgb, detector=detector, return_mask=True) # Mask is kept for visualization
 
 def load_class_names(file_path):
     """Load class names from file."""
@@ -60,57 +42,54 @@ def load_class_names(file_path):
         with open(file_path, 'r') as f: return [line.strip() for line in f.readlines()]
     except Exception as e: print(f"Error reading class names: {e}"); return None
 
-def load_model(model_path, num_classes, device):
-    """Load a trained model (expecting 1 input channel)."""
-    model = SignLanguageModel(num_classes=num_classes, input_size=config.INPUT_SIZE, hidden_size=config.HIDDEN_SIZE, dropout_rate=config.DROPOUT_RATE, bidirectional=config.BIDIRECTIONAL, num_lstm_layers=config.NUM_LSTM_LAYERS).to(device)
-    if not os.path.exists(model_path): print(f"Error: Model not found at {model_path}"); return None
-    try:
-        if hasattr(torch, 'load') and 'weights_only' in torch.load.__code__.co_varnames:
-             model.load_state_dict(torch.load(model_path, map_location=device, weights_only=True))
-        else:
-             model.load_state_dict(torch.load(model_path, map_location=device)) # type: ignore
-        model.eval(); return model
-    except Exception as e: print(f"Error loading model: {e}"); return None
-
-
-def real_time_detection():
-    """Run real-time detection from webcam with masking."""
-    model_path = config.BEST_MODEL_PATH
-    class_names_file = config.CLASS_NAMES_FILE
-    class_names = load_class_names(class_names_file)
-    if class_names is None: return
-    num_classes = len(class_names)
+
+def real_time_detection(frame_source=None, sink=None, model=None, class_names=None, on_frame_result=None):
+    """Run real-time detection from webcam with masking.
+
+    frame_source (default: the first camera that opens) and sink (default:
+    an OpenCV window) come from utils/frame_sources.py, so recorded or
+    synthetic sessions can be replayed headless. A model and class list can
+    be passed instead of loading them; by default the model bundle is
+    loaded and its input size, sequence length and masking override config.
+    on_frame_result, if given, is called with a dict per displayed frame:
+    frame index, overlay text, predicted index, confidence and latency from
+    frame read to display.
+    """
+    model_loading = None
+    if model is None: # Build and load the model while the camera opens
+        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-load')
+        model_loading = loader.submit(load_inference_model, device)
+        loader.shutdown(wait=False)
+    elif class_names is None:
+        class_names = load_class_names(config.CLASS_NAMES_FILE)
+        if class_names is None: return
+
+    if frame_source is None:
+        try:
+            frame_source = CameraSource()
+        except RuntimeError as e:
+            print(e)
+            return
+    if model_loading is not None:
+        model, metadata = model_loading.result()
+        if model is None:
+            frame_source.release()
+            return
+        apply_bundle_settings(metadata) # Preprocess frames the way the model was trained
+        class_names = class_names or metadata['class_names']
     neutral_idx = class_names.index('neutral') if 'neutral' in class_names else -1
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    model = load_model(model_path, num_classes, device)
-    if model is None: return
+    device = next(model.parameters()).device
     print(f"Model loaded. Using device: {device}")
+    sink = sink or WindowSink()
 
-    cap = None
-    for idx in [0, 1, 2]:
-        try:
-            cap = cv2.VideoCapture(idx)
-            if cap.isOpened():
-                break
-            else:
-                cap.release()
-        except Exception as e:
-            print(f"Error opening camera index {idx}: {e}")
-    if cap is None or not cap.isOpened():
-        print("Failed to open camera.")
-        return
-
-    # Transforms for grayscale input
-    normalize = transforms.Normalize(mean=[0.5], std=[0.5])
-    transform = transforms.Compose([
-        transforms.ToPILImage(),
-        transforms.Resize((config.INPUT_SIZE, config.INPUT_SIZE), interpolation=transforms.InterpolationMode.BILINEAR, antialias=True),
-        transforms.ToTensor(), # HxW -> 1xHxW
-        normalize
-    ])
+    # Resize/normalize into a preallocated ring of the last SEQUENCE_LENGTH frames
+    frame_buffer = FramePreprocessor(config.INPUT_SIZE, config.SEQUENCE_LENGTH)
+    # Crop mode follows the hands with a smoothed box (the whole clip isn't known up front)
+    hand_box = HandBoxTracker() if config.CROP_TO_HANDS else None
+    crop_box = None
 
     # Buffers and thresholds
-    frame_buffer = deque(maxlen=config.SEQUENCE_LENGTH)
     prediction_history = deque(maxlen=config.HISTORY_SIZE)
     motion_threshold = config.MOTION_THRESHOLD # May need adjustment
     confidence_threshold = config.CONFIDENCE_THRESHOLD
@@ -119,6 +98,23 @@ def real_time_detection():
     prev_frame_gray = None
     motion_history = deque(maxlen=5) # Average over last 5 frames
 
+    # Runtime metrics (always collected; exported when config.METRICS_EXPORT_PATH is set)
+    metrics = get_registry()
+    capture_ms = metrics.histogram('capture_ms', "Camera read latency (ms)")
+    mask_ms = metrics.histogram('mask_ms', "Hand masking latency (ms)")
+    transform_ms = metrics.histogram('transform_ms', "Crop + resize/normalize latency (ms)")
+    forward_ms = metrics.histogram('forward_ms', "Model forward + softmax latency (ms)")
+    render_ms = metrics.histogram('render_ms', "Overlay drawing + display latency (ms)")
+    frames_total = metrics.counter('frames_total', "Camera frames processed")
+    hands_total = metrics.counter('frames_with_hands_total', "Frames in which hands were found")
+    inferences_total = metrics.counter('inferences_total', "Model forwards")
+    skipped_filling = metrics.counter('inference_skipped_filling_total', "Frames without a forward: buffer still filling")
+    skipped_no_motion = metrics.counter('inference_skipped_no_motion_total', "Frames without a forward: motion below threshold")
+    buffer_depth = metrics.gauge('frame_buffer_depth', "Frames in the sequence ring buffer")
+    hand_rate = metrics.gauge('hand_detection_rate', "Fraction of recent frames with hands (EMA)")
+    exporter = start_exporter()
+    frame_index = -1
+
     print("Starting real-time detection (Grayscale & Masking - Lazy Init). Press 'q' to quit.")
     print(f"Motion Threshold: {motion_threshold:.6f} (+/- to adjust)")
     print(f"Confidence Threshold: {confidence_threshold:.2f}")
@@ -126,8 +122,13 @@ def real_time_detection():
 
     try:
         while True:
-            ret, frame = cap.read()
+            stage_start = time.perf_counter()
+            ret, frame = frame_source.read()
+            frame_ready = time.perf_counter() # Per-frame latency is measured from here to display
+            capture_ms.observe((frame_ready - stage_start) * 1000)
             if not ret: break
+            frame_index += 1
+            frames_total.inc()
 
             frame_height, frame_width, _ = frame.shape
             display_frame = frame.copy() # For showing original + overlays
@@ -152,6 +153,7 @@ def real_time_detection():
             # --- End Motion Detection ---
 
             # --- Preprocessing: Masking & Grayscaling ---
+            stage_start = time.perf_counter()
             frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             try:
                 # Calls lazy init function internally
@@ -159,18 +161,19 @@ def real_time_detection():
             except Exception as e:
                 print(f"Error in MediaPipe processing: {e}")
                 continue # Skip frame
-
-            transformed_frame = transform(processed_frame) # Apply resize/normalize
-
-            # Validate shape
-            if len(transformed_frame.shape) == 2: transformed_frame = transformed_frame.unsqueeze(0)
-            if transformed_frame.shape[0] != 1: transformed_frame = transformed_frame[0, :, :].unsqueeze(0)
-            if transformed_frame.shape[1] != config.INPUT_SIZE or transformed_frame.shape[2] != config.INPUT_SIZE:
-                 resize_op = transforms.Resize((config.INPUT_SIZE, config.INPUT_SIZE), antialias=True)
-                 transformed_frame = resize_op(transformed_frame)
-            if transformed_frame.shape[0] != 1: continue # Skip if still wrong
-
-            frame_buffer.append(transformed_frame)
+            mask_ms.observe((time.perf_counter() - stage_start) * 1000)
+            has_hands = cv2.countNonZero(mask_vis) > 0
+            if has_hands:
+                hands_total.inc()
+            hand_rate.set(hand_rate.value + HAND_RATE_SMOOTHING * (has_hands - hand_rate.value))
+
+            stage_start = time.perf_counter()
+            if hand_box is not None:
+                crop_box = hand_box.update(processed_frame)
+                processed_frame = crop_frame(processed_frame, crop_box)
+            frame_buffer.push(processed_frame) # Resize/normalize into the ring
+            transform_ms.observe((time.perf_counter() - stage_start) * 1000)
+            buffer_depth.set(len(frame_buffer))
             # --- End Preprocessing ---
 
             # --- Prediction Logic ---
@@ -183,7 +186,8 @@ def real_time_detection():
                                  (avg_motion > motion_threshold)
 
             if trigger_prediction:
-                input_tensor = torch.stack(list(frame_buffer)).unsqueeze(0).to(device) # (1, seq, 1, H, W)
+                stage_start = time.perf_counter()
+                input_tensor = frame_buffer.sequence().to(device) # (1, seq, 1, H, W)
                 with torch.no_grad():
                     outputs = model(input_tensor)
                     probs = torch.nn.functional.softmax(outputs, dim=1)
@@ -195,6 +199,8 @@ def real_time_detection():
                     predicted_idx = top_class_idx.item()
                     confidence = top_prob.item()
                     probabilities = probs[0].cpu().numpy()
+                forward_ms.observe((time.perf_counter() - stage_start) * 1000) # .item() above waited for the result
+                inferences_total.inc()
 
                 confidence_score = confidence * 100
                 if confidence > confidence_threshold:
@@ -221,12 +227,18 @@ def real_time_detection():
                  # Buffer is full but no motion detected
                  text = f"No motion"
                  prediction_history.clear() # Clear history if motion stops
+                 skipped_no_motion.inc()
+            else:
+                 skipped_filling.inc()
             # --- End Prediction Logic ---
 
             # --- Display ---
+            stage_start = time.perf_counter()
             # Overlay mask for visualization (optional)
             mask_colored = cv2.cvtColor(mask_vis, cv2.COLOR_GRAY2BGR)
             overlay = cv2.addWeighted(display_frame, 0.7, mask_colored, 0.3, 0)
+            if crop_box is not None:
+                cv2.rectangle(overlay, crop_box[:2], crop_box[2:], (255, 255, 0), 1)
 
             # Display prediction text
             cv2.putText(overlay, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
@@ -250,10 +262,13 @@ def real_time_detection():
                     color = (0, 255, 0) if idx == predicted_idx and confidence > confidence_threshold else (0, 165, 255) # Green if confident, Orange otherwise
                     cv2.rectangle(overlay, (150, text_y-bar_height+3), (150+bar_length, text_y+3), color, -1)
 
-            cv2.imshow('Sign Language Detection (Masked)', overlay)
+            key = sink.show(overlay)
+            render_ms.observe((time.perf_counter() - stage_start) * 1000)
             # --- End Display ---
+            if on_frame_result is not None:
+                on_frame_result({'frame': frame_index, 'text': text, 'predicted_idx': predicted_idx,
+                                 'confidence': confidence_score, 'latency_ms': (time.perf_counter() - frame_ready) * 1000})
 
-            key = cv2.waitKey(1) & 0xFF
             if key == ord('q'): break
             elif key == ord('+') or key == ord('='): # Increase threshold
                 motion_threshold *= 1.2
@@ -265,18 +280,20 @@ def real_time_detection():
     except KeyboardInterrupt: print("\nDetection interrupted.")
     except Exception as e: print(f"Error during detection: {e}"); import traceback; traceback.print_exc()
     finally:
-        if cap is not None: cap.release()
-        cv2.destroyAllWindows()
+        frame_source.release()
+        sink.close()
+        if exporter is not None: exporter.close() # Final snapshot
         # Close MediaPipe detector if it was initialized
         global hands_detector_instance_rt
         if hands_detector_instance_rt is not None:
-            print("  [MediaPipe RT] Closing Hands detector.")
+            print("  [Masking RT] Closing hand detector.")
             hands_detector_instance_rt.close()
             hands_detector_instance_rt = None
         print("Detection stopped.")
 
 
 def main():
+    apply_runtime_profile('inference')
     real_time_detection()
 
 if __name__ == "__main__":
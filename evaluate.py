@@ -1,148 +1,154 @@
-"""Evaluate the trained Sign Language Model on the validation set."""
+"""Evaluate one or more trained Sign Language Models on the evaluation manifest.
+
+All checkpoints given on the command line are scored in one pass over the
+preprocessed clips (see utils/evaluation.py):
+
+    python evaluate.py
+    python evaluate.py saved_models/model_bundle.pt runs/other/model_bundle.pt
+"""
+import argparse
 import os
 import torch
-import torch.nn as nn
-from torch.utils.data import DataLoader
 import numpy as np
-from sklearn.metrics import confusion_matrix, classification_report, accuracy_score
-import seaborn as sns # For plotting confusion matrix
-import matplotlib.pyplot as plt # For plotting confusion matrix
-import pandas as pd # For displaying confusion matrix nicely
+# pandas is imported once results exist, seaborn and matplotlib only to save the plot (fast startup)
 
 # Local imports
-from models import SignLanguageModel
-from utils.data_utils import get_data_loaders # To get the validation loader
+from utils.evaluation import check_compatible, evaluate_models, load_or_create_manifest, manifest_loader, save_logits
+from utils.metrics import metrics_from_confusion_matrix, per_class_metrics
+from utils.model_bundle import apply_bundle_settings, default_model_path, load_inference_model
+from utils.runtime_profile import apply_runtime_profile
 from configs import config # Import configuration
 
-def evaluate_model(model, data_loader, device, class_names):
-    """Evaluate the model on the given data loader."""
-    model.eval() # Set model to evaluation mode
-    all_labels = []
-    all_predictions = []
-
-    print("Starting evaluation...")
-    print(f"Using device: {device}")
-
-    with torch.no_grad(): # No need to track gradients during evaluation
-        # Iterate directly over data_loader (no tqdm needed here unless dataset is huge)
-        num_batches = len(data_loader)
-        for i, (sequences, labels) in enumerate(data_loader):
-            print(f"  Processing batch {i+1}/{num_batches}...")
-            sequences, labels = sequences.to(device), labels.to(device)
-
-            outputs = model(sequences)
-            _, predicted = torch.max(outputs.data, 1)
-
-            all_labels.extend(labels.cpu().numpy())
-            all_predictions.extend(predicted.cpu().numpy())
-
-    print("Evaluation finished.")
-
-    # Calculate metrics
-    print("\n--- Evaluation Results ---")
-    accuracy = accuracy_score(all_labels, all_predictions)
+def save_confusion_matrix_plot(cm_df, save_path):
+    """Plots a class-labelled confusion matrix DataFrame as a heatmap image."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.figure(figsize=(15, 12)) # Adjust size as needed for number of classes
+    sns.heatmap(cm_df, annot=True, fmt='d', cmap='Blues')
+    plt.title('Confusion Matrix')
+    plt.ylabel('Actual Class')
+    plt.xlabel('Predicted Class')
+    plt.xticks(rotation=45, ha='right')
+    plt.yticks(rotation=0)
+    plt.tight_layout()
+    plt.savefig(save_path)
+    plt.close() # Several checkpoints may be plotted in one run
+    # plt.show() # Uncomment to display the plot directly if running in an interactive environment
+
+def format_classification_report(cm, class_names):
+    """Per-class precision, recall, F1 and support from a confusion matrix, laid out like sklearn's report."""
+    per_class = per_class_metrics(cm)
+    width = max(len(name) for name in class_names + ['weighted avg'])
+    lines = [f"{'':>{width}s}  precision    recall  f1-score   support", ""]
+    for i, name in enumerate(class_names):
+        lines.append(f"{name:>{width}s}  {per_class['precision'][i]:9.2f} {per_class['recall'][i]:9.2f} "
+                     f"{per_class['f1'][i]:9.2f} {int(per_class['support'][i]):9d}")
+    total = int(np.asarray(cm).sum())
+    lines.append("")
+    lines.append(f"{'accuracy':>{width}s}  {'':9s} {'':9s} {metrics_from_confusion_matrix(cm)['accuracy']:9.2f} {total:9d}")
+    for average in ('macro', 'weighted'):
+        metrics = metrics_from_confusion_matrix(cm, average=average)
+        lines.append(f"{average + ' avg':>{width}s}  {metrics['precision']:9.2f} {metrics['recall']:9.2f} "
+                     f"{metrics['f1']:9.2f} {total:9d}")
+    return "\n".join(lines)
+
+def report_results(cm, class_names, plot_path):
+    """Prints accuracy, the classification report and the confusion matrix, and saves the matrix plot."""
+    import pandas as pd # For displaying confusion matrix nicely
+
+    accuracy = metrics_from_confusion_matrix(cm)['accuracy']
     print(f"Overall Accuracy: {accuracy:.4f}")
 
     # Classification Report (Precision, Recall, F1-score per class)
     print("\nClassification Report:")
-    # Use zero_division=0 to handle cases where a class might have no predictions
-    report = classification_report(all_labels, all_predictions, target_names=class_names, zero_division=0)
+    report = format_classification_report(cm, class_names)
     print(report)
 
-    # Confusion Matrix
-    print("\nConfusion Matrix:")
-    cm = confusion_matrix(all_labels, all_predictions)
-
     # Display Confusion Matrix using Pandas for better readability in console
+    print("\nConfusion Matrix:")
     cm_df = pd.DataFrame(cm, index=class_names, columns=class_names)
     print(cm_df)
 
     # Optional: Plot and save confusion matrix as an image
     try:
-        plt.figure(figsize=(15, 12)) # Adjust size as needed for number of classes
-        sns.heatmap(cm_df, annot=True, fmt='d', cmap='Blues')
-        plt.title('Confusion Matrix')
-        plt.ylabel('Actual Class')
-        plt.xlabel('Predicted Class')
-        plt.xticks(rotation=45, ha='right')
-        plt.yticks(rotation=0)
-        plt.tight_layout()
-        cm_save_path = os.path.join(config.MODEL_SAVE_DIR, "confusion_matrix.png")
-        plt.savefig(cm_save_path)
-        print(f"\nConfusion matrix plot saved to {cm_save_path}")
-        # plt.show() # Uncomment to display the plot directly if running in an interactive environment
+        save_confusion_matrix_plot(cm_df, plot_path)
+        print(f"\nConfusion matrix plot saved to {plot_path}")
     except Exception as e:
         print(f"\nCould not plot confusion matrix: {e}")
 
     return accuracy, report, cm
 
-def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate trained models on the evaluation manifest.")
+    parser.add_argument('checkpoints', nargs='*',
+                        help="Model bundles or weights, all scored in one pass (default: the bundle if present, else the best model).")
+    parser.add_argument('--manifest', default=config.EVAL_MANIFEST_PATH,
+                        help="Ordered evaluation clips; created from the validation split if missing.")
+    parser.add_argument('--data-dir', default=config.DATA_DIR)
+    parser.add_argument('--batch-size', type=int, default=None, help="Clips per batch (default: config.BATCH_SIZE).")
+    parser.add_argument('--logits-output', default=config.EVAL_LOGITS_PATH,
+                        help="Where to write per-sample logits ('' to skip).")
+    return parser.parse_args()
+
+def main(args=None):
     """Main evaluation function."""
+    args = args or parse_args()
+    apply_runtime_profile('train') # Same loader workers and batch size as training
     # Set device
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
-    # --- Load Class Names ---
-    class_names_path = config.CLASS_NAMES_FILE # From config
+    # --- Load Models and Class Names ---
+    checkpoints = args.checkpoints or [default_model_path()]
+    models, metadatas = [], []
+    for checkpoint in checkpoints:
+        model, metadata = load_inference_model(device, checkpoint)
+        if model is None:
+            return
+        models.append(model)
+        metadatas.append(metadata)
     try:
-        with open(class_names_path, 'r') as f:
-            class_names = [line.strip() for line in f.readlines()]
-        num_classes = len(class_names)
-        print(f"Loaded {num_classes} classes from {class_names_path}")
-    except FileNotFoundError:
-        print(f"Error: Class names file not found at {class_names_path}")
-        return
-    except Exception as e:
-        print(f"Error reading class names: {e}")
+        check_compatible(metadatas)
+    except ValueError as e:
+        print(f"Error: Cannot score these checkpoints in one pass: {e}")
         return
+    # A model bundle also sets the input size, sequence length and masking it was trained with
+    apply_bundle_settings(metadatas[0])
+    class_names = metadatas[0]['class_names']
+    print(f"Loaded {len(models)} model(s) with {len(class_names)} classes")
 
-    # --- Get Validation Data Loader ---
-    # We only need the validation loader, so we can ignore the train loader
-    print("\nLoading validation data...")
-    # Use num_workers=0 for evaluation simplicity unless it's very slow
-    # Set shuffle=False for validation/evaluation consistency
-    _, val_loader, _ = get_data_loaders(
-        data_dir=config.DATA_DIR,
-        batch_size=config.BATCH_SIZE, # Use configured batch size or a larger one if memory allows
-        sequence_length=config.SEQUENCE_LENGTH,
-        input_size=config.INPUT_SIZE,
-        num_workers=0, # Use 0 for simplicity here
-        validation_split=config.VALIDATION_SPLIT,
-        shuffle=False # Important: Don't shuffle validation data for consistent evaluation
-    )
-
-    if val_loader is None:
-        print("Error: Failed to create validation data loader. Exiting.")
-        return
-    print("Validation data loader created.")
-
-    # --- Initialize Model ---
-    print("\nInitializing model structure...")
-    model = SignLanguageModel(
-        num_classes=num_classes, # Use loaded number of classes
-        input_size=config.INPUT_SIZE,
-        hidden_size=config.HIDDEN_SIZE,
-        dropout_rate=config.DROPOUT_RATE,
-        bidirectional=config.BIDIRECTIONAL,
-        num_lstm_layers=config.NUM_LSTM_LAYERS
-    )
-
-    # --- Load Trained Weights ---
-    model_path = config.BEST_MODEL_PATH # From config
-    print(f"Loading trained weights from {model_path}")
+    # --- Get Evaluation Data Loader ---
+    print("\nLoading evaluation data...")
     try:
-        model.load_state_dict(torch.load(model_path, map_location=device))
-        print("Weights loaded successfully.")
-    except FileNotFoundError:
-        print(f"Error: Trained model file not found at {model_path}")
+        manifest = load_or_create_manifest(args.manifest, args.data_dir, config.VALIDATION_SPLIT)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not load or create the evaluation manifest: {e}")
         return
-    except Exception as e:
-        print(f"Error loading model weights: {e}")
+    if manifest['class_names'] != class_names:
+        print(f"Error: Manifest classes {manifest['class_names']} don't match the model's {class_names}.")
         return
-
-    model = model.to(device) # Move model to the appropriate device
+    # Worker count comes from config (or the autotuned runtime profile)
+    eval_loader = manifest_loader(manifest, args.data_dir, args.batch_size or config.BATCH_SIZE, config.NUM_WORKERS)
 
     # --- Run Evaluation ---
-    evaluate_model(model, val_loader, device, class_names)
+    print(f"Starting evaluation on {device}...")
+    confusion_matrices, logits, labels = evaluate_models(models, eval_loader, device, len(class_names))
+    print("Evaluation finished.")
+
+    for checkpoint, cm in zip(checkpoints, confusion_matrices):
+        print(f"\n--- Evaluation Results: {checkpoint} ---")
+        plot_name = "confusion_matrix.png" if len(checkpoints) == 1 else \
+            f"confusion_matrix_{os.path.splitext(os.path.basename(checkpoint))[0]}.png"
+        report_results(cm, class_names, os.path.join(config.MODEL_SAVE_DIR, plot_name))
+
+    if len(checkpoints) > 1:
+        print("\n--- Comparison ---")
+        for checkpoint, cm in zip(checkpoints, confusion_matrices):
+            macro, weighted = metrics_from_confusion_matrix(cm, 'macro'), metrics_from_confusion_matrix(cm, 'weighted')
+            print(f"  {checkpoint}: accuracy {macro['accuracy']:.4f} | macro F1 {macro['f1']:.4f} | weighted F1 {weighted['f1']:.4f}")
+
+    if args.logits_output:
+        save_logits(args.logits_output, logits, labels, manifest, checkpoints)
+        print(f"Per-sample logits written to {args.logits_output}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
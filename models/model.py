@@ -1,10 +1,13 @@
 import torch
 import torch.nn as nn
-import torchvision.models as models
 
 class SignLanguageModel(nn.Module):
+    # uint8 frames are mapped to (x/255 - INPUT_MEAN) / INPUT_STD (see normalize_input)
+    INPUT_MEAN = 0.5
+    INPUT_STD = 0.5
+
     def __init__(self, num_classes, input_size=128, hidden_size=256, dropout_rate=0.5,
-                 bidirectional=True, num_lstm_layers=2):
+                 bidirectional=True, num_lstm_layers=2, pretrained_backbone=True, cnn_output_features=None):
         super(SignLanguageModel, self).__init__()
 
         # --- DEBUG PRINT ---
@@ -12,7 +15,10 @@ class SignLanguageModel(nn.Module):
         # --- END DEBUG PRINT ---
 
         # --- CNN Feature Extractor (Example using ResNet18) ---
-        resnet = models.resnet18(weights=models.ResNet18_Weights.DEFAULT)
+        # ImageNet weights are only useful as a training starting point; skip the download
+        # when the weights are about to be overwritten by a checkpoint (or for benchmarks)
+        from torchvision.models import ResNet18_Weights, resnet18 # torchvision loads with the first model, not on import
+        resnet = resnet18(weights=ResNet18_Weights.DEFAULT if pretrained_backbone else None)
 
         # --- MODIFY THE FIRST CONV LAYER for 1 input channel (grayscale) ---
         original_conv1 = resnet.conv1
@@ -33,35 +39,35 @@ class SignLanguageModel(nn.Module):
         print(f"  [Model Init] CNN features defined. Determining output size with input_size={input_size}...")
         # --- END DEBUG PRINT ---
 
-        # Get the output feature size from the CNN dynamically
-        cnn_output_features = 0 # Initialize
-        try:
-            with torch.no_grad(): # No need to track gradients here
-                # --- DEBUG PRINT ---
-                print(f"    [Model Init] Creating dummy input (1, 1, {input_size}, {input_size})...")
-                # --- END DEBUG PRINT ---
-                dummy_input = torch.randn(1, 1, input_size, input_size) # Batch=1, Channels=1, H, W
-
-                # --- DEBUG PRINT ---
-                print("    [Model Init] Passing dummy input through self.cnn_features...")
-                # --- END DEBUG PRINT ---
-                dummy_output = self.cnn_features(dummy_input) # <--- PROBLEM LIKELY HERE
-                # --- DEBUG PRINT ---
-                print("    [Model Init] Dummy input passed through CNN.")
-                # --- END DEBUG PRINT ---
-
-                cnn_output_features = dummy_output.view(dummy_output.size(0), -1).shape[1]
-                # --- DEBUG PRINT ---
-                print(f"    [Model Init] Determined CNN output features: {cnn_output_features}")
-                # --- END DEBUG PRINT ---
-
-        except Exception as e:
-            print(f"  [Model Init] ERROR determining CNN output size: {e}")
-            print("  [Model Init] Check if input_size is compatible with the CNN architecture.")
-            # Optionally, raise the error or set a default size if appropriate
-            # raise e
-            cnn_output_features = 512 # Fallback size (adjust if needed)
-            print(f"  [Model Init] Using fallback CNN output features: {cnn_output_features}")
+        # Get the output feature size from the CNN dynamically (model bundles record it, skipping the probe)
+        if cnn_output_features is None:
+            try:
+                with torch.no_grad(): # No need to track gradients here
+                    # --- DEBUG PRINT ---
+                    print(f"    [Model Init] Creating dummy input (1, 1, {input_size}, {input_size})...")
+                    # --- END DEBUG PRINT ---
+                    dummy_input = torch.randn(1, 1, input_size, input_size) # Batch=1, Channels=1, H, W
+
+                    # --- DEBUG PRINT ---
+                    print("    [Model Init] Passing dummy input through self.cnn_features...")
+                    # --- END DEBUG PRINT ---
+                    dummy_output = self.cnn_features(dummy_input) # <--- PROBLEM LIKELY HERE
+                    # --- DEBUG PRINT ---
+                    print("    [Model Init] Dummy input passed through CNN.")
+                    # --- END DEBUG PRINT ---
+
+                    cnn_output_features = dummy_output.view(dummy_output.size(0), -1).shape[1]
+                    # --- DEBUG PRINT ---
+                    print(f"    [Model Init] Determined CNN output features: {cnn_output_features}")
+                    # --- END DEBUG PRINT ---
+
+            except Exception as e:
+                print(f"  [Model Init] ERROR determining CNN output size: {e}")
+                print("  [Model Init] Check if input_size is compatible with the CNN architecture.")
+                # Optionally, raise the error or set a default size if appropriate
+                # raise e
+                cnn_output_features = 512 # Fallback size (adjust if needed)
+                print(f"  [Model Init] Using fallback CNN output features: {cnn_output_features}")
 
 
         # --- LSTM Layer ---
@@ -82,35 +88,80 @@ class SignLanguageModel(nn.Module):
         self.dropout = nn.Dropout(dropout_rate)
         self.fc = nn.Linear(lstm_output_size, num_classes)
 
+        # Everything needed to rebuild this exact architecture (stored in model bundles, utils/model_bundle.py)
+        self.architecture = {
+            'backbone': 'resnet18', 'head': 'lstm', 'in_channels': 1, 'num_classes': num_classes,
+            'input_size': input_size, 'cnn_output_features': cnn_output_features, 'hidden_size': hidden_size,
+            'num_lstm_layers': num_lstm_layers, 'bidirectional': bidirectional, 'dropout_rate': dropout_rate,
+        }
+
         # --- DEBUG PRINT ---
         print("  [Model Init] LSTM and Classifier defined. Initialization complete.")
         # --- END DEBUG PRINT ---
 
-    def forward(self, x):
+    @staticmethod
+    def normalize_input(x):
+        """Maps uint8 frames to the float range used in training, (x/255 - INPUT_MEAN) / INPUT_STD, in one pass.
+
+        Float inputs are assumed to be normalized already (ToTensor + Normalize).
+        """
+        if x.dtype != torch.uint8:
+            return x
+        std, mean = SignLanguageModel.INPUT_STD, SignLanguageModel.INPUT_MEAN
+        return x.to(torch.float32).mul_(1.0 / (255.0 * std)).sub_(mean / std)
+
+    def extract_features(self, frames):
+        """Per-frame CNN embeddings: (N, C, H, W) -> (N, cnn_output_features)."""
+        cnn_out = self.cnn_features(self.normalize_input(frames))
+        return cnn_out.view(frames.size(0), -1) # Flatten features
+
+    def classify_features(self, features, lengths=None):
+        """Classifies (batch, seq_len, cnn_output_features) embeddings with the LSTM head.
+
+        With lengths (true clip lengths, padding at the end) the LSTM runs on a
+        packed sequence and the output at each clip's own last step is used.
+        """
+        if lengths is None:
+            # Pass through LSTM
+            lstm_out, _ = self.lstm(features)
+
+            # Use output of the last time step
+            last_time_step_out = lstm_out[:, -1, :]
+        else:
+            packed = nn.utils.rnn.pack_padded_sequence(features, lengths.cpu(), batch_first=True, enforce_sorted=False)
+            packed_out, _ = self.lstm(packed)
+            lstm_out, _ = nn.utils.rnn.pad_packed_sequence(packed_out, batch_first=True)
+            last_index = (lengths.to(lstm_out.device) - 1).view(-1, 1, 1).expand(-1, 1, lstm_out.size(2))
+            last_time_step_out = lstm_out.gather(1, last_index).squeeze(1)
+
+        # Classify
+        out = self.dropout(last_time_step_out)
+        out = self.fc(out)
+
+        return out
+
+    def forward(self, x, lengths=None):
         # x shape: (batch, seq_len, channels=1, height, width)
         batch_size, seq_len, C, H, W = x.size()
 
+        if lengths is not None:
+            # Only real frames go through the CNN; padded steps get zero features and are skipped by the packed LSTM
+            valid = torch.arange(seq_len, device=x.device).unsqueeze(0) < lengths.to(x.device).unsqueeze(1)
+            cnn_out = self.extract_features(x[valid])
+            lstm_in = cnn_out.new_zeros(batch_size, seq_len, cnn_out.size(1))
+            lstm_in[valid] = cnn_out
+            return self.classify_features(lstm_in, lengths)
+
         # Reshape for CNN: (batch * seq_len, C, H, W)
         cnn_in = x.view(batch_size * seq_len, C, H, W)
 
         # Pass through CNN
-        cnn_out = self.cnn_features(cnn_in)
-        cnn_out = cnn_out.view(batch_size * seq_len, -1) # Flatten features
+        cnn_out = self.extract_features(cnn_in)
 
         # Reshape for LSTM: (batch, seq_len, cnn_output_features)
         lstm_in = cnn_out.view(batch_size, seq_len, -1)
 
-        # Pass through LSTM
-        lstm_out, _ = self.lstm(lstm_in)
-
-        # Use output of the last time step
-        last_time_step_out = lstm_out[:, -1, :]
-
-        # Classify
-        out = self.dropout(last_time_step_out)
-        out = self.fc(out)
-
-        return out
+        return self.classify_features(lstm_in)
 
 # Example usage
 if __name__ == '__main__':
@@ -0,0 +1,293 @@
+"""Bulk offline prediction over directories of videos.
+
+Videos are decoded, sampled and masked in a process pool (one MediaPipe
+instance per process); the resulting clips are batched through one model
+forward in the parent and results are streamed to CSV or JSONL. Files already
+present in the output are skipped, so an interrupted run can be resumed.
+
+Usage:
+    python predict_batch.py data/raw --output scores.jsonl
+    python predict_batch.py "archive/**/*.mp4" --output scores.csv --workers 8
+"""
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import numpy as np
+import torch
+
+from configs import config
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+CSV_FIELDS = ['path', 'label', 'confidence', 'top', 'num_frames', 'error']
+
+# Set in each decode process by init_decode_worker: the loaded model's preprocessing and a detector for its backend
+_clip_settings = None
+_clip_detector = None
+
+
+def find_videos(inputs):
+    """Expands directories (recursively) and glob patterns into a sorted list of video paths."""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.update(os.path.join(root, f) for f in files if f.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            paths.update(p for p in glob.glob(item, recursive=True) if p.lower().endswith(VIDEO_EXTENSIONS))
+    return sorted(os.path.normpath(p) for p in paths)
+
+def read_scored_paths(output_path):
+    """Paths already scored successfully in an existing output file (for resuming).
+
+    Rows with an error are left out, so files that failed (bad mount, killed worker) are retried.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    scored = set()
+    with open(output_path, newline='') as f:
+        if output_path.lower().endswith('.csv'):
+            scored.update(row['path'] for row in csv.DictReader(f) if row.get('path') and not row.get('error'))
+        else:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                    if not row.get('error'):
+                        scored.add(row['path'])
+                except (ValueError, KeyError, AttributeError):
+                    continue # Tolerate a truncated last line from an interrupted run
+    return scored
+
+
+def clip_settings(predictor):
+    """The preprocessing the decode processes must apply for `predictor` (from its bundle, or config)."""
+    return {
+        'sequence_length': predictor.sequence_length,
+        'input_size': predictor.input_size,
+        'crop_to_hands': predictor.crop_to_hands,
+        'masking_backend': predictor.masking_backend,
+        'variable_length': predictor.variable_length,
+    }
+
+def load_clip(video_path):
+    """Runs in a pool process: decode, sample the model's sequence length, mask and resize.
+
+    Returns (path, (T, H, W) uint8 clip or None, number of decoded frames, error).
+    Short clips of variable-length models keep their true length. Clips
+    cross the process boundary as uint8 and are normalized by the model.
+    """
+    # Imported here so the parent never initializes MediaPipe
+    from utils.data_utils import mask_clip_frames
+    from utils.frame_preprocessor import resize_frame
+    from utils.hand_crop import crop_clip_to_hands
+    from utils.inference import sample_sequence_indices
+    from utils.preprocessing import iter_video_frames
+
+    try:
+        frames = list(iter_video_frames(video_path, target_fps=config.TARGET_FPS))
+        if not frames:
+            return video_path, None, 0, "No frames decoded."
+        settings = _clip_settings
+        indices = sample_sequence_indices(len(frames), settings['sequence_length'], pad=not settings['variable_length'])
+        distinct = sorted(set(indices))
+        masked = mask_clip_frames(frames, distinct, backend=settings['masking_backend'], detector=_clip_detector)
+        if settings['crop_to_hands']:
+            masked = crop_clip_to_hands(masked)
+        processed = {i: resize_frame(m, settings['input_size']) for i, m in zip(distinct, masked)}
+        return video_path, np.stack([processed[i] for i in indices]), len(frames), None
+    except Exception as e:
+        return video_path, None, 0, f"{type(e).__name__}: {e}"
+
+def init_decode_worker(settings):
+    """Pool initializer: single-threaded libraries, the model's clip settings and a detector for its backend."""
+    global _clip_settings, _clip_detector
+    cv2.setNumThreads(1)
+    torch.set_num_threads(1)
+    from utils.data_utils import create_hands_detector
+    _clip_settings = settings
+    # The skin backend masks each clip with its own stream masker (data_utils.mask_clip_frames)
+    if settings['masking_backend'] != "skin":
+        _clip_detector = create_hands_detector(static_image_mode=True, backend=settings['masking_backend'])
+
+
+class ResultWriter:
+    """Appends one row per video to CSV or JSONL, flushing after every batch."""
+    def __init__(self, output_path):
+        self.is_csv = output_path.lower().endswith('.csv')
+        write_header = self.is_csv and (not os.path.exists(output_path) or os.path.getsize(output_path) == 0)
+        self._file = open(output_path, 'a', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=CSV_FIELDS) if self.is_csv else None
+        if write_header:
+            self._writer.writeheader()
+
+    def write(self, row):
+        if self.is_csv:
+            row = dict(row, top=';'.join(f"{t['label']}:{t['probability']:.4f}" for t in row.get('top', [])))
+            self._writer.writerow({k: row.get(k, '') for k in CSV_FIELDS})
+        else:
+            self._file.write(json.dumps(row) + "\n")
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def score_batch(predictor, clips):
+    """Runs one forward on uint8 (T, H, W) clips; the model normalizes them on its device."""
+    from utils.inference import stack_clips
+    # (B, T, 1, H, W) uint8, padded with lengths when short variable-length clips are mixed in
+    batch, lengths = stack_clips([torch.from_numpy(clip).unsqueeze(1) for clip in clips])
+    return predictor.predict_batch(batch, lengths)
+
+def run_batched(args, predictor, video_paths, writer):
+    """Decode/mask in a process pool, forward in the parent in batches."""
+    ctx = multiprocessing.get_context('spawn')
+    processed = 0
+    start_time = last_report = time.perf_counter()
+    pending_clips, pending_rows = [], []
+
+    def flush_batch():
+        nonlocal pending_clips, pending_rows
+        if pending_clips:
+            for row, probabilities in zip(pending_rows, score_batch(predictor, pending_clips)):
+                row.update(predictor.describe(probabilities))
+                writer.write(row)
+        writer.flush()
+        pending_clips, pending_rows = [], []
+
+    def make_executor():
+        return ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx, initializer=init_decode_worker,
+                                   initargs=(clip_settings(predictor),))
+
+    def collect(future, path):
+        nonlocal processed
+        try:
+            path, clip, num_frames, error = future.result()
+        except Exception as e: # A decode process died (BrokenProcessPool) or the task could not be sent
+            clip, num_frames, error = None, 0, f"{type(e).__name__}: {e}"
+        row = {'path': path, 'num_frames': num_frames}
+        if clip is None:
+            row['error'] = error
+            writer.write(row)
+        else:
+            pending_clips.append(clip)
+            pending_rows.append(row)
+        processed += 1
+
+    executor = make_executor()
+    try:
+        remaining = iter(video_paths)
+        in_flight = {} # future -> video path
+        while True:
+            # Keep a bounded number of decodes queued so memory stays flat on huge archives
+            while len(in_flight) < args.workers * 2:
+                path = next(remaining, None)
+                if path is None:
+                    break
+                in_flight[executor.submit(load_clip, path)] = path
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                collect(future, in_flight.pop(future))
+            if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                # Every queued decode fails with the pool; record them as errors (retried on resume) and start a new pool
+                print("  Warning: a decode process died; restarting the decode pool.")
+                for future, path in list(in_flight.items()):
+                    collect(future, path)
+                in_flight.clear()
+                executor.shutdown(wait=True)
+                executor = make_executor()
+            if len(pending_clips) >= args.batch_size:
+                flush_batch()
+            if time.perf_counter() - last_report >= 10:
+                last_report = time.perf_counter()
+                print(f"  {processed}/{len(video_paths)} files | {processed / (last_report - start_time):.2f} files/s")
+        flush_batch()
+    finally:
+        executor.shutdown(wait=True)
+    return processed
+
+def run_shared_workers(args, predictor, video_paths, writer):
+    """Decode, mask and forward entirely inside InferenceWorkerPool workers (shared weights)."""
+    from utils.worker_pool import InferenceWorkerPool
+
+    processed = 0
+    with InferenceWorkerPool(predictor, args.workers, config.WORKER_TORCH_THREADS) as pool:
+        remaining = iter(video_paths)
+        in_flight = {} # future -> video path
+        while True:
+            # Same bound as the batched engine: the pool's queues never hold the whole archive
+            while len(in_flight) < args.workers * 2:
+                path = next(remaining, None)
+                if path is None:
+                    break
+                in_flight[pool.submit_video(path)] = path
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                row = {'path': in_flight.pop(future)}
+                try:
+                    row.update(predictor.describe(future.result()))
+                except Exception as e:
+                    row['error'] = str(e).splitlines()[0]
+                writer.write(row)
+                processed += 1
+            writer.flush()
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify every video in directories or glob patterns.")
+    parser.add_argument('inputs', nargs='+', help="Directories (searched recursively) or glob patterns.")
+    parser.add_argument('--output', required=True, help="Results file; .csv or .jsonl (appended to, for resume).")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument('--batch-size', type=int, default=config.BATCH_SIZE)
+    parser.add_argument('--engine', choices=['batched', 'shared'], default='batched',
+                        help="batched: decode pool + batched forward in the parent; "
+                             "shared: whole pipeline in forked workers sharing the weights.")
+    parser.add_argument('--no-resume', action='store_true', help="Rescore files already in the output.")
+    parser.add_argument('--model', default=None, help="Model bundle or weights (default: the bundle if present, else the best model).")
+    parser.add_argument('--class-names', default=config.CLASS_NAMES_FILE)
+    args = parser.parse_args()
+
+    video_paths = find_videos(args.inputs)
+    if not args.no_resume:
+        scored = read_scored_paths(args.output)
+        if scored:
+            print(f"Resuming: skipping {len(scored)} already scored files.")
+        video_paths = [p for p in video_paths if p not in scored]
+    if not video_paths:
+        print("Nothing to score.")
+        return
+    print(f"Scoring {len(video_paths)} videos with {args.workers} workers ({args.engine} engine)...")
+
+    from utils.inference import SignPredictor
+    device = torch.device('cpu') if args.engine == 'shared' else None
+    predictor = SignPredictor(model_path=args.model, class_names_file=args.class_names, device=device)
+    print(f"Model loaded. Using device: {predictor.device}")
+
+    writer = ResultWriter(args.output)
+    start_time = time.perf_counter()
+    try:
+        if args.engine == 'shared':
+            processed = run_shared_workers(args, predictor, video_paths, writer)
+        else:
+            processed = run_batched(args, predictor, video_paths, writer)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start_time
+    print(f"Scored {processed} files in {elapsed:.1f}s ({processed / elapsed if elapsed > 0 else 0:.2f} files/s) -> {args.output}")
+
+if __name__ == "__main__":
+    main()
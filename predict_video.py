@@ -3,56 +3,39 @@ import os
 import time
 import torch
 import numpy as np
-from torchvision import transforms
 from collections import deque
 import tempfile
 import shutil
-import mediapipe as mp # Import MediaPipe
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 
-from models import SignLanguageModel
 from configs import config
 from utils.preprocessing import extract_frames # Assuming this still works
+from utils.data_utils import create_hands_detector, apply_mediapipe_mask_and_grayscale as apply_mask_and_grayscale
+from utils.inference import sample_sequence_indices
+from utils.frame_preprocessor import FramePreprocessor
+from utils.hand_crop import crop_clip_to_hands
+from utils.runtime_metrics import get_registry, start_exporter
+from utils.model_bundle import apply_bundle_settings, load_inference_model
+
+metrics = get_registry() # Always collected; exported with --metrics-file / config.METRICS_EXPORT_PATH
 
 # --- Global variable & Lazy Init Function ---
 hands_detector_instance_pred = None
 
 def get_hands_detector_pred():
-    """Initializes and returns the MediaPipe Hands detector instance for prediction."""
+    """Initializes and returns the hand detector instance for prediction."""
     global hands_detector_instance_pred
     if hands_detector_instance_pred is None:
-        print("  [MediaPipe Pred] Initializing Hands detector...")
-        mp_hands = mp.solutions.hands
-        hands_detector_instance_pred = mp_hands.Hands(
-            static_image_mode=True, # True for processing extracted frames
-            max_num_hands=2,
-            min_detection_confidence=0.5
-        )
-        print("  [MediaPipe Pred] Hands detector initialized.")
+        print(f"  [Masking Pred] Initializing {config.MASKING_BACKEND} hand detector...")
+        # Static for MediaPipe's sampled frames; skin masks the recording in order as a stream, as training masks clips
+        hands_detector_instance_pred = create_hands_detector(static_image_mode=config.MASKING_BACKEND != "skin")
+        print("  [Masking Pred] Hand detector initialized.")
     return hands_detector_instance_pred
 
 def apply_mediapipe_mask_and_grayscale(image_rgb):
-    """Applies MediaPipe Hands segmentation mask and converts to grayscale."""
-    detector = get_hands_detector_pred() # Use the lazy init function
-    image_rgb.flags.writeable = False
-    results = detector.process(image_rgb)
-    image_rgb.flags.writeable = True
-    mask = np.zeros(image_rgb.shape[:2], dtype=np.uint8)
-    if results.multi_hand_landmarks:
-        for hand_landmarks in results.multi_hand_landmarks:
-            landmark_points = np.array([(lm.x * image_rgb.shape[1], lm.y * image_rgb.shape[0])
-                                        for lm in hand_landmarks.landmark], dtype=np.int32)
-            landmark_points[:, 0] = np.clip(landmark_points[:, 0], 0, image_rgb.shape[1] - 1)
-            landmark_points[:, 1] = np.clip(landmark_points[:, 1], 0, image_rgb.shape[0] - 1)
-            if len(landmark_points) >= 3:
-                try:
-                    hull = cv2.convexHull(landmark_points)
-                    cv2.fillConvexPoly(mask, hull, 255)
-                except Exception as e:
-                    print(f"Warning: Hull failed: {e}")
-                    for point in landmark_points: cv2.circle(mask, tuple(point), 5, (255), -1)
-    gray_source = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2GRAY)
-    masked_gray_image = cv2.bitwise_and(gray_source, gray_source, mask=mask)
-    return masked_gray_image
+    """Applies the hand segmentation mask and converts to grayscale."""
+    return apply_mask_and_grayscale(image_rgb, detector=get_hands_detector_pred()) # Use the lazy init function
 
 def load_class_names(file_path):
     """Load class names from file."""
@@ -66,163 +49,190 @@ def load_class_names(file_path):
         print(f"Error reading class names file {file_path}: {e}")
         return None
 
-def load_model(model_path, num_classes, device):
-    """Load a trained model (expecting 1 input channel)."""
-    model = SignLanguageModel(
-        num_classes=num_classes,
-        input_size=config.INPUT_SIZE,
-        hidden_size=config.HIDDEN_SIZE,
-        dropout_rate=config.DROPOUT_RATE,
-        bidirectional=config.BIDIRECTIONAL,
-        num_lstm_layers=config.NUM_LSTM_LAYERS
-    ).to(device)
-
-    if not os.path.exists(model_path):
-        print(f"Error: Model file not found at {model_path}")
-        return None
+def mask_frame(frame_bgr):
+    """Masks one BGR frame; returns the masked grayscale image, or None if MediaPipe failed."""
+    start = time.perf_counter()
+    frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+
+    # --- Apply Mask and Grayscale (uses lazy init now) ---
     try:
-        # Use weights_only=True if available for security
-        if hasattr(torch, 'load') and 'weights_only' in torch.load.__code__.co_varnames:
-             model.load_state_dict(torch.load(model_path, map_location=device, weights_only=True))
-        else:
-             model.load_state_dict(torch.load(model_path, map_location=device)) # type: ignore
-        model.eval()
-        return model
+        masked = apply_mediapipe_mask_and_grayscale(frame_rgb)
     except Exception as e:
-        print(f"Error loading model state dict from {model_path}: {e}")
-        print("Ensure the saved model corresponds to the current architecture (1 input channel).")
+        print(f"Error applying MediaPipe: {e}. Skipping frame.")
+        metrics.counter('mask_errors_total', "Frames the masker failed on").inc()
         return None
+    # --- End Apply ---
+    metrics.histogram('mask_ms', "Hand masking latency (ms)").observe((time.perf_counter() - start) * 1000)
+    metrics.counter('frames_masked_total', "Frames masked").inc()
+    if cv2.countNonZero(masked) > 0:
+        metrics.counter('frames_with_hands_total', "Masked frames in which hands were found").inc()
+    return masked
 
+def process_frame(frame_bgr, preprocessor, out):
+    """Masks one BGR frame and writes its normalized (1, H, W) tensor into `out`; returns success."""
+    processed_frame = mask_frame(frame_bgr)
+    if processed_frame is None:
+        return False
+    with metrics.timer('transform_ms', "Resize/normalize latency per frame (ms)"):
+        preprocessor.transform(processed_frame, out=out) # Resize/normalize in place
+    return True
 
-def capture_and_predict(duration=3):
-    """Captures video, applies masking/grayscale, and predicts."""
+def transform_clip(masked_frames, preprocessor, out):
+    """Resizes/normalizes masked frames into out[0..n), cropping them to the clip's hand box in crop mode."""
+    if config.CROP_TO_HANDS:
+        masked_frames = crop_clip_to_hands(masked_frames)
+    for i, processed_frame in enumerate(masked_frames):
+        with metrics.timer('transform_ms', "Resize/normalize latency per frame (ms)"):
+            preprocessor.transform(processed_frame, out=out[i])
+    return out[:len(masked_frames)]
 
-    # --- Load Model and Classes ---
-    model_path = config.BEST_MODEL_PATH
-    class_names_file = config.CLASS_NAMES_FILE
-    class_names = load_class_names(class_names_file)
-    if class_names is None: return
-    num_classes = len(class_names)
-    neutral_idx = class_names.index('neutral') if 'neutral' in class_names else -1
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    model = load_model(model_path, num_classes, device)
-    if model is None: print("Exiting: Model failed to load."); return
-    print(f"Model loaded. Using device: {device}")
+def pad_or_trim_frames(frames, sequence_length):
+    """Ensures at most sequence_length frames; pads with the last one unless VARIABLE_LENGTH_CLIPS."""
+    if len(frames) < sequence_length and not config.VARIABLE_LENGTH_CLIPS:
+        print(f"Warning: Processed {len(frames)} frames, padding to {sequence_length}.")
+        frames = frames + [frames[-1]] * (sequence_length - len(frames))
+    elif len(frames) > sequence_length: # Should not happen with sampling logic, but as safety
+        frames = frames[:sequence_length]
+    return frames
 
-    # --- Video Capture ---
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened(): print("Error: Could not open camera"); return
-    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    temp_dir = tempfile.mkdtemp()
-    video_path = os.path.join(temp_dir, "temp_capture.mp4")
-    frames_dir = os.path.join(temp_dir, "frames")
 
-    try:
-        print("Press SPACE to start recording...")
-        while True:
-            ret, frame = cap.read();
-            if not ret: continue
-            cv2.putText(frame, "Press SPACE", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.imshow('Recorder', frame)
-            if cv2.waitKey(1) & 0xFF == ord(' '): break
-
-        out = cv2.VideoWriter(video_path, fourcc, 30.0, (frame_width, frame_height))
-        for i in range(3, 0, -1):
-            print(f"Starts in {i}...")
-            start_time = time.time()
-            while time.time() - start_time < 1:
-                ret, frame = cap.read();
-                if not ret: continue
-                cv2.putText(frame, f"Start in {i}", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                cv2.imshow('Recorder', frame); cv2.waitKey(1)
-
-        print(f"Recording for {duration}s...")
+class InMemoryClipBuffer:
+    """Samples frames at the training rate while recording and masks them on a worker thread.
+
+    A single worker thread is used because the MediaPipe detector (and the
+    preprocessor's scratch buffer) are not thread-safe; masking still overlaps
+    with capture and display on the main thread, so by the time recording stops
+    most frames are already processed. Frames are written into one tensor
+    preallocated for max_frames samples. In crop mode the masked frames are
+    kept and resized in finalize(), once the clip-wide hand box is known.
+    """
+    def __init__(self, preprocessor, max_frames, target_fps=config.TARGET_FPS):
+        self.preprocessor = preprocessor
+        self.sample_interval = 1.0 / target_fps
+        self._next_sample_time = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mask")
+        self._futures = []
+        self.crop_to_hands = config.CROP_TO_HANDS
+        self.frames = torch.empty((max_frames, 1, preprocessor.input_size, preprocessor.input_size), dtype=torch.float32)
+
+    def offer(self, frame_bgr, timestamp):
+        """Queues the frame for masking if it falls on the sampling grid; returns True if sampled."""
+        if len(self._futures) >= self.frames.size(0):
+            metrics.counter('frames_dropped_buffer_full_total', "Sampled frames dropped: clip buffer full").inc()
+            return False
+        if self._next_sample_time is None:
+            self._next_sample_time = timestamp
+        if timestamp < self._next_sample_time:
+            return False
+        # Advance on a fixed grid so dropped camera frames don't shift later samples
+        while self._next_sample_time <= timestamp:
+            self._next_sample_time += self.sample_interval
+        if self.crop_to_hands:
+            self._futures.append(self._executor.submit(mask_frame, frame_bgr))
+        else:
+            out = self.frames[len(self._futures)]
+            self._futures.append(self._executor.submit(process_frame, frame_bgr, self.preprocessor, out))
+        metrics.counter('frames_sampled_total', "Frames sampled for the clip").inc()
+        metrics.gauge('mask_queue_depth', "Sampled frames waiting for the masking thread").set(
+            sum(not f.done() for f in self._futures))
+        return True
+
+    @property
+    def num_sampled(self):
+        return len(self._futures)
+
+    def finalize(self, sequence_length):
+        """Waits for pending masking and returns the sampled (T, 1, H, W) sequence, or None."""
+        if not self._futures:
+            self._executor.shutdown(wait=False)
+            return None
+        # Only the frames picked by the sampler need to be waited for
+        indices = sample_sequence_indices(len(self._futures), sequence_length, pad=not config.VARIABLE_LENGTH_CLIPS)
+        if self.crop_to_hands:
+            masked_frames = [self._futures[i].result() for i in indices]
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            masked_frames = [f for f in masked_frames if f is not None]
+            if not masked_frames:
+                return None
+            frames = list(transform_clip(masked_frames, self.preprocessor, self.frames))
+        else:
+            indices = [i for i in indices if self._futures[i].result()]
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            if not indices:
+                return None
+            frames = list(self.frames[indices])
+        return torch.stack(pad_or_trim_frames(frames, sequence_length))
+
+
+def wait_for_start(cap):
+    """Shows the preview until SPACE is pressed, then runs the 3-second countdown."""
+    print("Press SPACE to start recording...")
+    while True:
+        ret, frame = cap.read();
+        if not ret: continue
+        cv2.putText(frame, "Press SPACE", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.imshow('Recorder', frame)
+        if cv2.waitKey(1) & 0xFF == ord(' '): break
+
+    for i in range(3, 0, -1):
+        print(f"Starts in {i}...")
         start_time = time.time()
-        while time.time() - start_time < duration:
+        while time.time() - start_time < 1:
             ret, frame = cap.read();
-            if not ret: break
-            out.write(frame)
-            cv2.putText(frame, "Recording...", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.imshow('Recorder', frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'): break
-        out.release()
-        print(f"Video saved temporarily.")
+            if not ret: continue
+            cv2.putText(frame, f"Start in {i}", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+            cv2.imshow('Recorder', frame); cv2.waitKey(1)
 
-    finally:
-        cap.release()
-        cv2.destroyAllWindows()
+def record(cap, duration, on_frame):
+    """Records for `duration` seconds, handing each raw frame to on_frame(frame, timestamp)."""
+    print(f"Recording for {duration}s...")
+    start_time = time.time()
+    while time.time() - start_time < duration:
+        with metrics.timer('capture_ms', "Camera read latency (ms)"):
+            ret, frame = cap.read();
+        if not ret: break
+        on_frame(frame, time.time())
+        with metrics.timer('render_ms', "Overlay drawing + display latency (ms)"):
+            display_frame = frame.copy() # on_frame may still be reading the raw frame
+            cv2.putText(display_frame, "Recording...", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            cv2.imshow('Recorder', display_frame)
+        if cv2.waitKey(1) & 0xFF == ord('q'): break
 
+def frames_from_video_file(video_path, frames_dir, preprocessor, sequence_length):
+    """Legacy post-recording path: extract JPEGs, re-read, mask and sample them."""
     # --- Frame Extraction ---
     print("Extracting frames...")
-    if not extract_frames(video_path, frames_dir, target_fps=10):
-        print("Frame extraction failed."); shutil.rmtree(temp_dir); return
+    if not extract_frames(video_path, frames_dir, target_fps=config.TARGET_FPS):
+        print("Frame extraction failed."); return None
     frame_files = sorted([os.path.join(frames_dir, f) for f in os.listdir(frames_dir) if f.lower().endswith(('.jpg', '.png', '.jpeg'))])
-    if not frame_files: print("No frames extracted."); shutil.rmtree(temp_dir); return
+    if not frame_files: print("No frames extracted."); return None
+
+    # --- Frame Sampling Logic ---
+    frame_files = [frame_files[i] for i in sample_sequence_indices(len(frame_files), sequence_length,
+                                                                   pad=not config.VARIABLE_LENGTH_CLIPS)]
 
     # --- Preprocessing (Grayscale & Masking) ---
     print("Preprocessing frames...")
-    normalize = transforms.Normalize(mean=[0.5], std=[0.5])
-    transform = transforms.Compose([
-        transforms.ToPILImage(),
-        transforms.Resize((config.INPUT_SIZE, config.INPUT_SIZE), interpolation=transforms.InterpolationMode.BILINEAR, antialias=True),
-        transforms.ToTensor(), # HxW -> 1xHxW
-        normalize
-    ])
-
-    # --- Frame Sampling Logic ---
-    sequence_length = config.SEQUENCE_LENGTH
-    if len(frame_files) < sequence_length:
-        frame_files += [frame_files[-1]] * (sequence_length - len(frame_files))
-    elif len(frame_files) > sequence_length:
-        idxs = np.linspace(0, len(frame_files) - 1, sequence_length).astype(int)
-        frame_files = [frame_files[i] for i in idxs]
-    # --- End Sampling ---
-
-    frames = []
+    masked_frames = []
     for frame_path in frame_files:
         frame = cv2.imread(frame_path)
         if frame is None: continue
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        # --- Apply Mask and Grayscale (uses lazy init now) ---
-        try:
-            processed_frame = apply_mediapipe_mask_and_grayscale(frame_rgb)
-        except Exception as e:
-            print(f"Error applying MediaPipe: {e}. Skipping frame.")
-            continue
-        # --- End Apply ---
-
-        transformed_frame = transform(processed_frame) # Apply resize/normalize
-
-        # Validate shape
-        if len(transformed_frame.shape) == 2: transformed_frame = transformed_frame.unsqueeze(0)
-        if transformed_frame.shape[0] != 1: transformed_frame = transformed_frame[0, :, :].unsqueeze(0)
-        if transformed_frame.shape[1] != config.INPUT_SIZE or transformed_frame.shape[2] != config.INPUT_SIZE:
-             resize_op = transforms.Resize((config.INPUT_SIZE, config.INPUT_SIZE), antialias=True)
-             transformed_frame = resize_op(transformed_frame)
-        if transformed_frame.shape[0] != 1: continue # Skip if still wrong
-
-        frames.append(transformed_frame)
-
-    if not frames: print("Failed to process frames."); shutil.rmtree(temp_dir); return
-    # Ensure correct sequence length, padding if necessary (less ideal than sampling)
-    if len(frames) < sequence_length:
-        print(f"Warning: Processed {len(frames)} frames, padding to {sequence_length}.")
-        padding_needed = sequence_length - len(frames)
-        if frames: # Pad with last frame
-            frames.extend([frames[-1]] * padding_needed)
-        else: # Cannot proceed if no frames were processed
-             print("Error: No frames processed after masking/transforms."); shutil.rmtree(temp_dir); return
-    elif len(frames) > sequence_length: # Should not happen with sampling logic, but as safety
-        frames = frames[:sequence_length]
+        processed_frame = mask_frame(frame)
+        if processed_frame is not None:
+            masked_frames.append(processed_frame)
 
+    if not masked_frames: print("Failed to process frames."); return None
+    out = torch.empty((len(masked_frames), 1, config.INPUT_SIZE, config.INPUT_SIZE), dtype=torch.float32)
+    frames = list(transform_clip(masked_frames, preprocessor, out))
+    return torch.stack(pad_or_trim_frames(frames, sequence_length))
 
-    # --- Prediction ---
-    print("Predicting sign...")
-    input_tensor = torch.stack(frames).unsqueeze(0).to(device) # (1, seq_len, 1, H, W)
+def predict_sequence(model, sequence, device, neutral_idx):
+    """Runs the model on one (T, 1, H, W) sequence and returns the (1, num_classes) probabilities.
 
+    T may be shorter than SEQUENCE_LENGTH for a short recording (VARIABLE_LENGTH_CLIPS);
+    a single unpadded clip needs no lengths.
+    """
+    input_tensor = sequence.unsqueeze(0).to(device) # (1, seq_len, 1, H, W)
     with torch.no_grad():
         outputs = model(input_tensor)
         probs = torch.nn.functional.softmax(outputs, dim=1)
@@ -230,9 +240,78 @@ def capture_and_predict(duration=3):
         if neutral_idx != -1 and config.NEUTRAL_HANDICAP > 0:
             probs[0, neutral_idx] = max(0.0, probs[0, neutral_idx] - config.NEUTRAL_HANDICAP)
             probs = probs / probs.sum(dim=1, keepdim=True) # Renormalize
+    return probs
+
+
+def capture_and_predict(duration=3, legacy=False, metrics_path=None):
+    """Captures video, applies masking/grayscale, and predicts.
+
+    By default frames are sampled and masked in memory while recording. With
+    legacy=True the clip goes through a temp mp4 and extracted JPEGs instead.
+    Runtime metrics are written to metrics_path (default:
+    config.METRICS_EXPORT_PATH) if set.
+    """
+
+    # --- Load Model and Classes (model bundle, or legacy weights + class names) ---
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model, metadata = load_inference_model(device)
+    if model is None: print("Exiting: Model failed to load."); return
+    apply_bundle_settings(metadata) # Sample, mask and resize the way the model was trained
+    class_names = metadata['class_names']
+    neutral_idx = class_names.index('neutral') if 'neutral' in class_names else -1
+    print(f"Model loaded. Using device: {device}")
+    preprocessor = FramePreprocessor(config.INPUT_SIZE, config.SEQUENCE_LENGTH)
+    sequence_length = config.SEQUENCE_LENGTH
+
+    if config.MASKING_BACKEND == "skin":
+        get_hands_detector_pred().reset() # Each recording starts with a fresh background model
+
+    # --- Video Capture ---
+    cap = cv2.VideoCapture(0)
+    if not cap.isOpened(): print("Error: Could not open camera"); return
+    exporter = start_exporter(metrics_path) # Only once the camera is open, so every exit path closes it
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    temp_dir = tempfile.mkdtemp() if legacy else None
+    max_frames = int(duration * config.TARGET_FPS) + 2 # Room for grid rounding at both ends
+    clip_buffer = None if legacy else InMemoryClipBuffer(preprocessor, max_frames)
+
+    try:
+        wait_for_start(cap)
+        if legacy:
+            video_path = os.path.join(temp_dir, "temp_capture.mp4")
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            out = cv2.VideoWriter(video_path, fourcc, 30.0, (frame_width, frame_height))
+            record(cap, duration, lambda frame, timestamp: out.write(frame))
+            out.release()
+            print(f"Video saved temporarily.")
+        else:
+            record(cap, duration, clip_buffer.offer)
+            print(f"Recorded {clip_buffer.num_sampled} frames at {config.TARGET_FPS} fps.")
+    finally:
+        cap.release()
+        cv2.destroyAllWindows()
+    stop_time = time.perf_counter()
+
+    if legacy:
+        sequence = frames_from_video_file(video_path, os.path.join(temp_dir, "frames"), preprocessor, sequence_length)
+    else:
+        sequence = clip_buffer.finalize(sequence_length)
+    if sequence is None:
+        print("Error: No frames processed after masking/transforms.")
+        if temp_dir: shutil.rmtree(temp_dir)
+        if exporter is not None: exporter.close()
+        return
+
+    # --- Prediction ---
+    print("Predicting sign...")
+    with metrics.timer('forward_ms', "Model forward + softmax latency (ms)"):
+        probs = predict_sequence(model, sequence, device, neutral_idx)
         top_prob, top_class_idx = torch.max(probs, 1)
-        predicted_class = class_names[top_class_idx.item()]
-        confidence = top_prob.item()
+        predicted_class = class_names[top_class_idx.item()] # .item() waits for the result
+    confidence = top_prob.item()
+    metrics.counter('inferences_total', "Model forwards").inc()
+    stop_to_result = time.perf_counter() - stop_time
 
     # --- Print Results ---
     print("-" * 30)
@@ -241,20 +320,30 @@ def capture_and_predict(duration=3):
     print("-" * 30)
     print("Top 5 Probabilities:")
     sorted_probs, sorted_indices = torch.sort(probs[0], descending=True)
-    for i in range(min(5, num_classes)):
+    for i in range(min(5, len(class_names))):
         idx = sorted_indices[i].item()
         print(f"  - {class_names[idx]}: {sorted_probs[i].item():.4f}")
+    print(f"Recording stop -> result: {stop_to_result * 1000:.0f} ms ({'legacy temp-file' if legacy else 'in-memory'} path)")
 
     # --- Clean up ---
-    print(f"Cleaning up temporary directory: {temp_dir}")
-    shutil.rmtree(temp_dir)
+    if exporter is not None:
+        exporter.close() # Final snapshot
+    if temp_dir:
+        print(f"Cleaning up temporary directory: {temp_dir}")
+        shutil.rmtree(temp_dir)
     # Close MediaPipe detector if it was initialized
     global hands_detector_instance_pred
     if hands_detector_instance_pred is not None:
-        print("  [MediaPipe Pred] Closing Hands detector.")
+        print("  [Masking Pred] Closing hand detector.")
         hands_detector_instance_pred.close()
         hands_detector_instance_pred = None
 
 
 if __name__ == "__main__":
-    capture_and_predict(duration=3)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Record a clip from the webcam and predict the sign.")
+    parser.add_argument('--duration', type=float, default=3, help="Recording length in seconds.")
+    parser.add_argument('--legacy', action='store_true', help="Use the temp mp4 + JPEG extraction path.")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Export runtime metrics here (.prom for Prometheus text, otherwise JSON lines).")
+    args = parser.parse_args()
+    capture_and_predict(duration=args.duration, legacy=args.legacy, metrics_path=args.metrics_file)
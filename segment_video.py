@@ -0,0 +1,188 @@
+"""Offline continuous sign segmentation over long videos.
+
+Every sampled frame is masked and embedded by the CNN exactly once; sliding
+windows of embeddings (the model's sequence length by default, with a
+configurable stride) then only run the LSTM head. Consecutive confident windows with the same label are merged
+into timed segments and written as JSON or CSV.
+
+Usage:
+    python segment_video.py recording.mp4 --output timeline.json [--stride 2]
+"""
+import argparse
+import csv
+import json
+import os
+import time
+
+import cv2
+import torch
+
+from configs import config
+from utils.hand_crop import HandBoxTracker
+from utils.inference import SignPredictor
+from utils.preprocessing import get_frame_interval, iter_video_frames
+
+
+def embed_video(predictor, video_path, target_fps, embed_batch_size):
+    """Masks and embeds every sampled frame once; returns ((N, F) embeddings, sampled fps)."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open video {video_path}")
+    video_fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    sampled_fps = video_fps / get_frame_interval(video_fps, target_fps) if video_fps > 0 else float(target_fps)
+
+    # Frames of one video are processed in order, so a tracking-mode detector can be used
+    detector = predictor.create_detector(static_image_mode=False)
+    hand_box = HandBoxTracker() if predictor.crop_to_hands else None
+    embeddings = []
+    pending = []
+    try:
+        for frame in iter_video_frames(video_path, target_fps=target_fps):
+            pending.append(predictor.preprocess_frame(frame, detector=detector, hand_box=hand_box))
+            if len(pending) == embed_batch_size:
+                embeddings.append(predictor.embed_frames(torch.stack(pending)).cpu())
+                pending = []
+        if pending:
+            embeddings.append(predictor.embed_frames(torch.stack(pending)).cpu())
+    finally:
+        detector.close()
+
+    if not embeddings:
+        raise ValueError(f"No frames decoded from {video_path}")
+    return torch.cat(embeddings), sampled_fps
+
+def score_windows(predictor, embeddings, window, stride, window_batch_size):
+    """Classifies every window of `window` consecutive embeddings; returns (starts, probs)."""
+    num_frames = embeddings.size(0)
+    if num_frames < window and predictor.variable_length:
+        # Too short for one full window: variable-length models classify the recording at its true length
+        return [0], list(predictor.predict_features(embeddings.unsqueeze(0)))
+    if num_frames < window:
+        # Too short for one full window: pad with the last embedding, as capture_and_predict does
+        padding = embeddings[-1:].expand(window - num_frames, -1)
+        embeddings = torch.cat([embeddings, padding])
+        num_frames = window
+    # unfold gives views into the embedding matrix: (num_windows, F, window) without copying
+    windows = embeddings.unfold(0, window, stride).permute(0, 2, 1)
+    starts = list(range(0, num_frames - window + 1, stride))
+
+    probabilities = []
+    for i in range(0, windows.size(0), window_batch_size):
+        probabilities.extend(predictor.predict_features(windows[i:i + window_batch_size].contiguous()))
+    last_start = num_frames - window
+    if starts[-1] != last_start:
+        # The stride doesn't land on the end: one more window ending at the last frame, so a final sign isn't lost
+        starts.append(last_start)
+        probabilities.extend(predictor.predict_features(embeddings[last_start:].unsqueeze(0)))
+    return starts, probabilities
+
+def merge_windows(predictor, starts, probabilities, window, num_frames, fps, min_confidence, min_windows, keep_neutral=False):
+    """Merges runs of consecutive confident windows with the same label into segments.
+
+    Segments end at most at num_frames (a recording shorter than the window is one short window).
+    """
+    segments = []
+    current = None
+    for start, probs in zip(starts, probabilities):
+        label_idx = int(probs.argmax())
+        confidence = float(probs[label_idx])
+        is_sign = confidence >= min_confidence and (keep_neutral or label_idx != predictor.neutral_idx)
+        if current is not None and (not is_sign or label_idx != current['label_idx']):
+            segments.append(current)
+            current = None
+        if not is_sign:
+            continue
+        if current is None:
+            current = {'label_idx': label_idx, 'start_frame': start, 'confidences': []}
+        current['end_frame'] = min(start + window, num_frames)
+        current['confidences'].append(confidence)
+    if current is not None:
+        segments.append(current)
+
+    timeline = []
+    for segment in segments:
+        if len(segment['confidences']) < min_windows:
+            continue
+        entry = {
+            'label': predictor.class_names[segment['label_idx']],
+            'start': segment['start_frame'] / fps,
+            'end': segment['end_frame'] / fps,
+            'confidence': sum(segment['confidences']) / len(segment['confidences']),
+            'peak_confidence': max(segment['confidences']),
+            'windows': len(segment['confidences']),
+        }
+        # Windows overlap, so neighbouring segments can overlap; split the overlap evenly
+        if timeline and entry['start'] < timeline[-1]['end']:
+            boundary = (entry['start'] + timeline[-1]['end']) / 2
+            timeline[-1]['end'] = entry['start'] = boundary
+        timeline.append(entry)
+    return timeline
+
+def write_timeline(output_path, timeline, summary):
+    """Writes segments as CSV (by extension) or JSON with run metadata."""
+    if output_path.lower().endswith('.csv'):
+        with open(output_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['label', 'start', 'end', 'confidence', 'peak_confidence', 'windows'])
+            writer.writeheader()
+            for entry in timeline:
+                writer.writerow({k: (f"{v:.3f}" if isinstance(v, float) else v) for k, v in entry.items()})
+    else:
+        with open(output_path, 'w') as f:
+            json.dump({**summary, 'segments': timeline}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe a long video into a timeline of signs.")
+    parser.add_argument('video', help="Path to the video file.")
+    parser.add_argument('--output', default=None, help="Output .json or .csv (default: <video>.segments.json).")
+    parser.add_argument('--stride', type=int, default=config.SEGMENT_STRIDE, help="Frames between windows.")
+    parser.add_argument('--window', type=int, default=None, help="Frames per window (default: the model's sequence length).")
+    parser.add_argument('--fps', type=float, default=config.TARGET_FPS, help="Sampling frame rate.")
+    parser.add_argument('--min-confidence', type=float, default=config.CONFIDENCE_THRESHOLD)
+    parser.add_argument('--min-windows', type=int, default=config.SEGMENT_MIN_WINDOWS)
+    parser.add_argument('--keep-neutral', action='store_true', help="Emit segments for the neutral class too.")
+    parser.add_argument('--embed-batch-size', type=int, default=64)
+    parser.add_argument('--window-batch-size', type=int, default=128)
+    parser.add_argument('--model', default=None, help="Model bundle or weights (default: the bundle if present, else the best model).")
+    parser.add_argument('--class-names', default=config.CLASS_NAMES_FILE)
+    args = parser.parse_args()
+
+    predictor = SignPredictor(model_path=args.model, class_names_file=args.class_names)
+    print(f"Model loaded. Using device: {predictor.device}")
+    if args.window is None:
+        args.window = predictor.sequence_length # The window length the model was trained on
+
+    start_time = time.perf_counter()
+    embeddings, fps = embed_video(predictor, args.video, args.fps, args.embed_batch_size)
+    embed_time = time.perf_counter() - start_time
+    starts, probabilities = score_windows(predictor, embeddings, args.window, args.stride, args.window_batch_size)
+    timeline = merge_windows(predictor, starts, probabilities, args.window, embeddings.size(0), fps,
+                             args.min_confidence, args.min_windows, args.keep_neutral)
+    wall_time = time.perf_counter() - start_time
+
+    video_seconds = embeddings.size(0) / fps
+    summary = {
+        'video': args.video,
+        'duration_s': video_seconds,
+        'sampled_fps': fps,
+        'frames': embeddings.size(0),
+        'window': args.window,
+        'stride': args.stride,
+        'windows_scored': len(starts),
+        'wall_time_s': wall_time,
+        'video_s_per_wall_s': video_seconds / wall_time if wall_time > 0 else 0.0,
+    }
+    output_path = args.output or os.path.splitext(args.video)[0] + ".segments.json"
+    write_timeline(output_path, timeline, summary)
+
+    print("-" * 30)
+    for entry in timeline:
+        print(f"  {entry['start']:7.2f}s - {entry['end']:7.2f}s  {entry['label']} ({entry['confidence']:.2f})")
+    print("-" * 30)
+    print(f"{len(timeline)} segments from {summary['frames']} frames / {len(starts)} windows -> {output_path}")
+    print(f"Embedding: {embed_time:.2f}s | Total: {wall_time:.2f}s | "
+          f"Throughput: {summary['video_s_per_wall_s']:.2f} video-seconds per wall-second")
+
+if __name__ == "__main__":
+    main()
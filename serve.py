@@ -0,0 +1,291 @@
+"""HTTP/WebSocket inference service sharing one loaded model with request batching.
+
+Endpoints:
+    GET  /health   -- liveness and model info
+    POST /predict  -- body is an encoded clip (mp4/avi/...) or a .npy frame array
+                      of shape (T, H, W, 3) uint8 BGR (Content-Type: application/x-npy)
+    GET  /stream   -- WebSocket; send each frame as a binary JPEG/PNG message,
+                      receive JSON predictions. Send {"type": "reset"} to clear the buffer.
+
+With --workers N, masking and forwards run in N forked processes that share one
+copy of the weights (utils/worker_pool.py) instead of the in-process batcher.
+"""
+import argparse
+import asyncio
+import functools
+import io
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import torch
+from aiohttp import web, WSMsgType
+
+from configs import config
+from utils.hand_crop import HandBoxTracker
+from utils.inference import SignPredictor, stack_clips
+from utils.preprocessing import iter_video_frames
+from utils.worker_pool import InferenceWorkerPool
+
+
+class DynamicBatcher:
+    """Collects clips from concurrent requests and runs them through the model together."""
+    def __init__(self, predictor, max_batch_size, max_wait_ms):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = None
+        self._task = None
+        # A single thread runs model forwards; torch parallelizes inside each forward
+        self._forward_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="forward")
+        self.batches_run = 0
+        self.clips_run = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._forward_executor.shutdown(wait=True)
+
+    async def predict(self, sequence):
+        """Queues one (T, 1, H, W) clip and waits for its probability vector."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((sequence, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Short clips of variable-length models are padded and run packed, with their true lengths
+            sequences, lengths = stack_clips([sequence for sequence, _ in batch])
+            try:
+                probs = await loop.run_in_executor(self._forward_executor, self.predictor.predict_batch, sequences, lengths)
+            except Exception as e:
+                print(f"  [Batcher] Forward failed for batch of {len(batch)}: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches_run += 1
+            self.clips_run += len(batch)
+            for (_, future), row in zip(batch, probs):
+                if not future.done():
+                    future.set_result(row)
+
+
+def decode_clip_bytes(data, target_fps):
+    """Decodes an encoded video clip into a list of BGR frames sampled at target_fps."""
+    # OpenCV can only decode videos from a path, so spill the upload to a temp file
+    fd, temp_path = tempfile.mkstemp(suffix=".mp4")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        return list(iter_video_frames(temp_path, target_fps=target_fps))
+    finally:
+        os.remove(temp_path)
+
+def decode_frame_array(data):
+    """Loads a (T, H, W, 3) uint8 BGR frame array sent as .npy bytes; ValueError if the body is not one."""
+    try:
+        frames = np.load(io.BytesIO(data), allow_pickle=False)
+    except (EOFError, OSError) as e: # Truncated or corrupt .npy header
+        raise ValueError(f"Could not read .npy frame array: {e}") from e
+    if frames.ndim != 4 or frames.shape[-1] != 3:
+        raise ValueError(f"Expected frame array of shape (T, H, W, 3), got {frames.shape}")
+    return [np.ascontiguousarray(frame, dtype=np.uint8) for frame in frames]
+
+
+async def handle_health(request):
+    app = request.app
+    predictor = app['predictor']
+    return web.json_response({
+        'status': 'ok',
+        'classes': predictor.class_names,
+        'sequence_length': predictor.sequence_length,
+        'input_size': predictor.input_size,
+        'batches_run': app['batcher'].batches_run,
+        'clips_run': app['batcher'].clips_run,
+        'workers': app['worker_pool'].num_workers if app['worker_pool'] else 0,
+    })
+
+async def handle_predict(request):
+    app = request.app
+    loop = asyncio.get_running_loop()
+    start_time = time.perf_counter()
+    data = await request.read()
+    if not data:
+        return web.json_response({'error': 'Empty request body.'}, status=400)
+
+    is_frame_array = request.content_type in ('application/x-npy', 'application/npy')
+    try:
+        if is_frame_array:
+            # np.load of a body of up to 64 MiB would stall every other request on the event loop
+            frames = await loop.run_in_executor(app['preprocess_executor'], decode_frame_array, data)
+        else:
+            frames = await loop.run_in_executor(app['preprocess_executor'], decode_clip_bytes, data, config.TARGET_FPS)
+        if not frames:
+            return web.json_response({'error': 'No frames could be decoded from the request.'}, status=400)
+        if app['worker_pool'] is not None:
+            # Masking and forward both happen in a worker process
+            probabilities = await asyncio.wrap_future(app['worker_pool'].submit_clip(frames))
+        else:
+            sequence = await loop.run_in_executor(app['preprocess_executor'], app['predictor'].preprocess_clip, frames)
+            probabilities = await app['batcher'].predict(sequence)
+    except ValueError as e:
+        # Bad client input, raised here or in a worker process
+        return web.json_response({'error': str(e).splitlines()[0]}, status=400)
+    except Exception as e:
+        print(f"  [Predict] Request failed: {type(e).__name__}: {e}")
+        detail = f"{type(e).__name__}: {e}".splitlines()[0]
+        return web.json_response({'error': 'Inference failed.', 'detail': detail}, status=500)
+
+    result = app['predictor'].describe(probabilities)
+    result['num_frames'] = len(frames)
+    result['latency_ms'] = (time.perf_counter() - start_time) * 1000.0
+    return web.json_response(result)
+
+async def handle_stream(request):
+    app = request.app
+    predictor = app['predictor']
+    loop = asyncio.get_running_loop()
+    ws = web.WebSocketResponse(max_msg_size=16 * 1024 * 1024)
+    await ws.prepare(request)
+
+    # Each connection owns a tracking-mode detector, used by one executor call at a time
+    detector = None
+    hand_box = HandBoxTracker() if predictor.crop_to_hands else None
+    # Each connection resizes and normalizes into its own preallocated ring (as detect.py does)
+    frame_buffer = predictor.create_frame_buffer()
+    frames_received = 0
+    frames_since_prediction = 0
+
+    try:
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT:
+                try:
+                    command = json.loads(msg.data)
+                except ValueError:
+                    command = {}
+                if isinstance(command, dict) and command.get('type') == 'reset':
+                    frame_buffer.reset()
+                    if hand_box is not None:
+                        hand_box.reset()
+                    frames_since_prediction = 0
+                    await ws.send_json({'type': 'reset', 'frame': frames_received})
+                continue
+            if msg.type != WSMsgType.BINARY:
+                if msg.type == WSMsgType.ERROR:
+                    print(f"  [Stream] Connection closed with exception {ws.exception()}")
+                break
+
+            frame = cv2.imdecode(np.frombuffer(msg.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                await ws.send_json({'type': 'error', 'error': 'Could not decode frame.', 'frame': frames_received})
+                continue
+            if detector is None:
+                detector = await loop.run_in_executor(app['preprocess_executor'], predictor.create_detector, False)
+            await loop.run_in_executor(
+                app['preprocess_executor'], functools.partial(predictor.push_frame, frame_buffer, frame, detector, hand_box=hand_box))
+            frames_received += 1
+            frames_since_prediction += 1
+
+            if frame_buffer.is_full() and frames_since_prediction >= app['stream_stride']:
+                frames_since_prediction = 0
+                # A view of the buffer's reused tensor; nothing is pushed until this prediction returns
+                sequence = frame_buffer.sequence()[0]
+                if app['worker_pool'] is not None:
+                    probabilities = await asyncio.wrap_future(app['worker_pool'].submit_sequence(sequence))
+                else:
+                    probabilities = await app['batcher'].predict(sequence)
+                result = predictor.describe(probabilities)
+                result['type'] = 'prediction'
+                result['frame'] = frames_received
+                await ws.send_json(result)
+    finally:
+        if detector is not None:
+            detector.close()
+    return ws
+
+
+async def on_startup(app):
+    await app['batcher'].start()
+
+async def on_cleanup(app):
+    await app['batcher'].stop()
+    app['preprocess_executor'].shutdown(wait=True)
+    if app['worker_pool'] is not None:
+        app['worker_pool'].shutdown()
+
+def create_app(predictor, max_batch_size=None, max_wait_ms=None, preprocess_threads=None, stream_stride=None,
+               worker_pool=None):
+    """Builds the aiohttp application around an already loaded predictor."""
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app['predictor'] = predictor
+    app['worker_pool'] = worker_pool
+    app['batcher'] = DynamicBatcher(
+        predictor,
+        max_batch_size=max_batch_size or config.SERVE_MAX_BATCH_SIZE,
+        max_wait_ms=config.SERVE_MAX_BATCH_WAIT_MS if max_wait_ms is None else max_wait_ms,
+    )
+    app['preprocess_executor'] = ThreadPoolExecutor(
+        max_workers=preprocess_threads or config.SERVE_PREPROCESS_THREADS, thread_name_prefix="preprocess")
+    app['stream_stride'] = stream_stride or config.SERVE_STREAM_STRIDE
+    app.router.add_get('/health', handle_health)
+    app.router.add_post('/predict', handle_predict)
+    app.router.add_get('/stream', handle_stream)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve sign predictions over HTTP and WebSocket.")
+    parser.add_argument('--host', default=config.SERVE_HOST)
+    parser.add_argument('--port', type=int, default=config.SERVE_PORT)
+    parser.add_argument('--model', default=None, help="Model bundle or weights (default: the bundle if present, else the best model).")
+    parser.add_argument('--class-names', default=config.CLASS_NAMES_FILE, help="Path to class_names.txt.")
+    parser.add_argument('--max-batch-size', type=int, default=config.SERVE_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=config.SERVE_MAX_BATCH_WAIT_MS)
+    parser.add_argument('--preprocess-threads', type=int, default=config.SERVE_PREPROCESS_THREADS)
+    parser.add_argument('--stream-stride', type=int, default=config.SERVE_STREAM_STRIDE)
+    parser.add_argument('--workers', type=int, default=config.SERVE_WORKERS,
+                        help="Run inference in N forked worker processes sharing the weights (0 = in-process).")
+    parser.add_argument('--threads-per-worker', type=int, default=config.WORKER_TORCH_THREADS)
+    args = parser.parse_args()
+
+    print("Loading model...")
+    device = torch.device('cpu') if args.workers > 0 else None
+    predictor = SignPredictor(model_path=args.model, class_names_file=args.class_names, device=device)
+    print(f"Model loaded. Using device: {predictor.device}")
+    # Fork the workers before aiohttp and the executors start any threads
+    worker_pool = InferenceWorkerPool(predictor, args.workers, args.threads_per_worker) if args.workers > 0 else None
+    app = create_app(predictor, args.max_batch_size, args.max_wait_ms, args.preprocess_threads, args.stream_stride,
+                     worker_pool=worker_pool)
+    mode = f"{args.workers} worker processes" if worker_pool else f"batch <= {args.max_batch_size}, wait <= {args.max_wait_ms}ms"
+    print(f"Serving on http://{args.host}:{args.port} ({mode})")
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
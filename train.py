@@ -1,7 +1,18 @@
-"""Main training script for the Sign Language Model."""
+"""Main training script for the Sign Language Model.
+
+Single process:          python train.py
+Data-parallel on CPU:    torchrun --standalone --nproc_per_node=4 train.py
+Several hosts:           torchrun --nnodes=2 --node_rank=<0|1> --nproc_per_node=4 \
+                             --rdzv_backend=c10d --rdzv_endpoint=<host0>:29500 train.py
+Under torchrun every process trains on its shard of the training split
+(DistributedDataParallel over gloo); validation metrics are all-reduced and
+only rank 0 writes files.
+"""
+import argparse
 import os
 import time
 import torch
+import torch.distributed as dist
 import torch.nn as nn
 import torch.optim as optim
 from torch.utils.data import DataLoader
@@ -11,46 +22,81 @@ import numpy as np # For metrics calculation
 
 # Local imports
 from models import SignLanguageModel
-from utils.data_utils import get_data_loaders
-from utils.metrics import calculate_metrics # Import metrics calculation
+from utils.data_utils import get_data_loaders, unpack_batch
+from utils.metrics import metrics_from_confusion_matrix # Import metrics calculation
+from utils.model_bundle import build_bundle
+from utils.checkpointing import (CheckpointWriter, capture_rng_state, find_latest_checkpoint, load_checkpoint,
+                                 restore_rng_state)
+from utils.profiling import MetricAccumulator, StepTimer, make_profiler
+from utils.runtime_profile import apply_runtime_profile
 from configs import config # Import configuration
 
-def train_epoch(model, data_loader, criterion, optimizer, device):
-    """Train the model for one epoch."""
+def setup_distributed():
+    """Joins the torchrun process group when launched with WORLD_SIZE > 1; returns (rank, world_size)."""
+    world_size = int(os.environ.get('WORLD_SIZE', 1))
+    if world_size <= 1:
+        return 0, 1
+    dist.init_process_group(backend=config.DDP_BACKEND)
+    # Split the host's cores between its processes instead of each one using all of them
+    local_world_size = int(os.environ.get('LOCAL_WORLD_SIZE', world_size))
+    threads = config.DDP_TORCH_THREADS or max(1, (os.cpu_count() or 1) // local_world_size)
+    torch.set_num_threads(threads)
+    return dist.get_rank(), world_size
+
+def all_reduce_sum(tensor):
+    """Sums a tensor over all processes (no-op outside distributed training)."""
+    if dist.is_available() and dist.is_initialized():
+        dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return tensor
+
+def gather_rng_states():
+    """RNG state of every rank (a single-element list outside distributed training)."""
+    state = capture_rng_state()
+    if not (dist.is_available() and dist.is_initialized()):
+        return [state]
+    states = [None] * dist.get_world_size()
+    dist.all_gather_object(states, state)
+    return states
+
+def train_epoch(model, data_loader, criterion, optimizer, device, profiler=None):
+    """Train the model for one epoch.
+
+    Loss and accuracy accumulate on the device and are read every
+    LOG_INTERVAL batches, together with the step-time breakdown (data wait
+    vs forward/backward/optimizer) and samples/sec.
+    """
     model.train()
-    running_loss = 0.0
-    correct_predictions = 0
-    total_samples = 0
+    timer = StepTimer(device)
+    running = MetricAccumulator(device)
 
-    print("    [Train Epoch] Starting...")
-    # Wrap data_loader with tqdm for a progress bar - REMOVED
-    # progress_bar = tqdm(data_loader, desc="Training", leave=False)
-    print("    [Train Epoch] Starting batch iteration (without tqdm)...") # <-- Modified print
-
-    # Iterate directly over data_loader
     num_batches = len(data_loader) # Get total number of batches for printing progress
-    for i, (sequences, labels) in enumerate(data_loader): # <-- Iterate directly
-        print(f"      [Train Epoch] Loading batch {i}...")
-        sequences, labels = sequences.to(device), labels.to(device)
-        optimizer.zero_grad()
-        outputs = model(sequences)
-        loss = criterion(outputs, labels)
-        loss.backward()
-        optimizer.step()
-
-        running_loss += loss.item() * sequences.size(0)
-        _, predicted = torch.max(outputs.data, 1)
-        total_samples += labels.size(0)
-        correct_predictions += (predicted == labels).sum().item()
-
-        # Update progress bar description - REMOVED
-        # progress_bar.set_postfix(loss=loss.item())
-        # Print batch loss periodically instead
-        if (i + 1) % 10 == 0 or (i + 1) == num_batches: # Print every 10 batches or on the last batch
-             print(f"      [Train Epoch] Batch {i+1}/{num_batches}, Loss: {loss.item():.4f}")
-
-
-    print("    [Train Epoch] Finished batch iteration.")
+    print(f"    [Train Epoch] Starting batch iteration ({num_batches} batches)...")
+    for i, batch in enumerate(timer.iterate(data_loader)): # Fetching is timed as 'data'
+        with timer.phase('data'):
+            sequences, labels, lengths = unpack_batch(batch) # lengths is None for fixed-length clips
+            sequences, labels = sequences.to(device, non_blocking=True), labels.to(device, non_blocking=True)
+        with timer.phase('forward'):
+            optimizer.zero_grad()
+            outputs = model(sequences, lengths)
+            loss = criterion(outputs, labels)
+        with timer.phase('backward'):
+            loss.backward()
+        with timer.phase('optimizer'):
+            optimizer.step()
+        running.update(loss, outputs, labels)
+        timer.step(labels.size(0))
+        if profiler is not None:
+            profiler.step()
+
+        # Print the running loss periodically (the only host sync in the loop)
+        if (i + 1) % config.LOG_INTERVAL == 0 or (i + 1) == num_batches:
+            loss_sum, _, count = running.totals()
+            print(f"      [Train Epoch] Batch {i+1}/{num_batches}, Avg Loss: {loss_sum / count:.4f} | {timer.format()}")
+
+    print(f"    [Train Epoch] Finished batch iteration. {timer.format()}")
+    # Epoch totals over every process's shard
+    totals = all_reduce_sum(torch.tensor(running.totals(), dtype=torch.float64))
+    running_loss, correct_predictions, total_samples = totals[0].item(), totals[1].item(), int(totals[2].item())
     if total_samples == 0:
         print("    [Train Epoch] Warning: No samples processed in this epoch.")
         return 0.0, 0.0
@@ -59,60 +105,89 @@ def train_epoch(model, data_loader, criterion, optimizer, device):
     print(f"    [Train Epoch] Epoch finished. Loss: {epoch_loss:.4f}, Acc: {epoch_acc:.4f}")
     return epoch_loss, epoch_acc
 
-def validate_epoch(model, data_loader, criterion, device):
-    """Validate the model for one epoch."""
-    model.eval()
-    running_loss = 0.0
-    all_labels = []
-    all_predictions = []
+def validate_epoch(model, data_loader, criterion, device, num_classes):
+    """Validate the model for one epoch.
 
-    print("    [Val Epoch] Starting...")
-    # Wrap data_loader with tqdm for a progress bar - REMOVED
-    # progress_bar = tqdm(data_loader, desc="Validation", leave=False)
-    print("    [Val Epoch] Starting batch iteration (without tqdm)...") # <-- Modified print
+    Predictions are accumulated on the device into a confusion matrix,
+    which (with the loss sum) is all-reduced in distributed training before
+    the metrics.
+    """
+    model.eval()
+    timer = StepTimer(device)
+    running = MetricAccumulator(device)
+    # One extra bin collects unreadable videos (label -1) without a data-dependent sync
+    cm = torch.zeros(num_classes * num_classes + 1, dtype=torch.int64, device=device)
 
+    num_batches = len(data_loader) # Get total number of batches for printing progress
+    print(f"    [Val Epoch] Starting batch iteration ({num_batches} batches)...")
     with torch.no_grad():
-        # Iterate directly over data_loader
-        num_batches = len(data_loader) # Get total number of batches for printing progress
-        for i, (sequences, labels) in enumerate(data_loader): # <-- Iterate directly
-            print(f"      [Val Epoch] Loading batch {i}...")
-            sequences, labels = sequences.to(device), labels.to(device)
-            outputs = model(sequences)
-            loss = criterion(outputs, labels)
-
-            running_loss += loss.item() * sequences.size(0)
-            _, predicted = torch.max(outputs.data, 1)
-            all_labels.extend(labels.cpu().numpy())
-            all_predictions.extend(predicted.cpu().numpy())
-
-            # Update progress bar description - REMOVED
-            # progress_bar.set_postfix(loss=loss.item())
-            # Print batch loss periodically instead
-            if (i + 1) % 5 == 0 or (i + 1) == num_batches: # Print every 5 batches or on the last batch
-                 print(f"      [Val Epoch] Batch {i+1}/{num_batches}, Loss: {loss.item():.4f}")
-
-
-    print("    [Val Epoch] Finished batch iteration.")
-    num_val_samples = len(data_loader.sampler) if data_loader.sampler else len(data_loader.dataset)
+        for i, batch in enumerate(timer.iterate(data_loader)):
+            with timer.phase('data'):
+                sequences, labels, lengths = unpack_batch(batch)
+                sequences, labels = sequences.to(device, non_blocking=True), labels.to(device, non_blocking=True)
+            with timer.phase('forward'):
+                outputs = model(sequences, lengths)
+                loss = criterion(outputs, labels)
+            running.update(loss, outputs, labels)
+            timer.step(labels.size(0))
+            cells = torch.where(labels >= 0, labels * num_classes + outputs.argmax(dim=1), num_classes * num_classes)
+            cm.scatter_add_(0, cells, torch.ones_like(cells))
+
+            if (i + 1) % config.LOG_INTERVAL == 0 or (i + 1) == num_batches:
+                loss_sum, _, count = running.totals()
+                print(f"      [Val Epoch] Batch {i+1}/{num_batches}, Avg Loss: {loss_sum / count:.4f} | {timer.format()}")
+
+    print(f"    [Val Epoch] Finished batch iteration. {timer.format()}")
+    loss_sum, _, num_samples = running.totals()
+    totals = all_reduce_sum(torch.tensor([loss_sum, num_samples], dtype=torch.float64))
+    cm = all_reduce_sum(cm[:-1].cpu())
+    num_val_samples = int(totals[1].item())
     if num_val_samples == 0:
         print("    [Val Epoch] Warning: No validation samples found.")
         return 0.0, {'accuracy': 0.0, 'precision': 0.0, 'recall': 0.0, 'f1': 0.0}
 
-    epoch_loss = running_loss / num_val_samples
-    metrics = calculate_metrics(all_labels, all_predictions)
+    epoch_loss = totals[0].item() / num_val_samples
+    metrics = metrics_from_confusion_matrix(cm.view(num_classes, num_classes).numpy())
     print(f"    [Val Epoch] Epoch finished. Loss: {epoch_loss:.4f}, Acc: {metrics['accuracy']:.4f}")
     return epoch_loss, metrics
 
-def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the sign language model.")
+    parser.add_argument('--input-size', type=int, default=config.INPUT_SIZE, help="Frame size fed to the CNN.")
+    parser.add_argument('--crop-to-hands', action=argparse.BooleanOptionalAction, default=config.CROP_TO_HANDS,
+                        help="Crop each clip to its hands before resizing (see utils/hand_crop.py).")
+    parser.add_argument('--masking-backend', choices=['mediapipe', 'skin'], default=config.MASKING_BACKEND,
+                        help="Hand masking used for frames without a matching masked cache.")
+    parser.add_argument('--clips-per-video', type=int, default=config.CLIPS_PER_VIDEO,
+                        help="Random training windows drawn per video load (shares decoding and masking).")
+    parser.add_argument('--model-path', default=config.BEST_MODEL_PATH, help="Where to save the best model.")
+    parser.add_argument('--bundle-path', default=config.MODEL_BUNDLE_PATH,
+                        help="Where to save the best model as a self-describing bundle (see utils/model_bundle.py).")
+    parser.add_argument('--epochs', type=int, default=config.NUM_EPOCHS)
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Capture a torch.profiler trace of {config.PROFILE_ACTIVE_STEPS} training steps into {config.PROFILE_DIR}.")
+    parser.add_argument('--resume', nargs='?', const='latest', default=None, metavar='CHECKPOINT',
+                        help=f"Continue from a full checkpoint (default: the latest in {config.CHECKPOINT_DIR}).")
+    return parser.parse_args()
+
+def main(args=None):
     """Main training loop."""
+    if args is None:
+        args = parse_args()
+    config.MASKING_BACKEND = args.masking_backend # Read by the dataset and its (forked) workers
+    apply_runtime_profile('train') # Workers, threads and batch size from autotune.py, if present
+    rank, world_size = setup_distributed()
+    is_main = rank == 0
     # Ensure saved_models directory exists
     print(f"Attempting to create directory: {config.MODEL_SAVE_DIR}")
     os.makedirs(config.MODEL_SAVE_DIR, exist_ok=True)
     print("Directory check/creation finished.")
 
-    # Set device
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    # Set device (gloo data-parallel training runs on CPU)
+    device = torch.device('cuda' if torch.cuda.is_available() and world_size == 1 else 'cpu')
     print(f"Using device: {device}")
+    if world_size > 1:
+        print(f"Distributed training: rank {rank}/{world_size}, {torch.get_num_threads()} torch threads")
 
     # Get data loaders and class names
     print("\nLoading data...")
@@ -120,9 +195,15 @@ def main():
         data_dir=config.DATA_DIR,
         batch_size=config.BATCH_SIZE,
         sequence_length=config.SEQUENCE_LENGTH,
-        input_size=config.INPUT_SIZE,
+        input_size=args.input_size,
         num_workers=config.NUM_WORKERS,
-        validation_split=config.VALIDATION_SPLIT
+        validation_split=config.VALIDATION_SPLIT,
+        crop_to_hands=args.crop_to_hands,
+        clips_per_video=args.clips_per_video,
+        # One cache per process, so the host's budget is split between them
+        frame_cache_bytes=config.FRAME_CACHE_BYTES // int(os.environ.get('LOCAL_WORLD_SIZE', 1)),
+        rank=rank,
+        world_size=world_size
     )
 
     # Check if data loaders were created successfully
@@ -133,33 +214,37 @@ def main():
     num_classes = len(class_names)
     print(f"Number of classes: {num_classes}")
 
-    # Save class names
+    # Save class names (only rank 0 writes files)
     class_names_path = config.CLASS_NAMES_FILE
-    try:
-        with open(class_names_path, 'w') as f:
-            for name in class_names:
-                f.write(f"{name}\n")
-        print(f"Class names saved to {class_names_path}")
-    except Exception as e:
-        print(f"Error saving class names to {class_names_path}: {e}")
+    if is_main:
+        try:
+            with open(class_names_path, 'w') as f:
+                for name in class_names:
+                    f.write(f"{name}\n")
+            print(f"Class names saved to {class_names_path}")
+        except Exception as e:
+            print(f"Error saving class names to {class_names_path}: {e}")
 
     # Initialize model
     print("\nInitializing model...")
     model = SignLanguageModel(
         num_classes=num_classes,
-        input_size=config.INPUT_SIZE,
+        input_size=args.input_size,
         hidden_size=config.HIDDEN_SIZE,
         dropout_rate=config.DROPOUT_RATE,
         bidirectional=config.BIDIRECTIONAL,
         num_lstm_layers=config.NUM_LSTM_LAYERS
     ).to(device)
+    unwrapped_model = model # Saved without the DDP wrapper, so checkpoints load the same either way
+    if world_size > 1:
+        model = nn.parallel.DistributedDataParallel(model)
     print("Model initialized.")
 
     # Print model summary
     print("\nModel architecture:")
-    print(model)
-    total_params = sum(p.numel() for p in model.parameters())
-    trainable_params = sum(p.numel() for p in model.parameters() if p.requires_grad)
+    print(unwrapped_model)
+    total_params = sum(p.numel() for p in unwrapped_model.parameters())
+    trainable_params = sum(p.numel() for p in unwrapped_model.parameters() if p.requires_grad)
     print(f"Total parameters: {total_params:,}")
     print(f"Trainable parameters: {trainable_params:,}")
 
@@ -177,20 +262,54 @@ def main():
     print("Setting up training loop variables...")
     best_val_loss = float('inf')
     epochs_no_improve = 0
+    start_epoch = 0
+    rng_to_restore = None
+
+    if args.resume:
+        resume_path = find_latest_checkpoint() if args.resume == 'latest' else args.resume
+        if resume_path is None or not os.path.exists(resume_path):
+            print(f"Error: No checkpoint to resume from ({args.resume}). Exiting.")
+            return
+        print(f"Resuming from {resume_path}...")
+        checkpoint = load_checkpoint(resume_path)
+        unwrapped_model.load_state_dict(checkpoint['model'])
+        optimizer.load_state_dict(checkpoint['optimizer'])
+        scheduler.load_state_dict(checkpoint['scheduler'])
+        best_val_loss = checkpoint['best_val_loss']
+        epochs_no_improve = checkpoint['epochs_no_improve']
+        start_epoch = checkpoint['epoch'] + 1
+        rng_states = checkpoint['rng']
+        if len(rng_states) != world_size:
+            print(f"Warning: Checkpoint has RNG state for {len(rng_states)} processes, running {world_size}. "
+                  "Data order will differ from the original run.")
+        rng_to_restore = rng_states[rank % len(rng_states)]
+        print(f"Resumed after epoch {start_epoch} (best val loss {best_val_loss:.4f}, "
+              f"{epochs_no_improve} epochs without improvement).")
+
+    # Files are written on a background thread; only rank 0 writes
+    writer = CheckpointWriter() if is_main else None
 
     print("\nStarting training...")
     start_time = time.time()
-
-    for epoch in range(config.NUM_EPOCHS):
+    if rng_to_restore is not None:
+        restore_rng_state(rng_to_restore) # Last, so setup above doesn't consume the restored streams
+    profiler = None
+    if args.profile:
+        profiler = make_profiler(device, worker_name=f"rank{rank}" if world_size > 1 else None)
+        profiler.start()
+
+    for epoch in range(start_epoch, args.epochs):
         epoch_start_time = time.time()
-        print(f"\n--- Epoch {epoch+1}/{config.NUM_EPOCHS} ---")
+        print(f"\n--- Epoch {epoch+1}/{args.epochs} ---")
+        if hasattr(train_loader.sampler, 'set_epoch'):
+            train_loader.sampler.set_epoch(epoch) # New shuffle of the distributed shards each epoch
 
         print("  Calling train_epoch...")
-        train_loss, train_acc = train_epoch(model, train_loader, criterion, optimizer, device) # Calls modified function
+        train_loss, train_acc = train_epoch(model, train_loader, criterion, optimizer, device, profiler) # Calls modified function
         print("  train_epoch finished.")
 
         print("  Calling validate_epoch...")
-        val_loss, val_metrics = validate_epoch(model, val_loader, criterion, device) # Calls modified function
+        val_loss, val_metrics = validate_epoch(model, val_loader, criterion, device, num_classes) # Calls modified function
         print("  validate_epoch finished.")
 
         epoch_duration = time.time() - epoch_start_time
@@ -201,32 +320,59 @@ def main():
         print(f"  Val Loss:   {val_loss:.4f} | Val Acc:   {val_metrics['accuracy']:.4f}")
         print(f"  Val Precision: {val_metrics['precision']:.4f} | Val Recall: {val_metrics['recall']:.4f} | Val F1: {val_metrics['f1']:.4f}")
         print(f"  Epoch Duration: {epoch_duration:.2f}s")
+        frame_cache = train_loader.dataset.frame_cache
+        if frame_cache is not None:
+            cache_stats = frame_cache.stats(reset=True)
+            print(f"  Frame Cache: hit rate {cache_stats['hit_rate']:.1%} ({cache_stats['hits']} hits, "
+                  f"{cache_stats['misses']} misses) | {cache_stats['used_slots']}/{cache_stats['num_slots']} slots used")
 
         # Update learning rate scheduler
         scheduler.step(val_loss)
 
         # Save the best model based on validation loss
+        # (val_loss is all-reduced, so every rank takes the same branch and stops together)
         if val_loss < best_val_loss:
             print(f"Validation loss improved ({best_val_loss:.4f} --> {val_loss:.4f}). Saving model...")
             best_val_loss = val_loss
-            try:
-                torch.save(model.state_dict(), config.BEST_MODEL_PATH)
-                print(f"Model saved to {config.BEST_MODEL_PATH}")
-                epochs_no_improve = 0 # Reset counter
-            except Exception as e:
-                print(f"Error saving model: {e}")
+            epochs_no_improve = 0 # Reset counter
+            if is_main:
+                writer.save(args.model_path, unwrapped_model.state_dict())
+                writer.save(args.bundle_path, build_bundle(unwrapped_model, class_names, crop_to_hands=args.crop_to_hands,
+                                                           masking_backend=args.masking_backend))
         else:
             epochs_no_improve += 1
             print(f"Validation loss did not improve. {epochs_no_improve}/{config.EARLY_STOPPING_PATIENCE}")
 
+        # Full training state, so --resume continues from here
+        stopping = epochs_no_improve >= config.EARLY_STOPPING_PATIENCE
+        if (epoch + 1) % config.CHECKPOINT_INTERVAL == 0 or epoch + 1 == args.epochs or stopping:
+            rng_states = gather_rng_states() # Collective: every rank takes part
+            if is_main:
+                writer.save_checkpoint(epoch, {
+                    'epoch': epoch,
+                    'model': unwrapped_model.state_dict(),
+                    'optimizer': optimizer.state_dict(),
+                    'scheduler': scheduler.state_dict(),
+                    'best_val_loss': best_val_loss,
+                    'epochs_no_improve': epochs_no_improve,
+                    'rng': rng_states,
+                    'args': vars(args),
+                })
+
         # Early stopping
-        if epochs_no_improve >= config.EARLY_STOPPING_PATIENCE:
+        if stopping:
             print(f"\nEarly stopping triggered after {epochs_no_improve} epochs without improvement.")
             break
 
+    if profiler is not None:
+        profiler.stop()
     total_training_time = time.time() - start_time
     print(f"\nTraining finished in {total_training_time // 60:.0f}m {total_training_time % 60:.0f}s")
     print(f"Best validation loss: {best_val_loss:.4f}")
+    if writer is not None:
+        writer.close() # Finish pending writes before exiting
+    if world_size > 1:
+        dist.destroy_process_group()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,3 +1,23 @@
-from .data_utils import SignLanguageDataset, get_data_loaders
-from .visualization import plot_training_history, plot_confusion_matrix, create_results_directory
-from .preprocessing import preprocess_data
\ No newline at end of file
+"""Shared utilities. The package-level names below are imported on first access, so importing one
+submodule (e.g. utils.runtime_metrics) doesn't load the data pipeline or matplotlib."""
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    'SignLanguageDataset': 'data_utils',
+    'get_data_loaders': 'data_utils',
+    'plot_training_history': 'visualization',
+    'plot_confusion_matrix': 'visualization',
+    'create_results_directory': 'visualization',
+    'preprocess_data': 'preprocessing',
+}
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value # Later lookups skip __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
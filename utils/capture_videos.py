@@ -1,10 +1,74 @@
+"""Record sign videos from the webcam, writing training-ready processed frames while recording.
+
+Run from the repository root: python -m utils.capture_videos
+"""
 import cv2
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from configs import config
+from utils.data_utils import apply_mediapipe_mask_and_grayscale, MASKED_FRAMES_DIR
+from utils.inference import get_thread_hands_detector
+
+RAW_DATA_DIR = "data/raw"
+
+
+def _save_processed_frame(frame, frames_dir, masked_dir, index):
+    """Writes the sampled frame (JPEG, as extract_frames does) and its masked grayscale PNG."""
+    cv2.imwrite(os.path.join(frames_dir, f"frame_{index:04d}.jpg"), frame)
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    # Each pool thread owns its MediaPipe detector
+    masked = apply_mediapipe_mask_and_grayscale(frame_rgb, detector=get_thread_hands_detector())
+    cv2.imwrite(os.path.join(masked_dir, f"frame_{index:04d}.png"), masked)
+
+
+class ProcessedClipWriter:
+    """Samples a recording at the training frame rate and writes it in the processed dataset format.
+
+    Frames are handed to a background thread pool, so JPEG encoding and
+    MediaPipe masking overlap with recording instead of running afterwards in
+    preprocess_data and on every dataset access.
+    """
+    def __init__(self, video_out_dir, executor, target_fps=config.TARGET_FPS):
+        self.video_out_dir = video_out_dir
+        self.frames_dir = os.path.join(video_out_dir, "frames")
+        self.masked_dir = os.path.join(video_out_dir, MASKED_FRAMES_DIR)
+        os.makedirs(self.frames_dir, exist_ok=True)
+        os.makedirs(self.masked_dir, exist_ok=True)
+        self._executor = executor
+        self.sample_interval = 1.0 / target_fps
+        self._next_sample_time = None
+        self._futures = []
+
+    def offer(self, frame, timestamp):
+        """Queues the frame if it falls on the sampling grid. The frame must not be modified afterwards."""
+        if self._next_sample_time is None:
+            self._next_sample_time = timestamp
+        if timestamp < self._next_sample_time:
+            return False
+        while self._next_sample_time <= timestamp:
+            self._next_sample_time += self.sample_interval
+        index = len(self._futures)
+        self._futures.append(self._executor.submit(_save_processed_frame, frame, self.frames_dir, self.masked_dir, index))
+        return True
 
-def capture_sign_videos(sign_name, num_videos=5, duration=3):
-    sign_dir = f"data/raw/{sign_name}"
+    def finish(self):
+        """Waits for all queued frames; returns the number written successfully."""
+        written = 0
+        for future in self._futures:
+            try:
+                future.result()
+                written += 1
+            except Exception as e:
+                print(f"Warning: Failed to process a frame for {self.video_out_dir}: {e}")
+        return written
+
+
+def capture_sign_videos(sign_name, num_videos=5, duration=3, write_processed=True):
+    sign_dir = f"{RAW_DATA_DIR}/{sign_name}"
     os.makedirs(sign_dir, exist_ok=True)
+    processed_dir = os.path.join(config.PROCESSED_DATA_DIR, sign_name)
 
     # Count existing videos
     existing_videos = len([f for f in os.listdir(sign_dir) if f.endswith(".mp4")])
@@ -19,14 +83,16 @@ def capture_sign_videos(sign_name, num_videos=5, duration=3):
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
     frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    executor = ThreadPoolExecutor(max_workers=config.CAPTURE_WORKERS, thread_name_prefix="capture") if write_processed else None
+    clip_writers = []
 
     try:
         print(f"Press SPACE to start recording {num_videos} more videos...")
-        
+
         # Wait for SPACE key once
         while True:
             ret, frame = cap.read()
-            cv2.putText(frame, "Press SPACE to start", (50, 100), 
+            cv2.putText(frame, "Press SPACE to start", (50, 100),
                         cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
             cv2.imshow('Recorder', frame)
             key = cv2.waitKey(1) & 0xFF
@@ -35,8 +101,11 @@ def capture_sign_videos(sign_name, num_videos=5, duration=3):
 
         for video_num in range(1, num_videos + 1):
             video_index = existing_videos + video_num
-            video_path = f"{sign_dir}/{sign_name}_{video_index:03d}.mp4"
+            video_name = f"{sign_name}_{video_index:03d}"
+            video_path = f"{sign_dir}/{video_name}.mp4"
             out = cv2.VideoWriter(video_path, fourcc, 30.0, (frame_width, frame_height))
+            # Processed dir is named after the raw video so preprocess_data skips it later
+            clip_writer = ProcessedClipWriter(os.path.join(processed_dir, video_name), executor) if write_processed else None
 
             # 3-second countdown before each video
             for i in range(3, 0, -1):
@@ -44,7 +113,7 @@ def capture_sign_videos(sign_name, num_videos=5, duration=3):
                 start_time = time.time()
                 while time.time() - start_time < 1:
                     ret, frame = cap.read()
-                    cv2.putText(frame, f"Starting in {i}...", (50, 100), 
+                    cv2.putText(frame, f"Starting in {i}...", (50, 100),
                                 cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
                     cv2.imshow('Recorder', frame)
                     cv2.waitKey(1)
@@ -54,33 +123,44 @@ def capture_sign_videos(sign_name, num_videos=5, duration=3):
             start_time = time.time()
             while time.time() - start_time < duration:
                 ret, frame = cap.read()
+                if not ret:
+                    break
                 out.write(frame)
-                cv2.putText(frame, f"Recording... {video_num}/{num_videos + existing_videos}", 
+                if clip_writer is not None:
+                    clip_writer.offer(frame, time.time())
+                # Draw on a copy: the background pool may still be reading `frame`
+                display_frame = frame.copy()
+                cv2.putText(display_frame, f"Recording... {video_num}/{num_videos + existing_videos}",
                             (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                cv2.putText(frame, f"Video {video_num}/{num_videos}", 
+                cv2.putText(display_frame, f"Video {video_num}/{num_videos}",
                             (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
-                cv2.imshow('Recorder', frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-                cv2.imshow('Recorder', frame)
+                cv2.imshow('Recorder', display_frame)
                 if cv2.waitKey(1) & 0xFF == ord('q'):
                     break
 
             out.release()
             print(f"Video saved to {video_path}")
+            if clip_writer is not None:
+                clip_writers.append(clip_writer)
 
     finally:
         cap.release()
         cv2.destroyAllWindows()
+        # Background processing keeps running through the countdowns; wait for what is left
+        for clip_writer in clip_writers:
+            written = clip_writer.finish()
+            print(f"Processed {written} frames into {clip_writer.video_out_dir}")
+        if executor is not None:
+            executor.shutdown(wait=True)
 
 if __name__ == "__main__":
     sign = input("Enter the sign name: ").strip().lower()
-    
+
     # Check existing videos
-    sign_dir = f"data/raw/{sign}"
+    sign_dir = f"{RAW_DATA_DIR}/{sign}"
     existing_videos = len([f for f in os.listdir(sign_dir) if f.endswith(".mp4")]) if os.path.exists(sign_dir) else 0
 
     print(f"Existing videos for '{sign}': {existing_videos}")
     num_videos = int(input("How many more videos do you want to add? "))
-    
+
     capture_sign_videos(sign, num_videos=num_videos, duration=3)
@@ -0,0 +1,136 @@
+"""Full training-state checkpoints written atomically on a background thread.
+
+A checkpoint holds everything train.py needs to continue a run as if it had
+not stopped:
+- the model, optimizer and LR scheduler state
+- the early-stopping counters
+- the Python, NumPy and torch RNG states, per rank in distributed runs
+
+CheckpointWriter snapshots the state to CPU memory on the calling thread.
+Only that copy is needed before training continues. The slow part,
+serializing and writing, runs on a worker thread. Files are written under a
+temporary name and renamed into place, so a crash never leaves a truncated
+checkpoint. Only the last CHECKPOINT_KEEP_LAST epoch checkpoints are kept.
+
+    checkpoints/checkpoint_epoch_0007.pt
+"""
+import os
+import queue
+import random
+import re
+import threading
+
+import numpy as np
+import torch
+
+from configs import config
+
+CHECKPOINT_PATTERN = re.compile(r"checkpoint_epoch_(\d+)\.pt$")
+
+
+def checkpoint_path(directory, epoch):
+    return os.path.join(directory, f"checkpoint_epoch_{epoch:04d}.pt")
+
+def list_checkpoints(directory):
+    """Epoch checkpoint paths in `directory`, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    found = [(int(m.group(1)), f) for f in os.listdir(directory) if (m := CHECKPOINT_PATTERN.match(f))]
+    return [os.path.join(directory, f) for _, f in sorted(found)]
+
+def find_latest_checkpoint(directory=None):
+    checkpoints = list_checkpoints(directory or config.CHECKPOINT_DIR)
+    return checkpoints[-1] if checkpoints else None
+
+def snapshot(obj):
+    """Deep copy of a (nested) state with every tensor detached and cloned to CPU."""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return {k: snapshot(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot(v) for v in obj)
+    return obj
+
+def capture_rng_state():
+    state = {
+        'python': random.getstate(),
+        'numpy': np.random.get_state(),
+        'torch': torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+def restore_rng_state(state):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'])
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+
+def load_checkpoint(path):
+    """Loads a checkpoint written by CheckpointWriter onto the CPU."""
+    # Full checkpoints hold optimizer/scheduler/RNG objects, not only tensors
+    return torch.load(path, map_location='cpu', weights_only=False)
+
+
+class CheckpointWriter:
+    """Writes training checkpoints and model files atomically on one background thread.
+
+    Writes happen in submission order. At most `max_pending` snapshots are
+    queued, so a slow disk applies back-pressure instead of piling up
+    copies in memory. Call close() (or wait()) before exiting.
+    """
+    def __init__(self, directory=None, keep_last=None, max_pending=2):
+        self.directory = directory or config.CHECKPOINT_DIR
+        self.keep_last = config.CHECKPOINT_KEEP_LAST if keep_last is None else keep_last
+        os.makedirs(self.directory, exist_ok=True)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, path, state):
+        """Snapshots `state` now and writes it to `path` in the background."""
+        self._queue.put((path, snapshot(state), False))
+
+    def save_checkpoint(self, epoch, state):
+        """Writes the full training state after `epoch` (0-based) and prunes old checkpoints."""
+        self._queue.put((checkpoint_path(self.directory, epoch), snapshot(state), True))
+
+    def wait(self):
+        """Blocks until every submitted write has finished."""
+        self._queue.join()
+
+    def close(self):
+        self.wait()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                path, state, prune = item
+                try:
+                    tmp_path = path + ".tmp"
+                    torch.save(state, tmp_path)
+                    os.replace(tmp_path, path)
+                    print(f"Checkpoint written: {path}")
+                    if prune:
+                        self._prune()
+                except Exception as e:
+                    print(f"Error writing checkpoint {path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _prune(self):
+        if self.keep_last <= 0:
+            return
+        for old_path in list_checkpoints(self.directory)[:-self.keep_last]:
+            try:
+                os.remove(old_path)
+            except OSError as e:
+                print(f"Warning: Could not remove old checkpoint {old_path}: {e}")
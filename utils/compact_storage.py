@@ -0,0 +1,175 @@
+"""Compact per-video storage for masked grayscale frames.
+
+A masked frame is black except for the hands, so each frame is stored as the
+crop of its non-zero bounding box plus that box, zlib-compressed (lossless,
+no JPEG ringing in the background). All frames of one video go into a single
+`masked.npz` next to its `frames/` folder:
+
+    frame_shape  (2,)     int32   full frame (H, W)
+    boxes        (T, 4)   int32   x0, y0, x1, y1 per frame (empty box for frames without hands)
+    offsets      (T + 1,) int64   byte ranges of each frame's compressed crop in `data`
+    data         (N,)     uint8   concatenated zlib streams
+    masking      ()       str     config.MASKING_BACKEND the frames were masked with
+
+Frames are compressed independently, so a dataset access decompresses only
+the frames it samples. Convert an existing processed dataset with:
+
+    python -m utils.compact_storage data/processed
+"""
+import argparse
+import os
+import time
+import zlib
+
+import cv2
+import numpy as np
+
+from configs import config
+from utils.hand_crop import masked_bbox
+
+COMPACT_CLIP_FILE = "masked.npz"
+COMPRESSION_LEVEL = 6
+
+
+def save_compact_clip(path, masked_frames, masking_backend=None, masking_mode=None):
+    """Writes a list of same-sized masked grayscale frames to a compact clip file.
+
+    masking_mode records how the frames were masked: "stream" (in order, one
+    tracking detector or skin stream masker per video) or "static" (default:
+    what mask_video_frames does with the current config).
+    """
+    if not masked_frames:
+        raise ValueError("Cannot store an empty clip.")
+    frame_shape = masked_frames[0].shape[:2]
+    boxes = np.zeros((len(masked_frames), 4), dtype=np.int32)
+    chunks = []
+    for t, frame in enumerate(masked_frames):
+        if frame.shape[:2] != frame_shape:
+            raise ValueError(f"Frame {t} has shape {frame.shape[:2]}, expected {frame_shape}.")
+        box = masked_bbox(frame)
+        if box is not None:
+            x0, y0, x1, y1 = box
+            boxes[t] = box
+            chunks.append(zlib.compress(np.ascontiguousarray(frame[y0:y1, x0:x1]).tobytes(), COMPRESSION_LEVEL))
+        else:
+            chunks.append(b"")
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(c) for c in chunks])
+    # Write to a temp name first so an interrupted conversion never leaves a truncated clip behind
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, frame_shape=np.array(frame_shape, dtype=np.int32), boxes=boxes, offsets=offsets,
+                 data=np.frombuffer(b"".join(chunks), dtype=np.uint8),
+                 masking=np.array(masking_backend or config.MASKING_BACKEND),
+                 masking_mode=np.array(masking_mode or default_masking_mode()))
+    os.replace(tmp_path, path)
+
+
+def default_masking_mode(tracking=None):
+    """The masking_mode of frames from data_utils.mask_video_frames (skin always masks per-video streams)."""
+    if tracking is None:
+        tracking = config.OFFLINE_TRACKING_MASKING
+    return "stream" if tracking or config.MASKING_BACKEND == "skin" else "static"
+
+
+class CompactClip:
+    """A loaded compact clip; decode() rebuilds any subset of frames as a (len, H, W) uint8 stack."""
+    def __init__(self, path):
+        with np.load(path) as archive:
+            self.frame_shape = tuple(int(v) for v in archive['frame_shape'])
+            self.boxes = archive['boxes']
+            self.offsets = archive['offsets']
+            self._data = archive['data']
+            # Clips written before the field existed were always MediaPipe-masked
+            self.masking_backend = str(archive['masking']) if 'masking' in archive.files else "mediapipe"
+            # None for clips written before the mode was recorded
+            self.masking_mode = str(archive['masking_mode']) if 'masking_mode' in archive.files else None
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def decode(self, indices=None, out=None):
+        """Decodes the given frame indices (default: all) into `out` or a new zeroed array.
+
+        Repeated indices are decompressed once. `out`, if given, is overwritten.
+        """
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        if out is None:
+            out = np.zeros((len(indices),) + self.frame_shape, dtype=np.uint8)
+        else:
+            out[:len(indices)] = 0
+        decoded = {}
+        for slot, t in enumerate(indices.tolist()):
+            x0, y0, x1, y1 = self.boxes[t]
+            if x1 <= x0 or y1 <= y0:
+                continue # No hands: frame stays black
+            crop = decoded.get(t)
+            if crop is None:
+                start, end = self.offsets[t], self.offsets[t + 1]
+                crop = np.frombuffer(zlib.decompress(self._data[start:end]), dtype=np.uint8)
+                crop = crop.reshape(y1 - y0, x1 - x0)
+                decoded[t] = crop
+            out[slot, y0:y1, x0:x1] = crop
+        return out[:len(indices)]
+
+def load_compact_clip(path, indices=None):
+    """Decodes frames of a compact clip file into a (len, H, W) uint8 array."""
+    return CompactClip(path).decode(indices)
+
+
+def read_masked_frames(video_dir, tracking=None):
+    """Masked frames of a processed video directory: masked PNGs if usable, else masks frames/ JPEGs.
+
+    JPEGs are masked in order by data_utils.mask_video_frames (tracking mode by default).
+    """
+    from utils.data_utils import MASKED_FRAMES_DIR, mask_video_frames
+
+    masked_dir = os.path.join(video_dir, MASKED_FRAMES_DIR)
+    # Capture-time PNGs are MediaPipe masks; other backends re-mask the JPEGs
+    if config.MASKING_BACKEND == "mediapipe" and os.path.isdir(masked_dir) and any(f.lower().endswith('.png') for f in os.listdir(masked_dir)):
+        files = sorted(f for f in os.listdir(masked_dir) if f.lower().endswith('.png'))
+        return [cv2.imread(os.path.join(masked_dir, f), cv2.IMREAD_GRAYSCALE) for f in files]
+    frames_dir = os.path.join(video_dir, "frames")
+    if not os.path.isdir(frames_dir):
+        frames_dir = video_dir
+    files = sorted(f for f in os.listdir(frames_dir) if f.lower().endswith(('.jpg', '.png', '.jpeg')))
+    frames = (cv2.imread(os.path.join(frames_dir, f)) for f in files)
+    return list(mask_video_frames((f for f in frames if f is not None), tracking=tracking))
+
+def convert_video(video_dir, overwrite=False, tracking=None):
+    """Writes masked.npz for one processed video directory; returns False if skipped."""
+    clip_path = os.path.join(video_dir, COMPACT_CLIP_FILE)
+    if os.path.exists(clip_path) and not overwrite:
+        return False
+    frames = [f for f in read_masked_frames(video_dir, tracking=tracking) if f is not None]
+    if not frames:
+        print(f"Warning: No frames found in {video_dir}; skipping.")
+        return False
+    save_compact_clip(clip_path, frames, masking_mode=default_masking_mode(tracking))
+    return True
+
+def convert_dataset(data_dir, overwrite=False, tracking=None):
+    """Writes masked.npz for every class/video directory of a processed dataset."""
+    converted = skipped = 0
+    start_time = time.time()
+    for cls in sorted(os.listdir(data_dir)):
+        cls_dir = os.path.join(data_dir, cls)
+        if not os.path.isdir(cls_dir):
+            continue
+        for video in sorted(os.listdir(cls_dir)):
+            video_dir = os.path.join(cls_dir, video)
+            if os.path.isdir(video_dir) and convert_video(video_dir, overwrite=overwrite, tracking=tracking):
+                converted += 1
+            else:
+                skipped += 1
+    print(f"Converted {converted} videos ({skipped} skipped) in {time.time() - start_time:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert processed videos to compact masked.npz clips.")
+    parser.add_argument('data_dir', nargs='?', default=config.PROCESSED_DATA_DIR)
+    parser.add_argument('--overwrite', action='store_true', help="Rewrite clips that already exist.")
+    parser.add_argument('--tracking', action=argparse.BooleanOptionalAction, default=config.OFFLINE_TRACKING_MASKING,
+                        help="Mask each video with a per-video tracking-mode detector instead of static mode.")
+    args = parser.parse_args()
+    convert_dataset(args.data_dir, overwrite=args.overwrite, tracking=args.tracking)
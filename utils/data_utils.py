@@ -1,26 +1,50 @@
-"""Utilities for data loading and preprocessing with MediaPipe masking (Lazy Init)."""
+"""Utilities for data loading and preprocessing with hand masking (Lazy Init).
+
+Masking uses MediaPipe Hands, or the skin-colour backend in utils/skin_masking.py
+when config.MASKING_BACKEND is "skin".
+"""
 import os
 import cv2
 import numpy as np
 import random
 import torch
-from torch.utils.data import Dataset, DataLoader
-from torchvision import transforms
-from sklearn.model_selection import train_test_split
+from torch.utils.data import Dataset, DataLoader, DistributedSampler
+from torch.utils.data.dataloader import default_collate
 import time
-import mediapipe as mp # Still import mediapipe
 import traceback # Import traceback for detailed error printing
 
 # Import config here
 from configs import config
+from utils.compact_storage import COMPACT_CLIP_FILE, CompactClip
+from utils.frame_cache import SharedFrameCache
+from utils.hand_crop import crop_clip_to_hands
+from utils.runtime_profile import limit_worker_threads
+from utils.skin_masking import SkinMasker
+
+# Subfolder of a video directory holding frames already masked to grayscale (lossless PNG)
+MASKED_FRAMES_DIR = "masked"
 
 # --- Global variable to hold the detector once initialized ---
 hands_detector_instance = None
+hands_detector_backend = None # MASKING_BACKEND the instance was created for
+
+def _require_mediapipe():
+    """The mediapipe module, imported on first use (only MASKING_BACKEND = "mediapipe" needs it)."""
+    try:
+        import mediapipe as mp
+    except ImportError:
+        raise ImportError("mediapipe is not installed; install it or set config.MASKING_BACKEND = \"skin\".") from None
+    return mp
 
 def get_hands_detector():
-    """Initializes and returns the MediaPipe Hands detector instance."""
-    global hands_detector_instance
-    if hands_detector_instance is None:
+    """Initializes and returns the shared static-image detector for the configured masking backend."""
+    global hands_detector_instance, hands_detector_backend
+    if hands_detector_instance is None or hands_detector_backend != config.MASKING_BACKEND:
+        hands_detector_backend = config.MASKING_BACKEND
+        if config.MASKING_BACKEND == "skin":
+            hands_detector_instance = SkinMasker(use_background=False)
+            return hands_detector_instance
+        mp = _require_mediapipe()
         print("  [MediaPipe] Initializing Hands detector...")
         mp_hands = mp.solutions.hands
         hands_detector_instance = mp_hands.Hands(
@@ -31,10 +55,32 @@ def get_hands_detector():
         print("  [MediaPipe] Hands detector initialized.")
     return hands_detector_instance
 
-def apply_mediapipe_mask_and_grayscale(image_rgb):
-    """Applies MediaPipe Hands segmentation mask and converts to grayscale."""
+def create_hands_detector(static_image_mode=True, backend=None):
+    """Creates a new detector owned by the caller (MediaPipe Hands or a SkinMasker, per backend or config).
+
+    static_image_mode=False is for frames of one stream in order: MediaPipe
+    tracks the hands, the skin backend learns the background.
+    """
+    if (backend or config.MASKING_BACKEND) == "skin":
+        return SkinMasker(use_background=not static_image_mode)
+    mp_hands = _require_mediapipe().solutions.hands
+    if static_image_mode:
+        return mp_hands.Hands(static_image_mode=True, max_num_hands=2, min_detection_confidence=0.5)
+    return mp_hands.Hands(static_image_mode=False, max_num_hands=2,
+                          min_detection_confidence=0.6, min_tracking_confidence=0.5)
+
+def apply_mediapipe_mask_and_grayscale(image_rgb, detector=None, return_mask=False):
+    """Applies the hand segmentation mask and converts to grayscale.
+
+    A specific detector can be passed in (e.g. one per thread); otherwise the
+    shared lazily initialized instance is used. A SkinMasker detector masks
+    without MediaPipe. With return_mask the binary mask is returned as well.
+    """
     # Get the detector (initializes on first call)
-    detector = get_hands_detector()
+    if detector is None:
+        detector = get_hands_detector()
+    if isinstance(detector, SkinMasker):
+        return detector.mask_and_grayscale(image_rgb, return_mask=return_mask)
 
     # Process the image with MediaPipe Hands
     image_rgb.flags.writeable = False
@@ -64,17 +110,80 @@ def apply_mediapipe_mask_and_grayscale(image_rgb):
 
     gray_source = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2GRAY)
     masked_gray_image = cv2.bitwise_and(gray_source, gray_source, mask=mask)
-    return masked_gray_image
+    return (masked_gray_image, mask) if return_mask else masked_gray_image
+
+
+def mask_video_frames(frames_bgr, tracking=None):
+    """Masks the BGR frames of one video in order, yielding masked grayscale frames.
+
+    With tracking (default: config.OFFLINE_TRACKING_MASKING) a fresh
+    tracking-mode detector is created for this video and closed when the
+    generator finishes, so MediaPipe only runs palm detection when it loses
+    the hands and no track carries over into the next video. Otherwise every
+    frame goes through the shared static-image detector. The skin backend
+    always uses a per-video stream masker (see mask_clip_frames).
+    """
+    if tracking is None:
+        tracking = config.OFFLINE_TRACKING_MASKING
+    if config.MASKING_BACKEND == "skin":
+        tracking = True
+    detector = create_hands_detector(static_image_mode=False) if tracking else get_hands_detector()
+    try:
+        for frame in frames_bgr:
+            yield apply_mediapipe_mask_and_grayscale(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), detector=detector)
+    finally:
+        if tracking:
+            detector.close()
+
+def mask_clip_frames(frames_bgr, indices, backend=None, detector=None):
+    """Masked grayscale frames at the sorted, distinct `indices` of one clip, masked as for training.
+
+    Skin masks depend on the frames before them (the stream masker's MOG2
+    background keeps only moving skin), and compact clips are masked in that
+    mode from the first frame. So with the skin backend every frame up to the
+    last index goes through a fresh stream masker for this clip; a static
+    skin masker would keep the face, walls and furniture instead. MediaPipe
+    masks only the requested frames, with `detector` (default: the shared
+    static detector).
+    """
+    backend = backend or config.MASKING_BACKEND
+    if backend != "skin":
+        return [apply_mediapipe_mask_and_grayscale(cv2.cvtColor(frames_bgr[i], cv2.COLOR_BGR2RGB), detector=detector)
+                for i in indices]
+    wanted = set(indices)
+    masker = create_hands_detector(static_image_mode=False, backend="skin")
+    masked = {}
+    try:
+        for i in range(max(indices) + 1):
+            frame = masker.mask_and_grayscale(cv2.cvtColor(frames_bgr[i], cv2.COLOR_BGR2RGB))
+            if i in wanted:
+                masked[i] = frame
+    finally:
+        masker.close()
+    return [masked[i] for i in indices]
 
 
 class SignLanguageDataset(Dataset):
     """Dataset for sign language recognition with background removal."""
-    def __init__(self, data_dir, transform=None, sequence_length=16, is_training=True):
+    def __init__(self, data_dir, transform=None, sequence_length=16, is_training=True, uint8_output=False,
+                 crop_to_hands=False, input_size=None, backend=None, variable_length=False, clips_per_video=1,
+                 frame_cache=None):
         print(f"    [Dataset Init] Initializing with data_dir: {data_dir}") # <-- Add
         self.data_dir = data_dir
         self.transform = transform
         self.sequence_length = sequence_length
         self.is_training = is_training
+        # With uint8_output the transform ends in PILToTensor and fallbacks must match its dtype
+        self.frame_dtype = torch.uint8 if uint8_output else torch.float32
+        self.crop_to_hands = crop_to_hands
+        self.input_size = input_size or config.INPUT_SIZE # Size of fallback frames and the final shape check
+        self.backend = backend or config.DATASET_BACKEND
+        # Short videos yield fewer than sequence_length frames instead of repeating the last one
+        self.variable_length = variable_length
+        # Training windows drawn per access from one decoded/masked video (see MultiClipCollator)
+        self.clips_per_video = max(1, clips_per_video) if is_training else 1
+        # Optional SharedFrameCache of masked frames shared by all loader workers (utils/frame_cache.py)
+        self.frame_cache = frame_cache
 
         try: # <-- Add try block
             print(f"    [Dataset Init] Listing contents of {data_dir}...") # <-- Add
@@ -127,7 +236,128 @@ class SignLanguageDataset(Dataset):
     def __len__(self):
         return len(self.samples)
 
+    def _sample_indices(self, num_available_frames):
+        """Indices of the frames making up one sequence (random window when training)."""
+        if num_available_frames < self.sequence_length:
+            if self.variable_length:
+                return list(range(num_available_frames)) # True length; the collate pads at the tensor level
+            # Repeat last frame
+            return list(range(num_available_frames)) + [num_available_frames - 1] * (self.sequence_length - num_available_frames)
+        elif num_available_frames > self.sequence_length:
+            if self.is_training:
+                # Random start index
+                start_idx = random.randint(0, num_available_frames - self.sequence_length)
+                return list(range(start_idx, start_idx + self.sequence_length))
+            else:
+                # Evenly spaced indices
+                return np.linspace(0, num_available_frames - 1, self.sequence_length).astype(int)
+        else: # Exactly sequence_length frames
+            return list(range(self.sequence_length))
+
+    def _sample_windows(self, num_available_frames):
+        """Frame indices of each sequence drawn from one video access.
+
+        With clips_per_video > 1 in training, up to that many distinct random
+        windows are drawn; they usually overlap, so their frames are loaded once.
+        """
+        num_starts = num_available_frames - self.sequence_length + 1
+        if self.clips_per_video == 1 or num_starts <= 1:
+            return [self._sample_indices(num_available_frames)]
+        starts = sorted(random.sample(range(num_starts), min(self.clips_per_video, num_starts)))
+        return [list(range(start, start + self.sequence_length)) for start in starts]
+
+    def _windows_to_samples(self, windows, masked_by_index, idx, label):
+        """(sequence, label) per window, built from the frames loaded for all of them."""
+        return [(self._masked_frames_to_sequence([masked_by_index[i] for i in window], idx), label)
+                for window in windows]
+
+    def _masked_frames_to_sequence(self, masked_frames, idx):
+        """Crops (optionally), transforms and stacks (source path, masked frame) pairs into (seq_len, 1, H, W)."""
+        if self.crop_to_hands:
+            # One box (padded union over the clip) for every frame, as at inference time
+            cropped = crop_clip_to_hands([f for _, f in masked_frames])
+            masked_frames = [(path, f) for (path, _), f in zip(masked_frames, cropped)]
+
+        frames = []
+        for frame_path, processed_frame in masked_frames:
+            # Apply other transforms (Resize, Augment, ToTensor, Normalize)
+            transformed_frame = None
+            if self.transform:
+                # Pass the single-channel grayscale image to the transform pipeline
+                try:
+                    transformed_frame = self.transform(processed_frame)
+                except Exception as e:
+                    print(f"Error applying transforms to frame from {frame_path}: {e}")
+                    # Fallback to zero tensor
+                    transformed_frame = torch.zeros(1, self.input_size, self.input_size, dtype=self.frame_dtype)
+
+
+            # Ensure output tensor has 1 channel, correct size
+            final_frame = transformed_frame if transformed_frame is not None else torch.zeros(1, self.input_size, self.input_size, dtype=self.frame_dtype)
+
+            # Validate shape after transform
+            if len(final_frame.shape) == 2: # If ToTensor didn't add channel dim
+                final_frame = final_frame.unsqueeze(0)
+            elif len(final_frame.shape) == 3 and final_frame.shape[0] != 1: # If channel dim is wrong
+                print(f"Warning: Unexpected channel dimension {final_frame.shape[0]} after transform for {frame_path}. Taking first channel.")
+                final_frame = final_frame[0, :, :].unsqueeze(0)
+
+            # Ensure correct spatial size (Resize should be in transform, but double-check)
+            if final_frame.shape[1] != self.input_size or final_frame.shape[2] != self.input_size:
+                # Apply resize if not done correctly in transform (less ideal but fallback)
+                print(f"Warning: Frame size mismatch ({final_frame.shape}) after transform for {frame_path}. Resizing again.")
+                from torchvision import transforms
+                resize_op = transforms.Resize((self.input_size, self.input_size), antialias=True) # Add antialias
+                final_frame = resize_op(final_frame)
+
+            # Final check for 1 channel
+            if final_frame.shape[0] != 1:
+                print(f"Error: Final frame does not have 1 channel after all checks: {final_frame.shape} for {frame_path}. Using zero tensor.")
+                # Fallback to zero tensor
+                final_frame = torch.zeros(1, self.input_size, self.input_size, dtype=self.frame_dtype)
+
+
+            frames.append(final_frame)
+
+        # Ensure we have the correct number of frames before stacking
+        if len(frames) != self.sequence_length and not (self.variable_length and 0 < len(frames) < self.sequence_length):
+            print(f"Error: Incorrect number of frames ({len(frames)}) collected for sequence {idx}. Expected {self.sequence_length}. Padding/Truncating.")
+            # Pad or truncate if necessary (should ideally not happen with sampling logic)
+            if len(frames) < self.sequence_length:
+                if frames: frames.extend([frames[-1]] * (self.sequence_length - len(frames)))
+                else: frames = [torch.zeros(1, self.input_size, self.input_size, dtype=self.frame_dtype)] * self.sequence_length
+            else:
+                frames = frames[:self.sequence_length]
+
+
+        return torch.stack(frames) # Shape: (seq_len, 1, H, W)
+
+    def _load_compact(self, clip_path, idx, label):
+        """Samples and decodes the sequences of one access from a compact masked.npz clip."""
+        clip = CompactClip(clip_path)
+        if clip.masking_backend != config.MASKING_BACKEND:
+            raise ValueError(f"clip was masked with '{clip.masking_backend}', not '{config.MASKING_BACKEND}'")
+        if clip.masking_backend == "skin" and clip.masking_mode != "stream":
+            raise ValueError(f"skin clip was masked in '{clip.masking_mode}' mode, not per-video stream mode as at "
+                             "inference; rewrite it with python -m utils.compact_storage --overwrite")
+        windows = self._sample_windows(len(clip))
+        indices_to_load = sorted({i for window in windows for i in window})
+        cached = self.frame_cache.get_many(idx, indices_to_load) if self.frame_cache is not None else {}
+        missing = [i for i in indices_to_load if i not in cached]
+        if missing:
+            for i, frame in zip(missing, clip.decode(missing)):
+                cached[i] = frame
+                if self.frame_cache is not None:
+                    self.frame_cache.put(idx, i, frame)
+        masked_by_index = {i: (clip_path, cached[i]) for i in indices_to_load}
+        return self._windows_to_samples(windows, masked_by_index, idx, label)
+
     def __getitem__(self, idx):
+        samples = self._load_samples(idx)
+        # With clips_per_video > 1 an access yields a list of (sequence, label) samples
+        return samples if self.clips_per_video > 1 else samples[0]
+
+    def _load_samples(self, idx):
         # --- Check if samples list is populated ---
         if not self.samples:
              raise IndexError("Dataset samples list is empty. Initialization might have failed.")
@@ -137,8 +367,27 @@ class SignLanguageDataset(Dataset):
 
         video_dir, label = self.samples[idx]
 
-        # Look for a 'frames' subfolder first
-        frames_path = os.path.join(video_dir, "frames")
+        # Compact clips (utils/compact_storage.py) hold already masked frames in one file
+        if self.backend != 'files':
+            clip_path = os.path.join(video_dir, COMPACT_CLIP_FILE)
+            if os.path.exists(clip_path):
+                try:
+                    return self._load_compact(clip_path, idx, label)
+                except Exception as e:
+                    print(f"Error reading compact clip {clip_path}: {e}. Falling back to frame files.")
+            elif self.backend == 'compact':
+                print(f"Warning: No {COMPACT_CLIP_FILE} in {video_dir}. Falling back to frame files.")
+
+        # Frames masked at capture time (utils/capture_videos.py) skip MediaPipe entirely
+        premasked = False
+        masked_path = os.path.join(video_dir, MASKED_FRAMES_DIR)
+        # The PNGs don't record their backend; they are only trusted as MediaPipe masks
+        if config.MASKING_BACKEND == "mediapipe" and os.path.isdir(masked_path) and any(f.lower().endswith('.png') for f in os.listdir(masked_path)):
+            frames_path = masked_path
+            premasked = True
+        else:
+            # Look for a 'frames' subfolder first
+            frames_path = os.path.join(video_dir, "frames")
         if not os.path.exists(frames_path) or not os.path.isdir(frames_path):
             # Fallback to using the video_dir itself if 'frames' doesn't exist
             frames_path = video_dir
@@ -149,10 +398,10 @@ class SignLanguageDataset(Dataset):
         except FileNotFoundError:
              print(f"Error in __getitem__: Frames path not found: {frames_path}")
              # Return dummy data or raise error
-             return torch.zeros(self.sequence_length, 1, config.INPUT_SIZE, config.INPUT_SIZE), -1 # Example dummy
+             return [(torch.zeros(self.sequence_length, 1, self.input_size, self.input_size, dtype=self.frame_dtype), -1)] # Example dummy
         except Exception as e:
              print(f"Error listing frames in {frames_path}: {e}")
-             return torch.zeros(self.sequence_length, 1, config.INPUT_SIZE, config.INPUT_SIZE), -1 # Example dummy
+             return [(torch.zeros(self.sequence_length, 1, self.input_size, self.input_size, dtype=self.frame_dtype), -1)] # Example dummy
 
 
         if len(frame_files) == 0:
@@ -167,48 +416,54 @@ class SignLanguageDataset(Dataset):
                        else:
                             print(f"Warning: No frame images found in {video_dir} or its 'frames' subfolder.")
                             # Return dummy data or raise error
-                            return torch.zeros(self.sequence_length, 1, config.INPUT_SIZE, config.INPUT_SIZE), label # Return label if known
+                            return [(torch.zeros(self.sequence_length, 1, self.input_size, self.input_size, dtype=self.frame_dtype), label)] # Return label if known
                   except Exception as e:
                        print(f"Error listing frames in parent {video_dir}: {e}")
-                       return torch.zeros(self.sequence_length, 1, config.INPUT_SIZE, config.INPUT_SIZE), label
+                       return [(torch.zeros(self.sequence_length, 1, self.input_size, self.input_size, dtype=self.frame_dtype), label)]
              else:
                   print(f"Warning: No frame images found in {video_dir}.")
-                  return torch.zeros(self.sequence_length, 1, config.INPUT_SIZE, config.INPUT_SIZE), label
+                  return [(torch.zeros(self.sequence_length, 1, self.input_size, self.input_size, dtype=self.frame_dtype), label)]
 
 
         # --- Frame Sampling Logic ---
         num_available_frames = len(frame_files)
-        indices_to_load = []
         if num_available_frames == 0:
              # Handle case with no frames found after checks
              print(f"Error: No frames to load for {video_dir}. Returning dummy data.")
-             return torch.zeros(self.sequence_length, 1, config.INPUT_SIZE, config.INPUT_SIZE), label
+             return [(torch.zeros(self.sequence_length, 1, self.input_size, self.input_size, dtype=self.frame_dtype), label)]
 
-        if num_available_frames < self.sequence_length:
-            # Repeat last frame
-            indices_to_load = list(range(num_available_frames)) + [num_available_frames - 1] * (self.sequence_length - num_available_frames)
-        elif num_available_frames > self.sequence_length:
-            if self.is_training:
-                # Random start index
-                start_idx = random.randint(0, num_available_frames - self.sequence_length)
-                indices_to_load = list(range(start_idx, start_idx + self.sequence_length))
-            else:
-                # Evenly spaced indices
-                indices_to_load = np.linspace(0, num_available_frames - 1, self.sequence_length).astype(int)
-        else: # Exactly sequence_length frames
-            indices_to_load = list(range(self.sequence_length))
+        windows = self._sample_windows(num_available_frames)
+        indices_to_load = sorted({i for window in windows for i in window}) # Overlapping windows share frames
         # --- End Frame Sampling ---
 
-        frames = []
+        masked_by_index = {}
+        cached = self.frame_cache.get_many(idx, indices_to_load) if self.frame_cache is not None else {}
+        if config.MASKING_BACKEND == "skin" and not premasked and any(i not in cached for i in indices_to_load):
+            # Skin masks depend on the preceding frames: mask from the first frame in order, as compact clips are
+            frames = [cv2.imread(os.path.join(frames_path, f), cv2.IMREAD_COLOR) for f in frame_files[:indices_to_load[-1] + 1]]
+            if all(frame is not None for frame in frames):
+                for i, processed_frame in zip(indices_to_load, mask_clip_frames(frames, indices_to_load, backend="skin")):
+                    cached[i] = processed_frame
+                    if self.frame_cache is not None:
+                        self.frame_cache.put(idx, i, processed_frame)
+            else:
+                print(f"Warning: Unreadable frames in {frames_path}; masking its frames individually.")
         for i in indices_to_load:
             frame_file = frame_files[i]
             frame_path = os.path.join(frames_path, frame_file)
-            frame = cv2.imread(frame_path)
+            if i in cached:
+                masked_by_index[i] = (frame_path, cached[i])
+                continue
+            cacheable = True
+            frame = cv2.imread(frame_path, cv2.IMREAD_GRAYSCALE if premasked else cv2.IMREAD_COLOR)
 
             if frame is None:
                 print(f"Warning: Error loading frame {frame_path}. Using blank gray frame.")
                 # Create a blank GRAY frame as fallback, matching expected input size
-                processed_frame = np.zeros((config.INPUT_SIZE, config.INPUT_SIZE), dtype=np.uint8)
+                processed_frame = np.zeros((self.input_size, self.input_size), dtype=np.uint8)
+                cacheable = False
+            elif premasked:
+                processed_frame = frame # Already masked grayscale
             else:
                 frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 # --- Apply MediaPipe Mask and Grayscale (uses lazy init now) ---
@@ -217,81 +472,203 @@ class SignLanguageDataset(Dataset):
                 except Exception as e:
                     print(f"Error applying MediaPipe to {frame_path}: {e}. Using blank gray frame.")
                     # Fallback to blank gray frame matching input size
-                    processed_frame = np.zeros((config.INPUT_SIZE, config.INPUT_SIZE), dtype=np.uint8)
+                    processed_frame = np.zeros((self.input_size, self.input_size), dtype=np.uint8)
+                    cacheable = False
                 # --- End Apply ---
-
-            # Apply other transforms (Resize, Augment, ToTensor, Normalize)
-            transformed_frame = None
-            if self.transform:
-                # Pass the single-channel grayscale image to the transform pipeline
-                try:
-                    transformed_frame = self.transform(processed_frame)
-                except Exception as e:
-                    print(f"Error applying transforms to frame from {frame_path}: {e}")
-                    # Fallback to zero tensor
-                    transformed_frame = torch.zeros(1, config.INPUT_SIZE, config.INPUT_SIZE)
-
-
-            # Ensure output tensor has 1 channel, correct size
-            final_frame = transformed_frame if transformed_frame is not None else torch.zeros(1, config.INPUT_SIZE, config.INPUT_SIZE)
-
-            # Validate shape after transform
-            if len(final_frame.shape) == 2: # If ToTensor didn't add channel dim
-                final_frame = final_frame.unsqueeze(0)
-            elif len(final_frame.shape) == 3 and final_frame.shape[0] != 1: # If channel dim is wrong
-                print(f"Warning: Unexpected channel dimension {final_frame.shape[0]} after transform for {frame_path}. Taking first channel.")
-                final_frame = final_frame[0, :, :].unsqueeze(0)
-
-            # Ensure correct spatial size (Resize should be in transform, but double-check)
-            if final_frame.shape[1] != config.INPUT_SIZE or final_frame.shape[2] != config.INPUT_SIZE:
-                # Apply resize if not done correctly in transform (less ideal but fallback)
-                print(f"Warning: Frame size mismatch ({final_frame.shape}) after transform for {frame_path}. Resizing again.")
-                resize_op = transforms.Resize((config.INPUT_SIZE, config.INPUT_SIZE), antialias=True) # Add antialias
-                final_frame = resize_op(final_frame)
-
-            # Final check for 1 channel
-            if final_frame.shape[0] != 1:
-                print(f"Error: Final frame does not have 1 channel after all checks: {final_frame.shape} for {frame_path}. Using zero tensor.")
-                # Fallback to zero tensor
-                final_frame = torch.zeros(1, config.INPUT_SIZE, config.INPUT_SIZE)
-
-
-            frames.append(final_frame)
-
-        # Ensure we have the correct number of frames before stacking
-        if len(frames) != self.sequence_length:
-            print(f"Error: Incorrect number of frames ({len(frames)}) collected for sequence {idx}. Expected {self.sequence_length}. Padding/Truncating.")
-            # Pad or truncate if necessary (should ideally not happen with sampling logic)
-            if len(frames) < self.sequence_length:
-                if frames: frames.extend([frames[-1]] * (self.sequence_length - len(frames)))
-                else: frames = [torch.zeros(1, config.INPUT_SIZE, config.INPUT_SIZE)] * self.sequence_length
-            else:
-                frames = frames[:self.sequence_length]
-
-
-        sequence = torch.stack(frames) # Shape: (seq_len, 1, H, W)
-        return sequence, label
-
-
-def get_data_loaders(data_dir, batch_size=16, sequence_length=16, input_size=128,
-                    shuffle=True, num_workers=2, validation_split=0.2):
-    """Create train and validation data loaders for grayscale masked data."""
+            masked_by_index[i] = (frame_path, processed_frame)
+            if cacheable and self.frame_cache is not None:
+                self.frame_cache.put(idx, i, processed_frame)
+
+        return self._windows_to_samples(windows, masked_by_index, idx, label)
+
+def pad_sequences(sequences, out):
+    """Copies (T_i, ...) sequences into out[i, :T_i] and zeroes the padding after each."""
+    for i, sequence in enumerate(sequences):
+        out[i, :sequence.size(0)].copy_(sequence)
+        out[i, sequence.size(0):].zero_()
+    return out
+
+def pad_collate(batch):
+    """Collates variable-length clips: zero-pads to the longest one and returns (sequences, labels, lengths)."""
+    sequences, labels = zip(*batch)
+    lengths = torch.as_tensor([s.size(0) for s in sequences], dtype=torch.long)
+    out = sequences[0].new_empty((len(sequences), int(lengths.max())) + tuple(sequences[0].shape[1:]))
+    return pad_sequences(sequences, out), torch.as_tensor(labels, dtype=torch.long), lengths
+
+def unpack_batch(batch):
+    """(sequences, labels, lengths) from a loader batch; lengths is None for fixed-length batches."""
+    if len(batch) == 3:
+        return batch
+    sequences, labels = batch
+    return sequences, labels, None
+
+
+class DistributedSubsetSampler(DistributedSampler):
+    """DistributedSampler over a subset of dataset indices (e.g. the stratified training split).
+
+    Each process gets its own equally sized shard, reshuffled by set_epoch.
+    """
+    def __init__(self, indices, num_replicas, rank, shuffle=True, seed=0):
+        super().__init__(indices, num_replicas=num_replicas, rank=rank, shuffle=shuffle, seed=seed) # Only len(indices) is used
+        self.indices = list(indices)
+
+    def __iter__(self):
+        return (self.indices[i] for i in super().__iter__())
+
+
+class MultiClipCollator:
+    """Flattens per-video lists of (sequence, label) samples, then collates them with collate_fn.
+
+    Used when the dataset draws several clips per video (clips_per_video > 1).
+    """
+    def __init__(self, collate_fn=None):
+        self.collate_fn = collate_fn or default_collate
+
+    def __call__(self, batch):
+        return self.collate_fn([sample for samples in batch for sample in samples])
+
+
+class SharedBatchCollator:
+    """Collates uint8 (seq, 1, H, W) samples into reusable shared-memory batch buffers.
+
+    Each worker process keeps one small ring of preallocated shared-memory
+    buffers sized for the largest batch (max_batch_size clips of
+    max_length frames) and stacks samples straight into a view of the next
+    free one. Smaller batches (the last partial batch, videos yielding fewer
+    clips, shorter padded lengths) use the leading part of the buffer, so the
+    shared memory per worker stays at ring_size buffers. The main process
+    receives the view by handle (no copy, and 4x fewer bytes than float32),
+    and the storage is reused instead of being allocated and unmapped for
+    every batch. ring_size must exceed the number of batches in flight
+    (prefetch_factor + the one being consumed). With with_lengths, clips may
+    differ in length and are zero-padded as in pad_collate.
+
+    Without max_batch_size / max_length the first batch sets the ring's size;
+    a larger batch later replaces the ring with one of the new maximum.
+    """
+    def __init__(self, ring_size=4, with_lengths=False, max_batch_size=None, max_length=None):
+        self.ring_size = ring_size
+        self.with_lengths = with_lengths
+        self.max_batch_size = max_batch_size
+        self.max_length = max_length
+        self._ring = None
+        self._position = 0
+
+    def _next_buffer(self, shape):
+        """A (B, T, ...) view of the next ring buffer."""
+        ring_shape = None if self._ring is None else self._ring[0].shape
+        if ring_shape is None or ring_shape[2:] != shape[2:] or ring_shape[0] < shape[0] or ring_shape[1] < shape[1]:
+            if ring_shape is not None:
+                print(f"  [Collator] Warning: Batch {tuple(shape)} exceeds the shared buffers {tuple(ring_shape)}; reallocating.")
+            batch_size = max(shape[0], self.max_batch_size or 0, ring_shape[0] if ring_shape is not None else 0)
+            length = max(shape[1], self.max_length or 0, ring_shape[1] if ring_shape is not None else 0)
+            self._ring = [torch.empty((batch_size, length) + tuple(shape[2:]), dtype=torch.uint8).share_memory_()
+                          for _ in range(self.ring_size)]
+            self._position = 0
+        buffer = self._ring[self._position]
+        self._position = (self._position + 1) % self.ring_size
+        return buffer[:shape[0], :shape[1]]
+
+    def __call__(self, batch):
+        sequences, labels = zip(*batch)
+        labels = torch.as_tensor(labels, dtype=torch.long)
+        if not self.with_lengths:
+            out = self._next_buffer((len(sequences),) + tuple(sequences[0].shape))
+            for i, sequence in enumerate(sequences): # The view may be non-contiguous, so no stack(out=)
+                out[i].copy_(sequence)
+            return out, labels
+        lengths = torch.as_tensor([s.size(0) for s in sequences], dtype=torch.long)
+        out = self._next_buffer((len(sequences), int(lengths.max())) + tuple(sequences[0].shape[1:]))
+        return pad_sequences(sequences, out), labels, lengths
+
+
+def build_transforms(input_size, uint8_output=False):
+    """(train_transform, val_transform) for masked grayscale frames; uint8_output ends both in PILToTensor."""
+    from torchvision import transforms # Inference paths use FramePreprocessor and never need torchvision.transforms
     normalize = transforms.Normalize(mean=[0.5], std=[0.5])
+    to_tensor = [transforms.PILToTensor()] if uint8_output else [transforms.ToTensor(), normalize]
     train_transform = transforms.Compose([
         transforms.ToPILImage(),
         transforms.Resize((input_size + 10, input_size + 10), interpolation=transforms.InterpolationMode.BILINEAR),
         transforms.RandomResizedCrop(input_size, scale=(0.8, 1.0), antialias=True),
         transforms.RandomHorizontalFlip(),
         transforms.RandomAffine(degrees=15, translate=(0.1, 0.1), scale=(0.9, 1.1), shear=10),
-        transforms.ToTensor(),
-        normalize
+        *to_tensor
     ])
     val_transform = transforms.Compose([
         transforms.ToPILImage(),
         transforms.Resize((input_size, input_size), interpolation=transforms.InterpolationMode.BILINEAR, antialias=True),
-        transforms.ToTensor(),
-        normalize
+        *to_tensor
     ])
+    return train_transform, val_transform
+
+def split_indices(labels, validation_split, class_names=None):
+    """(train_indices, val_indices) of the fixed, seeded train/validation split (stratified when possible)."""
+    try:
+        # Ensure stratification is possible
+        unique_labels, counts = np.unique(labels, return_counts=True)
+        min_samples_per_class = counts.min()
+        n_splits_required = max(2, int(1 / validation_split)) # Approx splits needed for test_size
+
+        if min_samples_per_class < n_splits_required:
+             least_populated = unique_labels[counts.argmin()]
+             print(f"Warning: The least populated class ({class_names[least_populated] if class_names else least_populated}) has only {min_samples_per_class} samples, which is less than the number required for stratified splits ({n_splits_required}). Using non-stratified split.")
+             raise ValueError("Not enough samples in minority class for stratification.")
+
+        from sklearn.model_selection import train_test_split
+        train_indices, val_indices = train_test_split(
+            list(range(len(labels))),
+            test_size=validation_split,
+            stratify=labels,
+            random_state=42
+        )
+    except ValueError as e:
+         print(f"Warning: Stratified split failed ({e}). Using non-stratified split.")
+         num_samples = len(labels); indices = list(range(num_samples))
+         split = int(np.floor(validation_split * num_samples))
+         np.random.seed(42); np.random.shuffle(indices)
+         train_indices, val_indices = indices[split:], indices[:split]
+    return train_indices, val_indices
+
+def get_data_loaders(data_dir, batch_size=16, sequence_length=16, input_size=128,
+                    shuffle=True, num_workers=2, validation_split=0.2, uint8_output=None, crop_to_hands=None,
+                    variable_length=None, clips_per_video=None, frame_cache_bytes=None, rank=0, world_size=1):
+    """Create train and validation data loaders for grayscale masked data.
+
+    With uint8_output (default: config.UINT8_DATA_PATH) sequences stay uint8
+    through the workers and SignLanguageModel normalizes them on the device.
+    With crop_to_hands (default: config.CROP_TO_HANDS) each clip is cropped to
+    its hands before resizing. With variable_length (default:
+    config.VARIABLE_LENGTH_CLIPS) short videos keep their true length and
+    batches are (sequences, labels, lengths); see unpack_batch. With
+    clips_per_video K > 1 (default: config.CLIPS_PER_VIDEO) each training
+    video load yields K random windows; the loader then draws batch_size // K
+    videos per batch, so batches keep about batch_size clips. With
+    frame_cache_bytes > 0 (default: config.FRAME_CACHE_BYTES) both datasets
+    share a SharedFrameCache of masked frames, available as
+    loader.dataset.frame_cache. With world_size > 1 (torchrun) each process
+    loads its DistributedSubsetSampler shard of the training split and a
+    disjoint slice of the validation split.
+    """
+    if uint8_output is None:
+        uint8_output = config.UINT8_DATA_PATH
+    if crop_to_hands is None:
+        crop_to_hands = config.CROP_TO_HANDS
+    if variable_length is None:
+        variable_length = config.VARIABLE_LENGTH_CLIPS
+    if clips_per_video is None:
+        clips_per_video = config.CLIPS_PER_VIDEO
+    if frame_cache_bytes is None:
+        frame_cache_bytes = config.FRAME_CACHE_BYTES
+    # Created before the workers start so they all attach to the same shared memory
+    frame_cache = None
+    if frame_cache_bytes > 0:
+        try:
+            frame_cache = SharedFrameCache(frame_cache_bytes)
+            print(f"  [DataLoader] Shared frame cache: {frame_cache.budget_bytes / 2**20:.0f} MiB, {frame_cache.num_slots} slots.")
+        except RuntimeError as e: # e.g. /dev/shm too small inside a container
+            print(f"  [DataLoader] Warning: Could not allocate the shared frame cache ({e}). Continuing without it.")
+    train_transform, val_transform = build_transforms(input_size, uint8_output)
 
     print("  [DataLoader] Initializing SignLanguageDataset...") # <-- Add
     try:
@@ -299,7 +676,13 @@ def get_data_loaders(data_dir, batch_size=16, sequence_length=16, input_size=128
             data_dir=data_dir,
             transform=train_transform,
             sequence_length=sequence_length,
-            is_training=True
+            is_training=True,
+            uint8_output=uint8_output,
+            crop_to_hands=crop_to_hands,
+            input_size=input_size,
+            variable_length=variable_length,
+            clips_per_video=clips_per_video,
+            frame_cache=frame_cache
         )
     except (FileNotFoundError, NotADirectoryError, PermissionError) as e:
          print(f"  [DataLoader] CRITICAL ERROR: Failed to initialize dataset: {e}")
@@ -328,43 +711,46 @@ def get_data_loaders(data_dir, batch_size=16, sequence_length=16, input_size=128
     for cls, count in dataset.class_counts.items(): print(f"  - {cls}: {count} samples")
 
     # Split indices
-    try:
-        # Ensure stratification is possible
-        labels_for_split = [dataset.samples[i][1] for i in range(len(dataset))]
-        unique_labels, counts = np.unique(labels_for_split, return_counts=True)
-        min_samples_per_class = counts.min()
-        n_splits_required = max(2, int(1 / validation_split)) # Approx splits needed for test_size
-
-        if min_samples_per_class < n_splits_required:
-             print(f"Warning: The least populated class ({dataset.classes[unique_labels[counts.argmin()]]}) has only {min_samples_per_class} samples, which is less than the number required for stratified splits ({n_splits_required}). Using non-stratified split.")
-             raise ValueError("Not enough samples in minority class for stratification.")
-
-        train_indices, val_indices = train_test_split(
-            list(range(len(dataset))),
-            test_size=validation_split,
-            stratify=labels_for_split,
-            random_state=42
-        )
-    except ValueError as e:
-         print(f"Warning: Stratified split failed ({e}). Using non-stratified split.")
-         num_samples = len(dataset); indices = list(range(num_samples))
-         split = int(np.floor(validation_split * num_samples))
-         np.random.seed(42); np.random.shuffle(indices)
-         train_indices, val_indices = indices[split:], indices[:split]
+    train_indices, val_indices = split_indices([label for _, label in dataset.samples], validation_split, dataset.classes)
 
     # Create samplers
-    train_sampler = torch.utils.data.SubsetRandomSampler(train_indices)
-    val_sampler = torch.utils.data.SubsetRandomSampler(val_indices)
+    if world_size > 1:
+        train_sampler = DistributedSubsetSampler(train_indices, num_replicas=world_size, rank=rank)
+        val_sampler = torch.utils.data.SubsetRandomSampler(val_indices[rank::world_size]) # No padding duplicates in the metrics
+    else:
+        train_sampler = torch.utils.data.SubsetRandomSampler(train_indices)
+        val_sampler = torch.utils.data.SubsetRandomSampler(val_indices)
+
+    # Several clips per video: sample videos, then flatten their clips into one batch
+    videos_per_batch = batch_size
+    if dataset.clips_per_video > 1:
+        videos_per_batch = max(1, batch_size // dataset.clips_per_video)
+        print(f"  [DataLoader] {dataset.clips_per_video} clips per video, {videos_per_batch} videos per training batch.")
+
+    # uint8 batches go through reusable shared-memory buffers (one collator copy per worker, ring > batches in flight),
+    # each sized for the largest batch the loader can produce
+    # Variable-length clips are padded per batch (pad_collate / with_lengths)
+    if uint8_output:
+        collate_fn = SharedBatchCollator(ring_size=config.PREFETCH_FACTOR + 2, with_lengths=variable_length,
+                                         max_batch_size=videos_per_batch * dataset.clips_per_video, max_length=sequence_length)
+        val_collate_fn = SharedBatchCollator(ring_size=config.PREFETCH_FACTOR + 2, with_lengths=variable_length,
+                                             max_batch_size=batch_size, max_length=sequence_length)
+    else:
+        collate_fn = val_collate_fn = pad_collate if variable_length else None
+    if dataset.clips_per_video > 1:
+        collate_fn = MultiClipCollator(collate_fn)
 
     # Create data loaders
     train_loader = DataLoader(
         dataset,
-        batch_size=batch_size,
+        batch_size=videos_per_batch,
         sampler=train_sampler,
         num_workers=num_workers,
         pin_memory=True,
-        # Add persistent_workers=True if num_workers > 0 and PyTorch version supports it
-        # persistent_workers=True if num_workers > 0 else False,
+        collate_fn=collate_fn,
+        persistent_workers=config.PERSISTENT_WORKERS and num_workers > 0,
+        prefetch_factor=config.PREFETCH_FACTOR if num_workers > 0 else None,
+        worker_init_fn=limit_worker_threads,
     )
 
     # Create a separate dataset instance for validation with val_transform
@@ -373,7 +759,12 @@ def get_data_loaders(data_dir, batch_size=16, sequence_length=16, input_size=128
             data_dir=data_dir,
             transform=val_transform, # Use validation transform
             sequence_length=sequence_length,
-            is_training=False
+            is_training=False,
+            uint8_output=uint8_output,
+            crop_to_hands=crop_to_hands,
+            input_size=input_size,
+            variable_length=variable_length,
+            frame_cache=frame_cache
         )
     except (FileNotFoundError, NotADirectoryError, PermissionError) as e:
          print(f"  [DataLoader] CRITICAL ERROR: Failed to initialize validation dataset: {e}")
@@ -389,7 +780,10 @@ def get_data_loaders(data_dir, batch_size=16, sequence_length=16, input_size=128
         sampler=val_sampler,
         num_workers=num_workers,
         pin_memory=True,
-        # persistent_workers=True if num_workers > 0 else False,
+        collate_fn=val_collate_fn,
+        persistent_workers=config.PERSISTENT_WORKERS and num_workers > 0,
+        prefetch_factor=config.PREFETCH_FACTOR if num_workers > 0 else None,
+        worker_init_fn=limit_worker_threads,
     )
 
     print(f"Created data loaders: {len(train_indices)} training, {len(val_indices)} validation")
@@ -408,18 +802,22 @@ if __name__ == '__main__':
             if test_loader:
                 print("\nFetching one batch...")
                 start_fetch = time.time()
-                sequences, labels = next(iter(test_loader)) # This will trigger MediaPipe init and __getitem__
+                sequences, labels, lengths = unpack_batch(next(iter(test_loader))) # This will trigger MediaPipe init and __getitem__
                 fetch_time = time.time() - start_fetch
                 print(f"Batch fetched successfully in {fetch_time:.2f}s!")
                 print("Sequence shape:", sequences.shape) # Should be (batch, seq_len, 1, H, W)
                 print("Labels:", labels)
+                if lengths is not None: print("Lengths:", lengths)
                 print("Class mapping:", {i: name for i, name in enumerate(classes)})
 
                 # Visualize the first frame of the first sequence in the batch
                 first_frame_tensor = sequences[0, 0, 0, :, :] # Batch 0, Seq 0, Channel 0
-                # Denormalize (mean=0.5, std=0.5) -> (val * 0.5) + 0.5
-                first_frame_np = first_frame_tensor.numpy() * 0.5 + 0.5
-                first_frame_np = np.clip(first_frame_np * 255, 0, 255).astype(np.uint8)
+                if first_frame_tensor.dtype == torch.uint8:
+                    first_frame_np = first_frame_tensor.numpy()
+                else:
+                    # Denormalize (mean=0.5, std=0.5) -> (val * 0.5) + 0.5
+                    first_frame_np = first_frame_tensor.numpy() * 0.5 + 0.5
+                    first_frame_np = np.clip(first_frame_np * 255, 0, 255).astype(np.uint8)
 
                 cv2.imshow("Sample Masked Grayscale Frame (Normalized)", first_frame_np)
                 print("Displaying sample frame. Press any key to close.")
@@ -0,0 +1,175 @@
+"""Streaming evaluation of one or more models over a fixed, ordered manifest.
+
+The evaluation set is a manifest (EVAL_MANIFEST_PATH). It is a JSON file
+holding the class names and the evaluated video directories, relative to
+the data directory, in the order they are scored. create_manifest builds one
+from the same seeded validation split that get_data_loaders uses. A saved
+manifest keeps the set and its order fixed, even if clips are added to the
+data directory later.
+
+evaluate_models reads each batch once and feeds it to every model. For
+each model it keeps only a confusion matrix, which np.bincount updates per
+batch. Comparing N checkpoints therefore costs one decoding and masking
+pass instead of N. The per-sample logits, in manifest order, go to one
+.npz file (save_logits) for later analysis without re-running the models.
+"""
+import json
+import os
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+
+from configs import config
+from utils.data_utils import (SharedBatchCollator, SignLanguageDataset, build_transforms, pad_collate, split_indices,
+                              unpack_batch)
+from utils.metrics import accumulate_confusion_matrix
+from utils.runtime_profile import limit_worker_threads
+
+MANIFEST_VERSION = 1
+# Every model scored in one pass sees the same preprocessed clips, so these must agree
+PREPROCESSING_KEYS = ('input_size', 'sequence_length', 'masking_backend', 'crop_to_hands', 'variable_length')
+
+
+def create_manifest(data_dir, validation_split):
+    """Manifest of the validation split of `data_dir` (the split get_data_loaders makes), in dataset order."""
+    dataset = SignLanguageDataset(data_dir=data_dir, is_training=False)
+    if len(dataset) == 0:
+        raise ValueError(f"No video samples found in {data_dir}.")
+    _, val_indices = split_indices([label for _, label in dataset.samples], validation_split, dataset.classes)
+    return {
+        'version': MANIFEST_VERSION,
+        'validation_split': validation_split,
+        'class_names': list(dataset.classes),
+        'samples': [{'video': os.path.relpath(dataset.samples[i][0], data_dir), 'label': dataset.classes[dataset.samples[i][1]]}
+                    for i in sorted(val_indices)],
+        'created': time.time(),
+    }
+
+def save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_manifest(path):
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get('version', 0) > MANIFEST_VERSION:
+        raise ValueError(f"Manifest version {manifest['version']} is newer than supported ({MANIFEST_VERSION}).")
+    return manifest
+
+def load_or_create_manifest(path, data_dir, validation_split):
+    """The manifest at `path`; created from the validation split of `data_dir` and saved there if missing."""
+    if os.path.exists(path):
+        manifest = load_manifest(path)
+        print(f"Using evaluation manifest {path} ({len(manifest['samples'])} clips)")
+        return manifest
+    manifest = create_manifest(data_dir, validation_split)
+    save_manifest(path, manifest)
+    print(f"Created evaluation manifest {path} from the validation split ({len(manifest['samples'])} clips)")
+    return manifest
+
+
+def manifest_loader(manifest, data_dir, batch_size, num_workers, uint8_output=None):
+    """DataLoader over the manifest's clips in order, preprocessed with the current config (as validation)."""
+    if uint8_output is None:
+        uint8_output = config.UINT8_DATA_PATH
+    _, val_transform = build_transforms(config.INPUT_SIZE, uint8_output)
+    dataset = SignLanguageDataset(
+        data_dir=data_dir,
+        transform=val_transform,
+        sequence_length=config.SEQUENCE_LENGTH,
+        is_training=False,
+        uint8_output=uint8_output,
+        crop_to_hands=config.CROP_TO_HANDS,
+        input_size=config.INPUT_SIZE,
+        variable_length=config.VARIABLE_LENGTH_CLIPS
+    )
+    # The manifest, not the directory listing, decides which clips are scored and in what order
+    dataset.classes = list(manifest['class_names'])
+    dataset.class_to_idx = {name: i for i, name in enumerate(dataset.classes)}
+    dataset.samples = [(os.path.join(data_dir, sample['video']), dataset.class_to_idx[sample['label']])
+                       for sample in manifest['samples']]
+    if uint8_output:
+        collate_fn = SharedBatchCollator(ring_size=config.PREFETCH_FACTOR + 2, with_lengths=config.VARIABLE_LENGTH_CLIPS,
+                                         max_batch_size=batch_size, max_length=config.SEQUENCE_LENGTH)
+    else:
+        collate_fn = pad_collate if config.VARIABLE_LENGTH_CLIPS else None
+    return DataLoader(
+        dataset,
+        batch_size=batch_size,
+        shuffle=False,
+        num_workers=num_workers,
+        pin_memory=True,
+        collate_fn=collate_fn,
+        prefetch_factor=config.PREFETCH_FACTOR if num_workers > 0 else None,
+        worker_init_fn=limit_worker_threads,
+    )
+
+def check_compatible(metadatas):
+    """Raises ValueError unless all models share class names and preprocessing (one pass can score them all)."""
+    first = metadatas[0]
+    for metadata in metadatas[1:]:
+        if metadata['class_names'] != first['class_names']:
+            raise ValueError("Models have different class names.")
+        differing = [key for key in PREPROCESSING_KEYS if metadata[key] != first[key]]
+        if differing:
+            raise ValueError("Models were trained with different preprocessing: " +
+                             ", ".join(f"{key} {first[key]} vs {metadata[key]}" for key in differing))
+
+
+def evaluate_models(models, data_loader, device, num_classes):
+    """Scores every model on each batch as it arrives.
+
+    Returns (confusion_matrices, logits, labels):
+    - confusion_matrices: (num_models, C, C) int64, rows = true labels
+    - logits: (num_models, num_samples, C) float16, in manifest order
+    - labels: (num_samples,) int64; -1 marks clips that failed to load,
+      which are not counted in the matrices
+    """
+    num_samples = len(data_loader.dataset)
+    confusion_matrices = np.zeros((len(models), num_classes, num_classes), dtype=np.int64)
+    logits = np.zeros((len(models), num_samples, num_classes), dtype=np.float16)
+    labels = np.full(num_samples, -1, dtype=np.int64)
+    for model in models:
+        model.eval()
+
+    num_batches = len(data_loader)
+    offset = 0
+    start = time.perf_counter()
+    with torch.inference_mode():
+        for i, batch in enumerate(data_loader):
+            sequences, batch_labels, lengths = unpack_batch(batch)
+            sequences = sequences.to(device, non_blocking=True)
+            batch_labels = batch_labels.numpy().copy() # The collator may reuse its buffers
+            end = offset + len(batch_labels)
+            labels[offset:end] = batch_labels
+            valid = batch_labels >= 0
+            for m, model in enumerate(models):
+                batch_logits = model(sequences, lengths).float().cpu().numpy()
+                logits[m, offset:end] = batch_logits
+                accumulate_confusion_matrix(confusion_matrices[m], batch_labels[valid], batch_logits[valid].argmax(axis=1))
+            offset = end
+            if (i + 1) % 10 == 0 or i + 1 == num_batches:
+                print(f"  Processed batch {i+1}/{num_batches} ({end / (time.perf_counter() - start):.1f} clips/s)")
+
+    skipped = int((labels < 0).sum())
+    if skipped:
+        print(f"Warning: {skipped} clips failed to load and were not scored.")
+    return confusion_matrices, logits, labels
+
+def save_logits(path, logits, labels, manifest, model_names):
+    """Writes per-sample logits with their labels, videos, class and model names to one .npz file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            logits=logits,
+            labels=labels,
+            videos=np.array([sample['video'] for sample in manifest['samples']]),
+            class_names=np.array(manifest['class_names']),
+            models=np.array(model_names),
+        )
+    os.replace(tmp_path, path)
@@ -0,0 +1,104 @@
+"""Shared-memory LRU cache of masked frames for the DataLoader workers.
+
+Without it every worker decodes and masks frames on its own: a video sampled
+by two workers in one epoch is processed twice, and nothing carries over to
+the next epoch. SharedFrameCache keeps masked grayscale frames in
+shared-memory tensors created in the main process before the workers start.
+Forked or spawned workers, persistent or recreated every epoch, all see the
+same cache, and it outlives them.
+
+Frames are keyed by (dataset sample index, frame index). The train and
+validation datasets built from one directory list their videos in the same
+order, so they can share a cache. Like the compact clips
+(utils/compact_storage.py), a frame is stored as the crop of its non-zero box.
+Each crop goes into one fixed-size slot, and crops larger than a slot are not
+cached. When the cache is full, the least recently used slot is evicted.
+"""
+import multiprocessing
+
+import numpy as np
+import torch
+
+from configs import config
+from utils.hand_crop import masked_bbox
+
+EMPTY_KEY = -1
+# Indices into the shared counters tensor
+CLOCK, HITS, MISSES, UNCACHEABLE = range(4)
+
+
+class SharedFrameCache:
+    """Fixed-budget LRU cache of masked frames shared across processes.
+
+    One lock guards lookups, copies in and out, and evictions. Holding it
+    during the copy keeps a slot from being evicted while it is being read.
+    """
+    def __init__(self, budget_bytes=None, slot_bytes=None):
+        budget_bytes = config.FRAME_CACHE_BYTES if budget_bytes is None else budget_bytes
+        self.slot_bytes = slot_bytes or config.FRAME_CACHE_SLOT_BYTES
+        self.num_slots = max(1, budget_bytes // self.slot_bytes)
+        self._data = torch.empty((self.num_slots, self.slot_bytes), dtype=torch.uint8).share_memory_()
+        self._keys = torch.full((self.num_slots, 2), EMPTY_KEY, dtype=torch.int64).share_memory_()
+        self._meta = torch.zeros((self.num_slots, 6), dtype=torch.int32).share_memory_() # H, W, x0, y0, x1, y1
+        self._last_used = torch.zeros(self.num_slots, dtype=torch.int64).share_memory_() # 0 = never (evicted first)
+        self._counters = torch.zeros(4, dtype=torch.int64).share_memory_()
+        self._lock = multiprocessing.Lock()
+
+    @property
+    def budget_bytes(self):
+        return self.num_slots * self.slot_bytes
+
+    def get_many(self, video, frame_indices):
+        """{frame index: masked frame} for the cached frames of one video; counts hits and misses."""
+        frame_indices = set(int(i) for i in frame_indices)
+        found = {}
+        with self._lock:
+            keys = self._keys.numpy()
+            counters = self._counters.numpy()
+            last_used = self._last_used.numpy()
+            for slot in np.flatnonzero(keys[:, 0] == video).tolist():
+                frame = int(keys[slot, 1])
+                if frame not in frame_indices:
+                    continue
+                height, width, x0, y0, x1, y1 = self._meta.numpy()[slot].tolist()
+                masked = np.zeros((height, width), dtype=np.uint8)
+                masked[y0:y1, x0:x1] = self._data.numpy()[slot, :(y1 - y0) * (x1 - x0)].reshape(y1 - y0, x1 - x0)
+                found[frame] = masked
+                counters[CLOCK] += 1
+                last_used[slot] = counters[CLOCK]
+            counters[HITS] += len(found)
+            counters[MISSES] += len(frame_indices) - len(found)
+        return found
+
+    def put(self, video, frame, masked_gray):
+        """Stores one masked frame, evicting the least recently used slot; False if it doesn't fit."""
+        x0, y0, x1, y1 = masked_bbox(masked_gray) or (0, 0, 0, 0)
+        size = (y1 - y0) * (x1 - x0)
+        with self._lock:
+            counters = self._counters.numpy()
+            if size > self.slot_bytes:
+                counters[UNCACHEABLE] += 1
+                return False
+            keys = self._keys.numpy()
+            if np.any((keys[:, 0] == video) & (keys[:, 1] == frame)):
+                return True # Another worker stored it first
+            last_used = self._last_used.numpy()
+            slot = int(np.argmin(last_used))
+            self._data.numpy()[slot, :size] = masked_gray[y0:y1, x0:x1].ravel()
+            self._meta.numpy()[slot] = (masked_gray.shape[0], masked_gray.shape[1], x0, y0, x1, y1)
+            keys[slot] = (video, frame)
+            counters[CLOCK] += 1
+            last_used[slot] = counters[CLOCK]
+        return True
+
+    def stats(self, reset=False):
+        """Hit/miss counts since the last reset (e.g. one epoch) and the slots in use."""
+        with self._lock:
+            counters = self._counters.numpy()
+            hits, misses, uncacheable = int(counters[HITS]), int(counters[MISSES]), int(counters[UNCACHEABLE])
+            used_slots = int(np.count_nonzero(self._keys.numpy()[:, 0] != EMPTY_KEY))
+            if reset:
+                counters[[HITS, MISSES, UNCACHEABLE]] = 0
+        lookups = hits + misses
+        return {'hits': hits, 'misses': misses, 'hit_rate': hits / lookups if lookups else 0.0,
+                'uncacheable': uncacheable, 'used_slots': used_slots, 'num_slots': self.num_slots}
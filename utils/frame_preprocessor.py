@@ -0,0 +1,81 @@
+"""Allocation-free OpenCV preprocessing of masked grayscale frames for the inference paths.
+
+Replaces ToPILImage -> Resize -> ToTensor -> Normalize: frames are resized with
+cv2.resize into a preallocated uint8 buffer and normalized through a 256-entry
+lookup table straight into a preallocated (T, 1, H, W) float32 ring tensor.
+"""
+import cv2
+import numpy as np
+import torch
+
+from configs import config
+from models import SignLanguageModel
+
+
+def resize_frame(frame, input_size, dst=None):
+    """Resizes a grayscale frame to (input_size, input_size).
+
+    INTER_AREA when shrinking and INTER_LINEAR when enlarging; this is the
+    closest OpenCV match to PIL's antialiased bilinear used by transforms.Resize.
+    """
+    height, width = frame.shape[:2]
+    interpolation = cv2.INTER_AREA if height >= input_size and width >= input_size else cv2.INTER_LINEAR
+    if dst is None:
+        return cv2.resize(frame, (input_size, input_size), interpolation=interpolation)
+    cv2.resize(frame, (input_size, input_size), dst=dst, interpolation=interpolation)
+    return dst
+
+
+class FramePreprocessor:
+    """Resizes and normalizes masked grayscale frames into preallocated tensors.
+
+    push() appends to a ring of the last `sequence_length` frames; sequence()
+    returns them oldest-first as a (1, T, 1, H, W) batch in a reused tensor.
+    One instance must not be used from several threads at once.
+    """
+    def __init__(self, input_size=config.INPUT_SIZE, sequence_length=config.SEQUENCE_LENGTH,
+                 mean=SignLanguageModel.INPUT_MEAN, std=SignLanguageModel.INPUT_STD):
+        self.input_size = input_size
+        self.sequence_length = sequence_length
+        # (x / 255 - mean) / std for every possible uint8 value
+        self._lut = ((np.arange(256, dtype=np.float32) / 255.0 - mean) / std).astype(np.float32)
+        self._resized = np.empty((input_size, input_size), dtype=np.uint8)
+        self.ring = torch.empty((sequence_length, 1, input_size, input_size), dtype=torch.float32)
+        self._ring_np = self.ring.numpy() # Shares memory with self.ring
+        self._ordered = torch.empty((1, sequence_length, 1, input_size, input_size), dtype=torch.float32)
+        self._head = 0
+        self._count = 0
+
+    def transform(self, masked_gray, out=None):
+        """Resizes and normalizes one frame into `out` (a (1, H, W) float32 tensor) or a new tensor."""
+        if out is None:
+            out = torch.empty((1, self.input_size, self.input_size), dtype=torch.float32)
+        resize_frame(masked_gray, self.input_size, dst=self._resized)
+        np.take(self._lut, self._resized, out=out.numpy()[0], mode='clip')
+        return out
+
+    def push(self, masked_gray):
+        """Appends one frame to the ring, overwriting the oldest when full."""
+        self.transform(masked_gray, out=self.ring[self._head])
+        self._head = (self._head + 1) % self.sequence_length
+        self._count = min(self._count + 1, self.sequence_length)
+
+    def __len__(self):
+        return self._count
+
+    def is_full(self):
+        return self._count == self.sequence_length
+
+    def reset(self):
+        self._head = 0
+        self._count = 0
+
+    def sequence(self):
+        """The buffered frames oldest-first as (1, T, 1, H, W); valid until the next call."""
+        oldest = self._head if self.is_full() else 0
+        count = self._count
+        tail = min(count, self.sequence_length - oldest)
+        self._ordered[0, :tail].copy_(self.ring[oldest:oldest + tail])
+        if tail < count:
+            self._ordered[0, tail:count].copy_(self.ring[:count - tail])
+        return self._ordered[:, :count]
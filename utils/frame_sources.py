@@ -0,0 +1,154 @@
+"""Pluggable frame sources and display sinks for the live detection loop (detect.py).
+
+real_time_detection reads BGR frames from a source and hands each overlay
+to a sink:
+
+- CameraSource probes camera indices like the original loop.
+- VideoFileSource replays a recorded session.
+- SyntheticSource generates a deterministic moving skin-coloured blob.
+- WindowSink shows frames with cv2.imshow and returns the pressed key.
+- HeadlessSink needs no GUI. It can optionally write the overlays to a
+  video file.
+
+File and synthetic sources support two kinds of pacing. "realtime" delivers
+each frame no earlier than its timestamp at the source fps, as a camera
+would. "fast" delivers frames as quickly as the consumer takes them.
+"""
+import time
+
+import cv2
+import numpy as np
+
+PACING_MODES = ("realtime", "fast")
+
+
+class _PacedSource:
+    """Base for sources with their own clock: paces frames at `fps` in realtime mode."""
+    def __init__(self, fps, pacing):
+        if pacing not in PACING_MODES:
+            raise ValueError(f"Unknown pacing '{pacing}', expected one of {PACING_MODES}.")
+        self.fps = fps
+        self.pacing = pacing
+        self.frame_index = 0
+        self._start = None
+
+    def _wait_for_frame(self):
+        if self.pacing != "realtime":
+            return
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+        delay = self._start + self.frame_index / self.fps - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def read(self):
+        """(ok, frame_bgr), like cv2.VideoCapture.read()."""
+        self._wait_for_frame()
+        ok, frame = self._next_frame()
+        if ok:
+            self.frame_index += 1
+        return ok, frame
+
+    def release(self):
+        pass
+
+
+class CameraSource:
+    """The first camera among `indices` that opens."""
+    def __init__(self, indices=(0, 1, 2)):
+        self.cap = None
+        for idx in indices:
+            try:
+                cap = cv2.VideoCapture(idx)
+                if cap.isOpened():
+                    self.cap = cap
+                    break
+                cap.release()
+            except Exception as e:
+                print(f"Error opening camera index {idx}: {e}")
+        if self.cap is None:
+            raise RuntimeError("Failed to open camera.")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(_PacedSource):
+    """Frames of a video file at its own frame rate (or as fast as possible)."""
+    def __init__(self, path, pacing="fast", max_frames=None):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video {path}")
+        super().__init__(self.cap.get(cv2.CAP_PROP_FPS) or 30.0, pacing)
+        self.max_frames = max_frames
+
+    def _next_frame(self):
+        if self.max_frames is not None and self.frame_index >= self.max_frames:
+            return False, None
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class SyntheticSource(_PacedSource):
+    """A skin-coloured blob moving over a static background; identical for a given seed."""
+    def __init__(self, num_frames=300, size=(480, 640), fps=30.0, pacing="fast", seed=0):
+        super().__init__(fps, pacing)
+        self.num_frames = num_frames
+        rng = np.random.default_rng(seed)
+        height, width = size
+        self._background = rng.integers(40, 90, size=(height, width, 3), dtype=np.uint8)
+        # Lissajous path with seed-dependent phase, so the blob keeps moving
+        self._phase = rng.uniform(0, 2 * np.pi, size=2)
+        self._frame = np.empty_like(self._background)
+
+    def _next_frame(self):
+        if self.frame_index >= self.num_frames:
+            return False, None
+        height, width = self._background.shape[:2]
+        t = self.frame_index / self.fps
+        center = (int(width * (0.5 + 0.3 * np.sin(1.3 * t + self._phase[0]))),
+                  int(height * (0.5 + 0.3 * np.sin(0.9 * t + self._phase[1]))))
+        np.copyto(self._frame, self._background)
+        cv2.circle(self._frame, center, min(height, width) // 8, (120, 150, 200), -1) # BGR skin tone
+        return True, self._frame.copy() # Callers may keep frames
+
+
+class WindowSink:
+    """Shows frames in an OpenCV window; show() returns the pressed key (or -1)."""
+    def __init__(self, title='Sign Language Detection (Masked)'):
+        self.title = title
+
+    def show(self, frame):
+        cv2.imshow(self.title, frame)
+        return cv2.waitKey(1) & 0xFF
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+class HeadlessSink:
+    """Discards frames, or writes them to `output_path` as an mp4; never reports a key."""
+    def __init__(self, output_path=None, fps=30.0):
+        self.output_path = output_path
+        self.fps = fps
+        self._writer = None
+
+    def show(self, frame):
+        if self.output_path is not None:
+            if self._writer is None:
+                height, width = frame.shape[:2]
+                self._writer = cv2.VideoWriter(self.output_path, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (width, height))
+            self._writer.write(frame)
+        return -1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
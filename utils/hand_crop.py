@@ -0,0 +1,98 @@
+"""Hand-centred cropping of masked grayscale frames (config.CROP_TO_HANDS).
+
+After masking only the convex hull of the hands is non-zero, so resizing the
+whole frame spends most of the input pixels (and CNN compute) on black. In
+crop mode each clip is cropped to one padded, square box around the hands
+before resizing: the union over the clip for offline clips (dataset,
+predict_video, SignPredictor.preprocess_clip), or an exponentially smoothed
+box for live streams (detect.py, serve.py /stream, segment_video.py). The
+same box is used for every frame of a clip, so hand motion stays visible.
+"""
+import cv2
+import numpy as np
+
+from configs import config
+
+
+def masked_bbox(masked_gray):
+    """(x0, y0, x1, y1) of the non-zero pixels of a masked frame (x1/y1 exclusive), or None."""
+    points = cv2.findNonZero(masked_gray)
+    if points is None:
+        return None
+    x, y, w, h = cv2.boundingRect(points)
+    return x, y, x + w, y + h
+
+def union_bbox(boxes):
+    """Smallest box containing every non-None box, or None."""
+    boxes = [b for b in boxes if b is not None]
+    if not boxes:
+        return None
+    boxes = np.array(boxes)
+    return int(boxes[:, 0].min()), int(boxes[:, 1].min()), int(boxes[:, 2].max()), int(boxes[:, 3].max())
+
+def square_crop_box(box, frame_shape, padding=None):
+    """Pads a box by `padding` (fraction of its longer side) and makes it square, shifted to fit the frame.
+
+    The model input is square, so a square crop keeps the hands' aspect ratio.
+    Returns integer (x0, y0, x1, y1), or the whole frame if box is None.
+    """
+    height, width = frame_shape[:2]
+    if box is None:
+        return 0, 0, width, height
+    if padding is None:
+        padding = config.HAND_CROP_PADDING
+    x0, y0, x1, y1 = box
+    side = max(x1 - x0, y1 - y0) * (1 + 2 * padding)
+    side = int(round(min(max(side, config.HAND_CROP_MIN_SIZE), width, height)))
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    left = int(round(min(max(cx - side / 2, 0), width - side)))
+    top = int(round(min(max(cy - side / 2, 0), height - side)))
+    return left, top, left + side, top + side
+
+def crop_frame(frame, crop_box):
+    """View of the frame inside a box from square_crop_box (no copy)."""
+    x0, y0, x1, y1 = crop_box
+    return frame[y0:y1, x0:x1]
+
+def crop_clip_to_hands(masked_frames, padding=None):
+    """Crops every frame of a clip to the padded union box of the hands over the whole clip.
+
+    Frames whose shape differs from the first one (e.g. blank fallbacks) are
+    left as they are; frames are returned as views.
+    """
+    if not masked_frames:
+        return masked_frames
+    frame_shape = masked_frames[0].shape
+    box = union_bbox([masked_bbox(f) for f in masked_frames if f.shape == frame_shape])
+    crop_box = square_crop_box(box, frame_shape, padding)
+    return [crop_frame(f, crop_box) if f.shape == frame_shape else f for f in masked_frames]
+
+
+class HandBoxTracker:
+    """Exponentially smoothed hand box for frame-by-frame (live) cropping.
+
+    update() takes each masked frame in order and returns the crop box to use
+    for it. When no hands are visible the last box is kept, so the crop does
+    not jump back to the full frame between detections.
+    """
+    def __init__(self, smoothing=None, padding=None):
+        self.smoothing = config.HAND_CROP_SMOOTHING if smoothing is None else smoothing
+        self.padding = padding
+        self._box = None
+
+    def reset(self):
+        self._box = None
+
+    def update(self, masked_gray):
+        box = masked_bbox(masked_gray)
+        if box is not None:
+            box = np.array(box, dtype=np.float32)
+            if self._box is None:
+                self._box = box
+            else:
+                self._box += self.smoothing * (box - self._box)
+        return square_crop_box(None if self._box is None else tuple(self._box), masked_gray.shape, self.padding)
+
+    def crop(self, masked_gray):
+        """Updates the box with this frame and returns the frame cropped to it."""
+        return crop_frame(masked_gray, self.update(masked_gray))
@@ -0,0 +1,205 @@
+"""Shared inference helpers: model loading, clip preprocessing and batched prediction."""
+import os
+import threading
+import cv2
+import numpy as np
+import torch
+
+from configs import config
+from utils.data_utils import apply_mediapipe_mask_and_grayscale, create_hands_detector, mask_clip_frames, pad_sequences
+from utils.frame_preprocessor import FramePreprocessor
+from utils.hand_crop import crop_clip_to_hands
+from utils.model_bundle import load_inference_model
+
+# --- Per-thread MediaPipe detectors (a Hands instance must not be shared across threads) ---
+_thread_state = threading.local()
+
+def get_thread_hands_detector(backend=None):
+    """Returns the calling thread's static-image detector for `backend` (default: config.MASKING_BACKEND)."""
+    backend = backend or config.MASKING_BACKEND
+    detectors = getattr(_thread_state, "detectors", None)
+    if detectors is None:
+        detectors = _thread_state.detectors = {}
+    detector = detectors.get(backend)
+    if detector is None:
+        print(f"  [MediaPipe Inference] Initializing {backend} detector for thread {threading.current_thread().name}...")
+        detector = detectors[backend] = create_hands_detector(static_image_mode=True, backend=backend)
+    return detector
+
+
+def load_class_names(file_path):
+    """Load class names from file."""
+    if not os.path.exists(file_path):
+        print(f"Error: Class names file not found at {file_path}")
+        return None
+    try:
+        with open(file_path, 'r') as f:
+            return [line.strip() for line in f.readlines()]
+    except Exception as e:
+        print(f"Error reading class names file {file_path}: {e}")
+        return None
+
+def get_thread_frame_preprocessor(input_size):
+    """Returns the FramePreprocessor (resize scratch buffer) belonging to the calling thread."""
+    preprocessor = getattr(_thread_state, "preprocessor", None)
+    if preprocessor is None or preprocessor.input_size != input_size:
+        preprocessor = FramePreprocessor(input_size, sequence_length=1) # Only transform() is used
+        _thread_state.preprocessor = preprocessor
+    return preprocessor
+
+def sample_sequence_indices(num_frames, sequence_length, pad=True):
+    """Indices of the frames used for one clip: evenly spaced, or padded with the last frame.
+
+    With pad=False a short clip keeps its true length (variable-length models).
+    """
+    if num_frames < sequence_length:
+        if not pad:
+            return list(range(num_frames))
+        return list(range(num_frames)) + [num_frames - 1] * (sequence_length - num_frames)
+    if num_frames > sequence_length:
+        return np.linspace(0, num_frames - 1, sequence_length).astype(int).tolist()
+    return list(range(sequence_length))
+
+def stack_clips(sequences):
+    """(batch, lengths) from (T_i, 1, H, W) clips.
+
+    Clips of one length are simply stacked (lengths None); otherwise they are
+    zero-padded at the end and lengths holds their true lengths for the packed LSTM.
+    """
+    lengths = [sequence.size(0) for sequence in sequences]
+    if len(set(lengths)) == 1:
+        return torch.stack(sequences), None
+    lengths = torch.as_tensor(lengths, dtype=torch.long)
+    out = sequences[0].new_empty((len(sequences), int(lengths.max())) + tuple(sequences[0].shape[1:]))
+    return pad_sequences(sequences, out), lengths
+
+
+class SignPredictor:
+    """Holds one loaded model and turns raw BGR frames into class probabilities.
+
+    The model comes from a model bundle (utils/model_bundle.py) or from
+    legacy weights plus a class names file. Clips are preprocessed with the
+    bundle's input size, sequence length, masking backend and hand crop
+    (config values for legacy files). An already built model and class list
+    can be passed instead (used by benchmarks that run on randomly
+    initialized weights); it is preprocessed per config.
+    """
+    def __init__(self, model_path=None, class_names_file=None, device=None, model=None, class_names=None):
+        self.device = device or torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.sequence_length = config.SEQUENCE_LENGTH
+        self.input_size = config.INPUT_SIZE
+        self.masking_backend = config.MASKING_BACKEND
+        self.crop_to_hands = config.CROP_TO_HANDS
+        self.variable_length = config.VARIABLE_LENGTH_CLIPS
+        if model is not None:
+            self.model = model.to(self.device).eval()
+            self.class_names = class_names if class_names is not None else load_class_names(class_names_file or config.CLASS_NAMES_FILE)
+            if self.class_names is None:
+                raise FileNotFoundError(f"Class names file not found or unreadable: {class_names_file or config.CLASS_NAMES_FILE}")
+        else:
+            self.model, metadata = load_inference_model(self.device, model_path, class_names_file)
+            if self.model is None:
+                raise RuntimeError(f"Failed to load model from {model_path or 'the default model path'}")
+            self.class_names = class_names if class_names is not None else metadata['class_names']
+            self.sequence_length = metadata['sequence_length']
+            self.input_size = metadata['input_size']
+            self.masking_backend = metadata['masking_backend']
+            self.crop_to_hands = metadata['crop_to_hands']
+            self.variable_length = metadata['variable_length']
+        self.num_classes = len(self.class_names)
+        self.neutral_idx = self.class_names.index('neutral') if 'neutral' in self.class_names else -1
+
+    def create_detector(self, static_image_mode=True):
+        """A new detector for the model's masking backend, owned by the caller (see create_hands_detector)."""
+        return create_hands_detector(static_image_mode=static_image_mode, backend=self.masking_backend)
+
+    def mask_frame(self, frame_bgr, detector=None):
+        """Masks one BGR frame to grayscale with the given (or this thread's) detector."""
+        frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+        if detector is None:
+            detector = get_thread_hands_detector(self.masking_backend)
+        return apply_mediapipe_mask_and_grayscale(frame_rgb, detector=detector)
+
+    def _mask_stream_frame(self, frame_bgr, detector, hand_box):
+        processed_frame = self.mask_frame(frame_bgr, detector=detector)
+        if hand_box is not None:
+            processed_frame = hand_box.crop(processed_frame)
+        return processed_frame
+
+    def preprocess_frame(self, frame_bgr, detector=None, out=None, hand_box=None):
+        """Masks one BGR frame and returns its normalized (1, H, W) tensor (written into `out` if given).
+
+        For frame-by-frame streams in crop mode, pass the stream's HandBoxTracker as hand_box.
+        """
+        processed_frame = self._mask_stream_frame(frame_bgr, detector, hand_box)
+        preprocessor = get_thread_frame_preprocessor(self.input_size)
+        return preprocessor.transform(processed_frame, out=out)
+
+    def create_frame_buffer(self):
+        """A FramePreprocessor ring of the model's last sequence_length frames, for one stream."""
+        return FramePreprocessor(self.input_size, self.sequence_length)
+
+    def push_frame(self, frame_buffer, frame_bgr, detector=None, hand_box=None):
+        """Masks one BGR frame of a stream and pushes it into `frame_buffer` (see create_frame_buffer)."""
+        frame_buffer.push(self._mask_stream_frame(frame_bgr, detector, hand_box))
+
+    def preprocess_clip(self, frames_bgr, detector=None):
+        """Samples sequence_length frames from a clip and returns a (T, 1, H, W) tensor.
+
+        Short clips of a variable-length model keep their true length (T < sequence_length), as in training.
+        """
+        if len(frames_bgr) == 0:
+            raise ValueError("Clip contains no frames.")
+        indices = sample_sequence_indices(len(frames_bgr), self.sequence_length, pad=not self.variable_length)
+        # Padding repeats the last index, so each distinct frame is masked only once
+        distinct = sorted(set(indices))
+        # Skin masks come from a per-clip stream masker over the frames in order, as in training (detector unused)
+        if detector is None and self.masking_backend != "skin":
+            detector = get_thread_hands_detector(self.masking_backend)
+        masked_frames = mask_clip_frames(frames_bgr, distinct, backend=self.masking_backend, detector=detector)
+        if self.crop_to_hands:
+            masked_frames = crop_clip_to_hands(masked_frames)
+        preprocessor = get_thread_frame_preprocessor(self.input_size)
+        transformed = torch.empty((len(distinct), 1, self.input_size, self.input_size), dtype=torch.float32)
+        for slot, processed_frame in enumerate(masked_frames):
+            preprocessor.transform(processed_frame, out=transformed[slot])
+        slots = {i: slot for slot, i in enumerate(distinct)}
+        return transformed[[slots[i] for i in indices]]
+
+    def probabilities_from_logits(self, outputs):
+        """Softmax plus the neutral handicap; returns (B, num_classes) numpy probabilities."""
+        probs = torch.nn.functional.softmax(outputs, dim=1)
+        # Apply Neutral Handicap
+        if self.neutral_idx != -1 and config.NEUTRAL_HANDICAP > 0:
+            probs[:, self.neutral_idx] = torch.clamp(probs[:, self.neutral_idx] - config.NEUTRAL_HANDICAP, min=0.0)
+            probs = probs / probs.sum(dim=1, keepdim=True) # Renormalize
+        return probs.cpu().numpy()
+
+    def predict_batch(self, sequences, lengths=None):
+        """Runs one forward on a (B, T, 1, H, W) batch; returns (B, num_classes) probabilities.
+
+        For zero-padded clips of different lengths pass their true lengths (see stack_clips).
+        """
+        with torch.no_grad():
+            outputs = self.model(sequences.to(self.device), lengths)
+        return self.probabilities_from_logits(outputs)
+
+    def embed_frames(self, frames):
+        """CNN embeddings for (N, 1, H, W) preprocessed frames, computed once per frame."""
+        with torch.no_grad():
+            return self.model.extract_features(frames.to(self.device))
+
+    def predict_features(self, features):
+        """Classifies (B, T, F) windows of precomputed frame embeddings."""
+        with torch.no_grad():
+            outputs = self.model.classify_features(features.to(self.device))
+        return self.probabilities_from_logits(outputs)
+
+    def describe(self, probabilities, top_k=5):
+        """Formats one row of probabilities as a JSON-serializable prediction."""
+        order = np.argsort(probabilities)[::-1][:top_k]
+        return {
+            'label': self.class_names[int(order[0])],
+            'confidence': float(probabilities[order[0]]),
+            'top': [{'label': self.class_names[int(i)], 'probability': float(probabilities[i])} for i in order],
+        }
@@ -1,6 +1,5 @@
 """Evaluation metrics calculation."""
 
-from sklearn.metrics import accuracy_score, precision_recall_fscore_support, confusion_matrix
 import numpy as np
 
 def calculate_metrics(y_true, y_pred, average='weighted'):
@@ -16,6 +15,7 @@ def calculate_metrics(y_true, y_pred, average='weighted'):
     Returns:
         A dictionary containing accuracy, precision, recall, and f1-score.
     """
+    from sklearn.metrics import accuracy_score, precision_recall_fscore_support
     accuracy = accuracy_score(y_true, y_pred)
     precision, recall, f1, _ = precision_recall_fscore_support(
         y_true, y_pred, average=average, zero_division=0
@@ -28,6 +28,86 @@ def calculate_metrics(y_true, y_pred, average='weighted'):
         'f1': f1
     }
 
+def accumulate_confusion_matrix(cm, y_true, y_pred):
+    """
+    Adds (true, predicted) label pairs to a confusion matrix in place.
+
+    One np.bincount over the flattened pair index, so a stream of batches
+    needs only the (num_classes, num_classes) matrix, not every label.
+
+    Args:
+        cm: (num_classes, num_classes) integer array, rows = true labels, columns = predictions.
+        y_true: Array of true labels.
+        y_pred: Array of predicted labels.
+
+    Returns:
+        cm, updated.
+    """
+    num_classes = cm.shape[0]
+    pairs = np.asarray(y_true, dtype=np.int64) * num_classes + np.asarray(y_pred, dtype=np.int64)
+    cm += np.bincount(pairs, minlength=num_classes * num_classes).reshape(num_classes, num_classes)
+    return cm
+
+def per_class_metrics(cm):
+    """
+    Per-class precision, recall, f1-score and support from a confusion matrix.
+
+    Args:
+        cm: (num_classes, num_classes) array, rows = true labels, columns = predictions.
+
+    Returns:
+        A dictionary of (num_classes,) arrays (zero_division=0, as in calculate_metrics).
+    """
+    cm = np.asarray(cm, dtype=np.float64)
+    true_positives = np.diag(cm)
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+    precision = np.divide(true_positives, predicted, out=np.zeros_like(true_positives), where=predicted > 0)
+    recall = np.divide(true_positives, support, out=np.zeros_like(true_positives), where=support > 0)
+    denominator = precision + recall
+    f1 = np.divide(2 * precision * recall, denominator, out=np.zeros_like(true_positives), where=denominator > 0)
+    return {'precision': precision, 'recall': recall, 'f1': f1, 'support': support, 'predicted': predicted}
+
+def metrics_from_confusion_matrix(cm, average='weighted'):
+    """
+    Calculates the metrics of calculate_metrics from a confusion matrix.
+
+    Lets metrics be computed from per-process matrices summed with an
+    all-reduce (distributed validation) instead of gathering every label.
+
+    Args:
+        cm: (num_classes, num_classes) array, rows = true labels, columns = predictions.
+        average: 'weighted', 'macro' or 'micro' (as in calculate_metrics).
+
+    Returns:
+        A dictionary containing accuracy, precision, recall, and f1-score.
+    """
+    cm = np.asarray(cm, dtype=np.float64)
+    total = cm.sum()
+    if total == 0:
+        return {'accuracy': 0.0, 'precision': 0.0, 'recall': 0.0, 'f1': 0.0}
+    accuracy = np.diag(cm).sum() / total
+    if average == 'micro':
+        return {'accuracy': accuracy, 'precision': accuracy, 'recall': accuracy, 'f1': accuracy}
+
+    per_class = per_class_metrics(cm)
+    support, predicted = per_class['support'], per_class['predicted']
+    if average == 'weighted':
+        weights = support / total
+    elif average == 'macro':
+        # Like sklearn, average over the labels that occur in y_true or y_pred
+        present = (support > 0) | (predicted > 0)
+        weights = present / present.sum()
+    else:
+        raise ValueError(f"Unsupported average: {average}")
+
+    return {
+        'accuracy': accuracy,
+        'precision': float((per_class['precision'] * weights).sum()),
+        'recall': float((per_class['recall'] * weights).sum()),
+        'f1': float((per_class['f1'] * weights).sum())
+    }
+
 def calculate_confusion_matrix(y_true, y_pred, class_names=None):
     """
     Calculates the confusion matrix.
@@ -40,6 +120,7 @@ def calculate_confusion_matrix(y_true, y_pred, class_names=None):
     Returns:
         A numpy array representing the confusion matrix.
     """
+    from sklearn.metrics import confusion_matrix
     cm = confusion_matrix(y_true, y_pred, labels=np.arange(len(class_names)) if class_names else None)
     return cm
 
@@ -0,0 +1,178 @@
+"""Self-describing single-file model bundles, loaded through mmap.
+
+A bundle (MODEL_BUNDLE_PATH, written by train.py next to best_model.pth) is
+a torch zip file holding one dict:
+
+    format      "signlang-model-bundle"
+    version     1
+    metadata    the architecture (SignLanguageModel.architecture: backbone,
+                head, input size, CNN feature size, LSTM sizes), class names,
+                sequence length, input normalization, and the preprocessing the
+                model was trained with (masking backend, hand crop, variable length)
+    state_dict  the weights
+
+Loading builds the recorded architecture on the meta device, so there are no
+random initializations and no CNN probe forward. It then assigns the tensors
+of the mmap'd file as the parameters (load_state_dict(assign=True)), so on
+CPU nothing is copied. Processes serving the same bundle share its
+page-cached pages, and a cold start only reads the pages the model touches.
+
+Older best_model.pth + class_names.txt pairs still load. Their architecture
+is taken from configs/config.py as before. Convert one with:
+
+    python -m utils.model_bundle convert saved_models/best_model.pth saved_models/class_names.txt
+    python -m utils.model_bundle inspect saved_models/model_bundle.pt
+"""
+import argparse
+import os
+import time
+
+import torch
+
+from configs import config
+from models import SignLanguageModel
+
+BUNDLE_FORMAT = "signlang-model-bundle"
+BUNDLE_VERSION = 1
+SUPPORTED_ARCHITECTURE = {'backbone': 'resnet18', 'head': 'lstm', 'in_channels': 1}
+
+
+def default_model_path():
+    """MODEL_BUNDLE_PATH if it exists, else the legacy BEST_MODEL_PATH."""
+    return config.MODEL_BUNDLE_PATH if os.path.exists(config.MODEL_BUNDLE_PATH) else config.BEST_MODEL_PATH
+
+def build_bundle(model, class_names, sequence_length=None, masking_backend=None, crop_to_hands=None,
+                 variable_length=None):
+    """The bundle dict for `model` (preprocessing settings default to the current config)."""
+    if len(class_names) != model.architecture['num_classes']:
+        raise ValueError(f"{len(class_names)} class names for a model with {model.architecture['num_classes']} outputs.")
+    metadata = {
+        **model.architecture,
+        'class_names': list(class_names),
+        'sequence_length': sequence_length or config.SEQUENCE_LENGTH,
+        'normalization': {'input_dtype': 'uint8', 'scale': 1 / 255,
+                          'mean': SignLanguageModel.INPUT_MEAN, 'std': SignLanguageModel.INPUT_STD},
+        'masking_backend': masking_backend or config.MASKING_BACKEND,
+        'crop_to_hands': config.CROP_TO_HANDS if crop_to_hands is None else crop_to_hands,
+        'variable_length': config.VARIABLE_LENGTH_CLIPS if variable_length is None else variable_length,
+        'torch_version': str(torch.__version__), # TorchVersion isn't allowed by weights_only loading
+        'created': time.time(),
+    }
+    return {'format': BUNDLE_FORMAT, 'version': BUNDLE_VERSION, 'metadata': metadata, 'state_dict': model.state_dict()}
+
+def save_bundle(path, model, class_names, **settings):
+    """Writes a bundle atomically (see build_bundle for `settings`)."""
+    bundle = build_bundle(model, class_names, **settings)
+    bundle['state_dict'] = {k: v.detach().cpu().contiguous() for k, v in bundle['state_dict'].items()}
+    tmp_path = path + ".tmp"
+    torch.save(bundle, tmp_path)
+    os.replace(tmp_path, path)
+
+def read_model_file(path):
+    """torch.load of a bundle or legacy state dict, memory-mapped when the file format allows it."""
+    try:
+        return torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+    except RuntimeError: # Pre-zip (legacy) serialization can't be mapped
+        return torch.load(path, map_location='cpu', weights_only=True)
+
+def is_bundle(obj):
+    return isinstance(obj, dict) and obj.get('format') == BUNDLE_FORMAT
+
+def legacy_metadata(num_classes, class_names=None):
+    """Metadata equivalent for a plain state dict: the architecture in configs/config.py."""
+    return {
+        **SUPPORTED_ARCHITECTURE, 'num_classes': num_classes, 'input_size': config.INPUT_SIZE,
+        'cnn_output_features': None, 'hidden_size': config.HIDDEN_SIZE, 'num_lstm_layers': config.NUM_LSTM_LAYERS,
+        'bidirectional': config.BIDIRECTIONAL, 'dropout_rate': config.DROPOUT_RATE,
+        'class_names': class_names, 'sequence_length': config.SEQUENCE_LENGTH,
+        'masking_backend': config.MASKING_BACKEND, 'crop_to_hands': config.CROP_TO_HANDS,
+        'variable_length': config.VARIABLE_LENGTH_CLIPS,
+    }
+
+def build_model(metadata, state_dict, device):
+    """The recorded architecture with `state_dict` assigned as its parameters (no copy on CPU), in eval mode."""
+    for key, expected in SUPPORTED_ARCHITECTURE.items():
+        if metadata.get(key) != expected:
+            raise ValueError(f"Unsupported model {key} '{metadata.get(key)}' (this version builds {expected}).")
+    normalization = metadata.get('normalization')
+    if normalization and (normalization['mean'], normalization['std']) != (SignLanguageModel.INPUT_MEAN, SignLanguageModel.INPUT_STD):
+        raise ValueError(f"Bundle expects input normalization {normalization}, which SignLanguageModel does not apply.")
+    cnn_output_features = metadata.get('cnn_output_features')
+    if cnn_output_features is None: # Legacy file: read it off the LSTM's input weights
+        cnn_output_features = state_dict['lstm.weight_ih_l0'].shape[1]
+    with torch.device('meta'): # Shapes only; the real tensors come from the file
+        model = SignLanguageModel(num_classes=metadata['num_classes'], input_size=metadata['input_size'],
+                                  hidden_size=metadata['hidden_size'], dropout_rate=metadata['dropout_rate'],
+                                  bidirectional=metadata['bidirectional'], num_lstm_layers=metadata['num_lstm_layers'],
+                                  pretrained_backbone=False, cnn_output_features=cnn_output_features)
+    model.load_state_dict(state_dict, strict=True, assign=True)
+    return model.to(device).eval()
+
+def load_inference_model(device=None, model_path=None, class_names_file=None):
+    """(model, metadata) from a bundle, or from a legacy weights + class names pair; (None, None) on failure.
+
+    model_path defaults to default_model_path(). metadata['class_names'],
+    ['input_size'] and ['sequence_length'] describe how to feed the model.
+    """
+    device = device or torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model_path = model_path or default_model_path()
+    if not os.path.exists(model_path):
+        print(f"Error: Model file not found at {model_path}")
+        return None, None
+    try:
+        start = time.perf_counter()
+        loaded = read_model_file(model_path)
+        if is_bundle(loaded):
+            if loaded['version'] > BUNDLE_VERSION:
+                raise ValueError(f"Bundle version {loaded['version']} is newer than supported ({BUNDLE_VERSION}).")
+            metadata, state_dict = loaded['metadata'], loaded['state_dict']
+        else:
+            class_names_file = class_names_file or config.CLASS_NAMES_FILE
+            with open(class_names_file, 'r') as f:
+                class_names = [line.strip() for line in f.readlines()]
+            metadata, state_dict = legacy_metadata(len(class_names), class_names), loaded
+        model = build_model(metadata, state_dict, device)
+        print(f"Loaded {model_path} ({len(metadata['class_names'])} classes) in {time.perf_counter() - start:.2f}s")
+        return model, metadata
+    except Exception as e:
+        print(f"Error loading model from {model_path}: {e}")
+        return None, None
+
+def apply_bundle_settings(metadata):
+    """Sets the config values that preprocessing reads to the ones the model was trained with."""
+    config.INPUT_SIZE = metadata['input_size']
+    config.SEQUENCE_LENGTH = metadata['sequence_length']
+    config.MASKING_BACKEND = metadata['masking_backend']
+    config.CROP_TO_HANDS = metadata['crop_to_hands']
+    config.VARIABLE_LENGTH_CLIPS = metadata['variable_length']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or inspect model bundles.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert_parser = subparsers.add_parser('convert', help="Bundle a legacy state dict and class names file.")
+    convert_parser.add_argument('weights', nargs='?', default=config.BEST_MODEL_PATH)
+    convert_parser.add_argument('class_names', nargs='?', default=config.CLASS_NAMES_FILE)
+    convert_parser.add_argument('--output', default=config.MODEL_BUNDLE_PATH)
+    inspect_parser = subparsers.add_parser('inspect', help="Print a bundle's metadata.")
+    inspect_parser.add_argument('path', nargs='?', default=config.MODEL_BUNDLE_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        model, metadata = load_inference_model(torch.device('cpu'), args.weights, args.class_names)
+        if model is None:
+            raise SystemExit(1)
+        save_bundle(args.output, model, metadata['class_names'], sequence_length=metadata['sequence_length'])
+        print(f"Bundle written to {args.output} (architecture and preprocessing from the current config)")
+        return
+
+    loaded = read_model_file(args.path)
+    if not is_bundle(loaded):
+        raise SystemExit(f"{args.path} is not a model bundle (a plain state dict?).")
+    num_params = sum(t.numel() for t in loaded['state_dict'].values())
+    print(f"{args.path}: {BUNDLE_FORMAT} v{loaded['version']}, {num_params / 1e6:.2f}M values")
+    for key, value in loaded['metadata'].items():
+        print(f"  {key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
+"""Extract sampled frames from raw videos and write their masked compact clips.
+
+Run from the repository root: python -m utils.preprocessing
+"""
 import os
 import cv2
 import numpy as np
@@ -7,6 +11,37 @@ from tqdm import tqdm
 RAW_DATA_DIR = "data/raw"
 PROCESSED_DATA_DIR = "data/processed"
 
+def get_frame_interval(video_fps, target_fps):
+    """Keep every Nth frame so a video_fps stream is sampled at roughly target_fps."""
+    return max(1, int(video_fps / target_fps)) if video_fps > 0 else 1
+
+def iter_video_frames(video_path, target_fps=10):
+    """Yield BGR frames from a video file, subsampled to roughly target_fps.
+
+    Args:
+        video_path: Path to the video file
+        target_fps: Target frames per second to yield
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Error: Could not open video {video_path}")
+        return
+
+    # Calculate frame interval to achieve target_fps
+    frame_interval = get_frame_interval(cap.get(cv2.CAP_PROP_FPS), target_fps)
+
+    frame_count = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame_count % frame_interval == 0:
+                yield frame
+            frame_count += 1
+    finally:
+        cap.release()
+
 def extract_frames(video_path, output_dir, target_fps=10):
     """Extract frames from a video file.
     
@@ -18,45 +53,32 @@ def extract_frames(video_path, output_dir, target_fps=10):
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    # Open video file
+    # Make sure the video can be opened before iterating
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         print(f"Error: Could not open video {video_path}")
         return False
+    cap.release()
     
-    # Get video properties
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    
-    # Calculate frame interval to achieve target_fps
-    frame_interval = max(1, int(fps / target_fps))
-    
-    # Extract frames
-    frame_count = 0
+    # Save every sampled frame
     saved_count = 0
-    
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        # Save every nth frame
-        if frame_count % frame_interval == 0:
-            # Save frame
-            frame_path = os.path.join(output_dir, f"frame_{saved_count:04d}.jpg")
-            cv2.imwrite(frame_path, frame)
-            saved_count += 1
-        
-        frame_count += 1
-    
-    # Release resources
-    cap.release()
+    for frame in iter_video_frames(video_path, target_fps=target_fps):
+        frame_path = os.path.join(output_dir, f"frame_{saved_count:04d}.jpg")
+        cv2.imwrite(frame_path, frame)
+        saved_count += 1
     
     print(f"Extracted {saved_count} frames from {video_path}")
     return True
 
-def preprocess_data():
-    """Process raw videos into frames for model training."""
+def preprocess_data(write_masked=True):
+    """Process raw videos into frames for model training.
+
+    With write_masked each video's frames are also masked once, in order
+    (tracking-mode MediaPipe by default), into a compact masked.npz, so the
+    dataset doesn't run MediaPipe on every access.
+    """
+    from utils.compact_storage import convert_video
+
     raw_dir = RAW_DATA_DIR
     output_dir = PROCESSED_DATA_DIR
     
@@ -80,16 +102,20 @@ def preprocess_data():
                       if f.endswith(('.mp4', '.avi', '.mov'))]
         
         # Process each video
-        for i, video_file in enumerate(tqdm(video_files, desc=f"Processing {class_name}")):
+        for video_file in tqdm(sorted(video_files), desc=f"Processing {class_name}"):
             video_path = os.path.join(class_dir, video_file)
             
-            # Create an output directory for this video
+            # Create an output directory named after the video, as utils/capture_videos.py does,
+            # so a re-run skips videos written by either path instead of duplicating them
             video_name = os.path.splitext(video_file)[0]
-            video_out_dir = os.path.join(class_out_dir, f"video_{i:03d}")
+            video_out_dir = os.path.join(class_out_dir, video_name)
+            if os.path.isdir(video_out_dir):
+                continue # Already written at capture time or by an earlier run
             frames_dir = os.path.join(video_out_dir, "frames")
             
             # Extract frames
-            extract_frames(video_path, frames_dir)
+            if extract_frames(video_path, frames_dir) and write_masked:
+                convert_video(video_out_dir)
 
 if __name__ == "__main__":
     print(f"Starting preprocessing from {RAW_DATA_DIR} to {PROCESSED_DATA_DIR}")
@@ -0,0 +1,131 @@
+"""Training-loop instrumentation: per-phase step timing, on-device metrics and torch.profiler traces.
+
+StepTimer splits each step into phases:
+- data: waiting on the DataLoader, which covers masking and JPEG decode,
+  plus the copy to the device
+- forward
+- backward
+- optimizer
+It reports each phase's share and the samples/sec. On CUDA the compute
+phases are timed with CUDA events, which are only resolved when a summary
+is read, so timing adds no per-step synchronization. MetricAccumulator keeps
+running loss and accuracy sums on the device for the same reason.
+make_profiler captures a torch.profiler trace for a window of training
+steps (train.py --profile), viewable in TensorBoard or chrome://tracing.
+"""
+import contextlib
+import os
+import time
+
+import torch
+from torch.profiler import ProfilerActivity, profile, record_function, schedule, tensorboard_trace_handler
+
+from configs import config
+
+PHASES = ('data', 'forward', 'backward', 'optimizer')
+
+
+class StepTimer:
+    """Accumulates wall time per phase and samples processed since creation (or reset)."""
+    def __init__(self, device):
+        self.use_cuda_events = torch.device(device).type == 'cuda'
+        self.reset()
+
+    def reset(self):
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.samples = 0
+        self.steps = 0
+        self._pending_events = []
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Times the enclosed code as `name`; also labels it in torch.profiler traces."""
+        with record_function(name):
+            if self.use_cuda_events and name != 'data':
+                start, end = torch.cuda.Event(enable_timing=True), torch.cuda.Event(enable_timing=True)
+                start.record()
+                yield
+                end.record()
+                self._pending_events.append((name, start, end))
+            else:
+                start = time.perf_counter()
+                yield
+                self.totals[name] += time.perf_counter() - start
+
+    def iterate(self, iterable):
+        """Yields from `iterable`, timing each fetch as the 'data' phase."""
+        iterator = iter(iterable)
+        while True:
+            with self.phase('data'):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def step(self, num_samples):
+        self.steps += 1
+        self.samples += num_samples
+
+    def summary(self):
+        """Seconds per phase, elapsed wall time and samples/sec (synchronizes CUDA once)."""
+        if self._pending_events:
+            self._pending_events[-1][2].synchronize()
+            for name, start, end in self._pending_events:
+                self.totals[name] += start.elapsed_time(end) / 1000
+            self._pending_events = []
+        elapsed = time.perf_counter() - self._start
+        return {**self.totals, 'elapsed': elapsed, 'steps': self.steps,
+                'samples_per_sec': self.samples / elapsed if elapsed > 0 else 0.0}
+
+    def format(self):
+        stats = self.summary()
+        timed = sum(stats[p] for p in PHASES) or 1.0
+        shares = " ".join(f"{p} {stats[p] / timed:.0%}" for p in PHASES)
+        return f"{stats['samples_per_sec']:.1f} samples/s | {shares}"
+
+
+class MetricAccumulator:
+    """Running loss and accuracy sums kept on the device; read (one sync) only when reported."""
+    def __init__(self, device):
+        self.loss_sum = torch.zeros((), dtype=torch.float64, device=device)
+        self.correct = torch.zeros((), dtype=torch.int64, device=device)
+        self.count = 0
+
+    def update(self, loss, outputs, labels):
+        batch_size = labels.size(0)
+        self.loss_sum += loss.detach().double() * batch_size
+        self.correct += (outputs.detach().argmax(dim=1) == labels).sum()
+        self.count += batch_size
+
+    def totals(self):
+        """(loss sum, correct predictions, samples) as Python numbers."""
+        return self.loss_sum.item(), self.correct.item(), self.count
+
+
+def make_profiler(device, trace_dir=None, worker_name=None):
+    """torch.profiler over PROFILE_ACTIVE_STEPS training steps after PROFILE_WAIT_STEPS; call .step() per step.
+
+    The trace goes to trace_dir (default: config.PROFILE_DIR) and the
+    operators taking the most time are printed when it is ready.
+    """
+    trace_dir = trace_dir or config.PROFILE_DIR
+    os.makedirs(trace_dir, exist_ok=True)
+    activities = [ProfilerActivity.CPU]
+    if torch.device(device).type == 'cuda':
+        activities.append(ProfilerActivity.CUDA)
+    write_trace = tensorboard_trace_handler(trace_dir, worker_name=worker_name)
+    sort_by = 'cuda_time_total' if ProfilerActivity.CUDA in activities else 'cpu_time_total'
+
+    def on_trace_ready(prof):
+        write_trace(prof)
+        print(f"Profiler trace written to {trace_dir}")
+        print(prof.key_averages().table(sort_by=sort_by, row_limit=15))
+
+    return profile(
+        activities=activities,
+        schedule=schedule(wait=config.PROFILE_WAIT_STEPS, warmup=1, active=config.PROFILE_ACTIVE_STEPS, repeat=1),
+        on_trace_ready=on_trace_ready,
+        record_shapes=True,
+    )
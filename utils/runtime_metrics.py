@@ -0,0 +1,220 @@
+"""Low-overhead runtime metrics for the inference paths: histograms, counters and gauges.
+
+Metrics are always collected; the cost is a lock and a few integer updates
+per observation. Latency histograms use fixed, geometrically spaced buckets,
+so percentiles are estimated from bucket counts and no raw samples are
+kept. A MetricsExporter thread writes the registry every
+METRICS_EXPORT_INTERVAL seconds to METRICS_EXPORT_PATH. The format is
+either JSON lines (one snapshot per line, appended) or the Prometheus text
+format, which is rewritten atomically for node_exporter's textfile
+collector.
+
+    metrics = get_registry()
+    with metrics.timer('mask_ms'):
+        masked = apply_mask(frame)
+    metrics.counter('frames_total').inc()
+"""
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+
+from configs import config
+
+METRIC_PREFIX = "signlang_"
+
+
+def latency_buckets_ms(low=0.1, high=30000.0, factor=1.25):
+    """Upper bounds of geometrically spaced latency buckets in milliseconds."""
+    bounds = [low]
+    while bounds[-1] < high:
+        bounds.append(bounds[-1] * factor)
+    return bounds
+
+DEFAULT_BUCKETS_MS = latency_buckets_ms()
+
+
+class Counter:
+    def __init__(self, name, help_text=""):
+        self.name, self.help = name, help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    def __init__(self, name, help_text=""):
+        self.name, self.help = name, help_text
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value # A single assignment; no lock needed
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts[i] holds values <= bounds[i] (the last slot is overflow)."""
+    def __init__(self, name, help_text="", bounds=None):
+        self.name, self.help = name, help_text
+        self.bounds = list(bounds or DEFAULT_BUCKETS_MS)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, q):
+        """Estimate of the q-th percentile (0-100), interpolated linearly inside its bucket."""
+        with self._lock:
+            counts, count, maximum = list(self.counts), self.count, self.max
+        if count == 0:
+            return 0.0
+        rank = q / 100 * count
+        cumulative = 0
+        for i, bucket_count in enumerate(counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                if i == len(self.bounds):
+                    return maximum # Overflow bucket: only the max is known
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = min(self.bounds[i], maximum)
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return maximum
+
+    def snapshot(self):
+        return {'count': self.count, 'mean': self.sum / self.count if self.count else 0.0, 'max': self.max,
+                'p50': self.percentile(50), 'p90': self.percentile(90), 'p99': self.percentile(99)}
+
+
+class MetricsRegistry:
+    """Named metrics, created on first use."""
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, cls(name, help_text))
+        if not isinstance(metric, cls):
+            raise TypeError(f"Metric '{name}' is a {type(metric).__name__}, not a {cls.__name__}.")
+        return metric
+
+    def counter(self, name, help_text=""):
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name, help_text=""):
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name, help_text=""):
+        return self._get(Histogram, name, help_text)
+
+    @contextlib.contextmanager
+    def timer(self, name, help_text=""):
+        """Observes the enclosed block's duration in milliseconds into histogram `name`."""
+        histogram = self.histogram(name, help_text)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe((time.perf_counter() - start) * 1000)
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in sorted(self._metrics.items())}
+
+    def to_json_line(self):
+        return json.dumps({'time': time.time(), 'metrics': self.snapshot()})
+
+    def to_prometheus(self):
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            full_name = METRIC_PREFIX + name
+            if metric.help:
+                lines.append(f"# HELP {full_name} {metric.help}")
+            if isinstance(metric, Histogram):
+                lines.append(f"# TYPE {full_name} histogram")
+                with metric._lock:
+                    counts, count, total = list(metric.counts), metric.count, metric.sum
+                cumulative = 0
+                for bound, bucket_count in zip(metric.bounds, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{full_name}_bucket{{le="{bound:.4g}"}} {cumulative}')
+                lines.append(f'{full_name}_bucket{{le="+Inf"}} {count}')
+                lines.append(f"{full_name}_sum {total}")
+                lines.append(f"{full_name}_count {count}")
+            else:
+                lines.append(f"# TYPE {full_name} {'counter' if isinstance(metric, Counter) else 'gauge'}")
+                lines.append(f"{full_name} {metric.snapshot()}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+def get_registry():
+    """The process-wide registry shared by every inference path."""
+    return _registry
+
+
+class MetricsExporter:
+    """Writes a registry to a file every `interval` seconds on a daemon thread (and once more on close)."""
+    def __init__(self, registry, path, fmt=None, interval=None):
+        self.registry = registry
+        self.path = path
+        fmt = fmt or config.METRICS_EXPORT_FORMAT
+        if fmt == "auto":
+            fmt = "prometheus" if path.endswith(".prom") else "jsonl"
+        self.format = fmt
+        self.interval = interval or config.METRICS_EXPORT_INTERVAL
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self):
+        try:
+            if self.format == "prometheus":
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    f.write(self.registry.to_prometheus())
+                os.replace(tmp_path, self.path) # Collectors never see a half-written file
+            else:
+                with open(self.path, 'a') as f:
+                    f.write(self.registry.to_json_line() + "\n")
+        except OSError as e:
+            print(f"Warning: Could not export metrics to {self.path}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.export()
+
+def start_exporter(path=None, registry=None, fmt=None, interval=None):
+    """Starts exporting to `path` (default: config.METRICS_EXPORT_PATH); returns None when no path is set."""
+    path = path or config.METRICS_EXPORT_PATH
+    if not path:
+        return None
+    print(f"Exporting runtime metrics to {path}")
+    return MetricsExporter(registry or get_registry(), path, fmt=fmt, interval=interval)
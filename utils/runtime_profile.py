@@ -0,0 +1,131 @@
+"""Machine-specific runtime settings: thread limits, DataLoader workers and batch size.
+
+autotune.py measures the machine and writes RUNTIME_PROFILE_PATH. The file
+holds one section of config overrides per role:
+- "train": NUM_WORKERS, PREFETCH_FACTOR, DATALOADER_WORKER_THREADS,
+  TORCH_THREADS, TORCH_INTEROP_THREADS, CV2_THREADS, BATCH_SIZE
+- "inference": TORCH_THREADS, TORCH_INTEROP_THREADS, CV2_THREADS
+
+Entry points call apply_runtime_profile(role) before building models or
+loaders. It sets the config values and then the thread counts of torch and
+OpenCV. A profile recorded on a host with a different core count or memory
+size is ignored.
+
+Without a profile the config defaults still apply. They include
+DATALOADER_WORKER_THREADS, which limit_worker_threads enforces as the
+DataLoader worker_init_fn. Without it, each worker's torch and OpenCV
+thread pools and the main process all spread over every core.
+"""
+import json
+import os
+
+import cv2
+import torch
+
+from configs import config
+
+ROLES = ("train", "inference")
+
+
+def usable_cpu_count():
+    """Cores this process may run on (affinity mask, or cgroup CPU quota if lower)."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError: # Not available on macOS
+        cores = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cores = min(cores, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+def available_memory_bytes():
+    """MemAvailable from /proc/meminfo, or None where it can't be read."""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def host_fingerprint():
+    """What a profile depends on; profiles are only applied on a matching host."""
+    total_memory = None
+    try:
+        with open('/proc/meminfo') as f:
+            total_memory = int(f.readline().split()[1]) * 1024 # MemTotal is the first line
+    except (OSError, ValueError, IndexError):
+        pass
+    return {'cpu_count': usable_cpu_count(), 'memory_bytes': total_memory,
+            'cuda_device': torch.cuda.get_device_name(0) if torch.cuda.is_available() else None}
+
+
+def configure_threads(torch_threads=None, interop_threads=None, cv2_threads=None):
+    """Sets torch and OpenCV thread counts (default: the config values; 0 / -1 leave library defaults)."""
+    torch_threads = config.TORCH_THREADS if torch_threads is None else torch_threads
+    interop_threads = config.TORCH_INTEROP_THREADS if interop_threads is None else interop_threads
+    cv2_threads = config.CV2_THREADS if cv2_threads is None else cv2_threads
+    if torch_threads > 0:
+        torch.set_num_threads(torch_threads)
+    if interop_threads > 0:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError: # Only possible before the first inter-op parallel work
+            print(f"Warning: torch inter-op threads already fixed at {torch.get_num_interop_threads()}.")
+    if cv2_threads >= 0:
+        cv2.setNumThreads(cv2_threads)
+
+def limit_worker_threads(worker_id):
+    """DataLoader worker_init_fn: caps each worker at DATALOADER_WORKER_THREADS torch and OpenCV threads."""
+    threads = config.DATALOADER_WORKER_THREADS
+    if threads > 0:
+        torch.set_num_threads(threads)
+        cv2.setNumThreads(threads)
+
+
+def load_runtime_profile(path=None):
+    """The profile dict, or None if the file is missing, unreadable or from another host."""
+    path = path or config.RUNTIME_PROFILE_PATH
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read runtime profile {path}: {e}")
+        return None
+    recorded, current = profile.get('fingerprint', {}), host_fingerprint()
+    mismatched = [k for k in ('cpu_count', 'memory_bytes') if recorded.get(k) != current[k]]
+    if mismatched:
+        print(f"Warning: Runtime profile {path} was tuned on a different host ({', '.join(mismatched)} differ); "
+              f"ignoring it. Re-run autotune.py.")
+        return None
+    return profile
+
+def apply_runtime_profile(role, path=None):
+    """Applies the profile's `role` section to config, then configures threads; returns the applied overrides."""
+    if role not in ROLES:
+        raise ValueError(f"Unknown runtime profile role '{role}', expected one of {ROLES}.")
+    profile = load_runtime_profile(path)
+    overrides = (profile or {}).get(role, {})
+    for key, value in overrides.items():
+        if hasattr(config, key):
+            setattr(config, key, value)
+        else:
+            print(f"Warning: Ignoring unknown runtime profile setting {key}.")
+    if overrides:
+        print(f"Applied {role} runtime profile: " + ", ".join(f"{k}={v}" for k, v in sorted(overrides.items())))
+    configure_threads()
+    return overrides
+
+def save_runtime_profile(path, train, inference, trials=None):
+    profile = {'fingerprint': host_fingerprint(), 'train': train, 'inference': inference, 'trials': trials or []}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_path, path)
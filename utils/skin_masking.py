@@ -0,0 +1,72 @@
+"""MediaPipe-free hand masking: YCrCb skin segmentation plus optional MOG2 background subtraction.
+
+Selected with config.MASKING_BACKEND = "skin". A SkinMasker stands in for a
+MediaPipe Hands detector in data_utils (create_hands_detector and
+apply_mediapipe_mask_and_grayscale dispatch on it), so training, capture and
+every inference path use it unchanged. The output has the same form as the
+MediaPipe mask: filled convex hulls of up to two hand regions on black.
+
+Static-image maskers (dataset random access) use skin colour alone. Maskers
+created for in-order streams also learn the background with MOG2 and only
+keep skin that moves, which drops skin-coloured walls and furniture. The face
+is skin too; it is usually the third largest region or filtered by motion,
+but expect it to leak in more often than with MediaPipe.
+"""
+import cv2
+import numpy as np
+
+# Commonly used skin cluster in YCrCb (Y is left open for lighting changes)
+SKIN_YCRCB_LOWER = np.array([0, 133, 77], dtype=np.uint8)
+SKIN_YCRCB_UPPER = np.array([255, 173, 127], dtype=np.uint8)
+PROCESSING_WIDTH = 320 # Masks are computed at this width and scaled back up
+MIN_REGION_FRACTION = 0.002 # Smallest kept region, as a fraction of the frame area
+BACKGROUND_HISTORY = 300 # MOG2 history in frames (~30 s at TARGET_FPS)
+
+
+class SkinMasker:
+    """Per-stream (or shared static) skin masker with the MediaPipe detector's lifetime API."""
+    def __init__(self, use_background=False, max_regions=2):
+        self.use_background = use_background
+        self.max_regions = max_regions
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        self._subtractor = None
+        self.reset()
+
+    def reset(self):
+        """Forgets the learned background (start of a new video)."""
+        if self.use_background:
+            self._subtractor = cv2.createBackgroundSubtractorMOG2(
+                history=BACKGROUND_HISTORY, varThreshold=16, detectShadows=False)
+
+    def close(self):
+        self._subtractor = None
+
+    def compute_mask(self, image_rgb):
+        """uint8 mask (255 = hand) at the image's full resolution."""
+        height, width = image_rgb.shape[:2]
+        scale = min(1.0, PROCESSING_WIDTH / width)
+        small = cv2.resize(image_rgb, (int(width * scale), int(height * scale)),
+                           interpolation=cv2.INTER_AREA) if scale < 1.0 else image_rgb
+
+        skin = cv2.inRange(cv2.cvtColor(small, cv2.COLOR_RGB2YCrCb), SKIN_YCRCB_LOWER, SKIN_YCRCB_UPPER)
+        if self._subtractor is not None:
+            moving = self._subtractor.apply(small)
+            skin = cv2.bitwise_and(skin, cv2.dilate(moving, self._kernel, iterations=2))
+        skin = cv2.morphologyEx(skin, cv2.MORPH_OPEN, self._kernel)
+        skin = cv2.morphologyEx(skin, cv2.MORPH_CLOSE, self._kernel, iterations=2)
+
+        contours, _ = cv2.findContours(skin, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_area = MIN_REGION_FRACTION * skin.shape[0] * skin.shape[1]
+        regions = sorted((c for c in contours if cv2.contourArea(c) >= min_area), key=cv2.contourArea, reverse=True)
+        mask = np.zeros(skin.shape, dtype=np.uint8)
+        for contour in regions[:self.max_regions]:
+            cv2.fillConvexPoly(mask, cv2.convexHull(contour), 255)
+        if mask.shape != (height, width):
+            mask = cv2.resize(mask, (width, height), interpolation=cv2.INTER_NEAREST)
+        return mask
+
+    def mask_and_grayscale(self, image_rgb, return_mask=False):
+        mask = self.compute_mask(image_rgb)
+        gray_source = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2GRAY)
+        masked_gray_image = cv2.bitwise_and(gray_source, gray_source, mask=mask)
+        return (masked_gray_image, mask) if return_mask else masked_gray_image
@@ -1,14 +1,16 @@
-"""Visualization utilities for training and evaluation."""
-import matplotlib.pyplot as plt
+"""Visualization utilities for training and evaluation.
+
+matplotlib, seaborn and sklearn are imported inside the plotting functions,
+so only code that actually saves a figure pays for them.
+"""
 import numpy as np
 import torch
 import cv2
-from sklearn.metrics import confusion_matrix
-import seaborn as sns
 import os
 
 def plot_training_history(train_losses, val_losses, train_accs, val_accs, save_path='training_history.png'):
     """Plot training and validation loss/accuracy curves."""
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 5))
     
     # Plot loss
@@ -41,6 +43,9 @@ def plot_training_history(train_losses, val_losses, train_accs, val_accs, save_p
 
 def plot_confusion_matrix(targets, predictions, class_names, save_path='confusion_matrix.png'):
     """Plot confusion matrix of model predictions."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from sklearn.metrics import confusion_matrix
     # Create the confusion matrix
     cm = confusion_matrix(targets, predictions)
     
@@ -0,0 +1,226 @@
+"""Multi-process inference workers sharing one copy of the model weights.
+
+The parent loads the model once and moves its parameters into shared memory
+(`share_memory()`), then forks the workers. Every worker maps the same weight
+pages instead of holding a private copy, and owns its own MediaPipe detector,
+so masking and forwards run in parallel without contending for the GIL.
+"""
+import collections
+import itertools
+import os
+import queue
+import threading
+import traceback
+from concurrent.futures import Future
+
+import cv2
+import torch
+import torch.multiprocessing as mp
+
+from configs import config
+from utils.preprocessing import iter_video_frames
+
+_STOP = None # Sentinel placed on the task queue to shut a worker down
+TASKS_PER_WORKER = 2 # Tasks queued per worker, so it never waits on the parent between tasks
+WORKER_CHECK_INTERVAL = 1.0 # Seconds between liveness checks while no results arrive
+
+
+def _worker_loop(predictor, task_queue, result_queue, threads_per_worker):
+    """Runs in each forked worker: masks clips and runs forwards until stopped."""
+    torch.set_num_threads(threads_per_worker)
+    cv2.setNumThreads(1)
+    detector = predictor.create_detector(static_image_mode=True) # Private MediaPipe instance
+    try:
+        while True:
+            task = task_queue.get()
+            if task is _STOP:
+                break
+            task_id, kind, payload = task
+            try:
+                if kind == 'video':
+                    # payload: path of a video file -> decode, mask, sample and forward
+                    frames = list(iter_video_frames(payload, target_fps=config.TARGET_FPS))
+                    sequence = predictor.preprocess_clip(frames, detector=detector)
+                elif kind == 'clip':
+                    # payload: list of BGR frames -> mask, sample and forward
+                    sequence = predictor.preprocess_clip(payload, detector=detector)
+                else:
+                    # payload: already preprocessed (T, 1, H, W) tensor
+                    sequence = payload
+                probabilities = predictor.predict_batch(sequence.unsqueeze(0))[0]
+                result_queue.put((task_id, probabilities, None))
+            except Exception as e:
+                # The type name lets the parent re-raise bad-input errors (ValueError) as such
+                result_queue.put((task_id, None, (type(e).__name__, f"{type(e).__name__}: {e}\n{traceback.format_exc()}")))
+    finally:
+        detector.close()
+
+
+def get_process_memory(pid=None):
+    """Returns RSS/PSS/USS in bytes for a process from /proc (Linux), or {} if unavailable."""
+    path = f"/proc/{pid or os.getpid()}/smaps_rollup"
+    fields = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':'):
+                    fields[parts[0][:-1]] = int(parts[1]) * 1024
+    except OSError:
+        return {}
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+class InferenceWorkerPool:
+    """Pool of forked workers running SignPredictor with shared-memory weights.
+
+    Create the pool before starting any other threads (fork copies only the
+    calling thread). submit_* methods return concurrent.futures.Future objects.
+
+    Each worker has its own task queue holding at most TASKS_PER_WORKER
+    tasks; the rest wait in the parent. So the parent always knows which
+    tasks a worker holds. If a worker dies (a crash inside MediaPipe, the OOM
+    killer), those tasks' futures fail and a replacement worker is forked.
+    Replacements are forked from the result collector thread, after the
+    process may have started other threads.
+    """
+    def __init__(self, predictor, num_workers, threads_per_worker=1):
+        if predictor.device.type != 'cpu':
+            raise ValueError("InferenceWorkerPool shares CPU weights; use a CPU predictor.")
+        self.num_workers = num_workers
+        self._predictor = predictor
+        self._threads_per_worker = threads_per_worker
+        predictor.model.share_memory()
+        self._ctx = mp.get_context('fork')
+        self._result_queue = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._pending = collections.deque() # Tasks not yet handed to a worker
+        self._assigned = [set() for _ in range(num_workers)] # Task ids each worker holds
+        self._task_ids = itertools.count()
+        self._closing = False
+        self.workers_restarted = 0
+        print(f"  [Worker Pool] Forking {num_workers} workers ({threads_per_worker} torch thread(s) each)...")
+        self._workers = [None] * num_workers
+        self._task_queues = [None] * num_workers
+        for index in range(num_workers):
+            self._start_worker(index)
+
+        self._collector = threading.Thread(target=self._collect_results, name="worker-pool-results", daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, index):
+        task_queue = self._ctx.Queue()
+        worker = self._ctx.Process(target=_worker_loop, name=f"inference-worker-{index}", daemon=True,
+                                   args=(self._predictor, task_queue, self._result_queue, self._threads_per_worker))
+        worker.start()
+        self._workers[index], self._task_queues[index] = worker, task_queue
+
+    @property
+    def pids(self):
+        return [worker.pid for worker in self._workers]
+
+    def _dispatch(self):
+        """Hands pending tasks to workers with free slots (call with the lock held)."""
+        for index, assigned in enumerate(self._assigned):
+            while self._pending and len(assigned) < TASKS_PER_WORKER:
+                task = self._pending.popleft()
+                assigned.add(task[0])
+                self._task_queues[index].put(task)
+
+    def _submit(self, kind, payload):
+        future = Future()
+        with self._lock:
+            if self._closing:
+                raise RuntimeError("Worker pool shut down.")
+            task_id = next(self._task_ids)
+            self._futures[task_id] = future
+            self._pending.append((task_id, kind, payload))
+            self._dispatch()
+        return future
+
+    def submit_clip(self, frames_bgr):
+        """Masks, samples and classifies a list of BGR frames in a worker."""
+        return self._submit('clip', list(frames_bgr))
+
+    def submit_video(self, video_path):
+        """Decodes, masks and classifies a video file entirely inside a worker."""
+        return self._submit('video', video_path)
+
+    def submit_sequence(self, sequence):
+        """Classifies an already preprocessed (T, 1, H, W) tensor in a worker."""
+        return self._submit('sequence', sequence)
+
+    def _replace_dead_workers(self):
+        """Fails the tasks of workers that died and forks replacements (call with the lock held)."""
+        for index, worker in enumerate(self._workers):
+            if worker.exitcode is None:
+                continue
+            lost = self._assigned[index]
+            print(f"  [Worker Pool] Worker {worker.pid} died (exit code {worker.exitcode}) holding {len(lost)} task(s); restarting it.")
+            for task_id in lost:
+                future = self._futures.pop(task_id, None)
+                if future is not None and not future.done():
+                    future.set_exception(RuntimeError(f"Inference worker died (exit code {worker.exitcode})."))
+            self._assigned[index] = set()
+            worker.join()
+            self._start_worker(index)
+            self.workers_restarted += 1
+        self._dispatch()
+
+    def _collect_results(self):
+        while True:
+            try:
+                item = self._result_queue.get(timeout=WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                with self._lock:
+                    if not self._closing:
+                        self._replace_dead_workers()
+                continue
+            if item is _STOP:
+                break
+            task_id, probabilities, error = item
+            with self._lock:
+                future = self._futures.pop(task_id, None)
+                for assigned in self._assigned:
+                    assigned.discard(task_id)
+                if not self._closing:
+                    self._replace_dead_workers() # Also hands the freed slot to a pending task
+            if future is None:
+                continue
+            if error is not None:
+                error_type, message = error
+                exc_class = ValueError if error_type == 'ValueError' else RuntimeError
+                future.set_exception(exc_class(f"Inference worker failed: {message}"))
+            else:
+                future.set_result(probabilities)
+
+    def shutdown(self):
+        """Stops all workers and fails any outstanding futures."""
+        with self._lock:
+            self._closing = True
+        for task_queue in self._task_queues:
+            task_queue.put(_STOP)
+        for worker in self._workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        self._result_queue.put(_STOP)
+        self._collector.join(timeout=10)
+        with self._lock:
+            pending, self._futures = self._futures, {}
+            self._pending.clear()
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Worker pool shut down."))
+        print("  [Worker Pool] All workers stopped.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()